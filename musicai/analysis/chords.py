@@ -0,0 +1,160 @@
+"""
+Chord labels for every beat of a score, matched against ChordType templates
+"""
+from typing import Union
+
+import numpy as np
+
+from structure.note import ChordType
+from structure.note_table import NoteTable
+
+
+# ------------------
+# ChordLabeler class
+# ------------------
+class ChordLabeler:
+    """
+    Class to label each beat of a score with the chord whose template best matches what sounds in it. Templates are
+    built once, one per root and ChordType, as unit vectors over the 12 pitch classes. The chroma of every beat,
+    weighted by how long each pitch class sounds in it, is found at once from NoteTable.cumulative_chroma(), and the
+    beats of any number of scores are matched against every template in one matrix product of cosine similarities.
+
+    Templates of the same pitch classes, as C6 and Am7, or the inversions of a diminished seventh, tie on chroma
+    alone; the one rooted on the beat's lowest note is taken, and otherwise the earlier ChordType, then the lower
+    root. Beats in which nothing sounds, or nothing matches well enough, get no chord.
+
+    labeler = ChordLabeler()
+    roots, chord_types, similarity = labeler.label(NoteTable.from_score(score))
+    print(labeler.names(roots, chord_types))
+    """
+    CHORD_TYPES = list(ChordType)
+    ROOT_NAMES = ['C', 'C♯', 'D', 'E♭', 'E', 'F', 'F♯', 'G', 'A♭', 'A', 'B♭', 'B']
+
+    # Row type * 12 + root holds the chord type on that root, scaled to unit length
+    _TEMPLATES_ = np.array([[(chord_type.mask >> ((pitch_class - root) % 12)) & 1 for pitch_class in range(12)]
+                            for chord_type in CHORD_TYPES for root in range(12)], dtype=np.float64)
+    _TEMPLATES_ /= np.linalg.norm(_TEMPLATES_, axis=1, keepdims=True)
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, quarters: float = 1.0, threshold: float = 0.0, bass_weight: float = 0.01):
+        """
+        :param quarters: Length of each labeled span, in quarter notes
+        :param threshold: Least cosine similarity a chord needs to be given to a beat
+        :param bass_weight: Similarity added to templates rooted on the lowest note while matching, enough to settle
+            ties without overruling a better match
+        """
+        if quarters <= 0:
+            raise ValueError(f'Labeled spans need a positive length, not {quarters}.')
+        self.quarters = quarters
+        self.threshold = float(threshold)
+        self.bass_weight = float(bass_weight)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} quarters={self.quarters}>'
+
+    # -------
+    # Methods
+    # -------
+    def chroma(self, table: NoteTable) -> np.ndarray:
+        """
+        Returns the duration-weighted chroma of every beat of a score, the last running short at its end
+
+        :param table: The NoteTable of the score
+        :return: A float64 array of shape (beats, 12), in ticks
+        """
+        step, end = self._step_(table)
+        edges = np.append(np.arange(0, end, step, dtype=np.int64), end)
+        return np.diff(table.cumulative_chroma(edges), axis=1).T.astype(np.float64)
+
+    def bass(self, table: NoteTable) -> np.ndarray:
+        """
+        Returns the pitch class of the lowest note sounding in every beat of a score
+
+        :param table: The NoteTable of the score
+        :return: An int64 array with an entry per beat, -1 where nothing sounds
+        """
+        step, end = self._step_(table)
+        beats = -(-end // step)
+        first = table.onset // step
+        counts = np.maximum((table.onset + table.duration - 1) // step - first + 1, 1)
+
+        # One entry per beat each note sounds in
+        note = np.repeat(np.arange(len(table)), counts)
+        beat = first[note] + np.arange(len(note)) - np.repeat(np.cumsum(counts) - counts, counts)
+        lowest = np.full(beats, 128, dtype=np.int64)
+        np.minimum.at(lowest, beat, table.pitch[note].astype(np.int64))
+        return np.where(lowest < 128, lowest % 12, -1)
+
+    def label(self, table: NoteTable) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Labels every beat of a score
+
+        :param table: The NoteTable of the score
+        :return: As match(), for each beat
+        """
+        return self.match(self.chroma(table), self.bass(table))
+
+    def label_batch(self, tables: list[NoteTable]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Labels every beat of many scores at once
+
+        :param tables: The NoteTable of each score
+        :return: As match(), for the beats of every score one after another, and the offsets at which each score's
+            beats start, the last being the total
+        """
+        chroma = [np.zeros((0, 12))] + [self.chroma(table) for table in tables]
+        bass = [np.zeros(0, dtype=np.int64)] + [self.bass(table) for table in tables]
+        offsets = np.cumsum([len(beats) for beats in chroma])
+        roots, chord_types, similarity = self.match(np.concatenate(chroma), np.concatenate(bass))
+        return roots, chord_types, similarity, offsets
+
+    def match(self, chroma: np.ndarray, bass: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Matches many chroma vectors against every template at once
+
+        :param chroma: An array of shape (beats, 12)
+        :param bass: Pitch class of the lowest note of each beat, -1 for none, or None to match on chroma alone
+        :return: The root pitch class of each beat's chord, and its index in CHORD_TYPES, both -1 where there is no
+            chord, and the cosine similarity of the match
+        """
+        norm = np.linalg.norm(chroma, axis=1, keepdims=True)
+        similarity = (chroma / np.where(norm > 0, norm, 1)) @ ChordLabeler._TEMPLATES_.T
+        ranking = similarity
+        if bass is not None:
+            roots = np.arange(len(ChordLabeler._TEMPLATES_)) % 12
+            ranking = similarity + self.bass_weight * (roots == bass[:, np.newaxis])
+        best = np.argmax(ranking, axis=1)
+        score = similarity[np.arange(len(best)), best]
+
+        chord = (norm[:, 0] > 0) & (score >= self.threshold)
+        return np.where(chord, best % 12, -1), np.where(chord, best // 12, -1), np.where(chord, score, 0.0)
+
+    def _step_(self, table: NoteTable) -> tuple[int, int]:
+        """
+        Ticks per beat, and where the last beat ends
+        """
+        return max(int(round(self.quarters * table.resolution)), 1), \
+            max(table.end, int((table.onset + table.duration).max(initial=0)))
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def names(cls, roots: np.ndarray, chord_types: np.ndarray) -> list[str]:
+        """
+        Returns chord symbols, e.g. 'Am7', from roots and chord type indices as given by match(); 'N' for no chord
+        """
+        return [cls.ROOT_NAMES[root] + cls.CHORD_TYPES[chord_type].abbrs[0] if root >= 0 else 'N'
+                for root, chord_type in zip(roots.tolist(), chord_types.tolist())]
+
+    @classmethod
+    def chord_type(cls, index: Union[int, np.integer]) -> ChordType:
+        """
+        Returns the ChordType of an index given by match()
+        """
+        return cls.CHORD_TYPES[int(index)]
@@ -0,0 +1,234 @@
+"""
+Fixed-length embeddings of measures, and nearest-neighbour search over them
+"""
+from typing import Union
+
+import numpy as np
+
+from analysis.features import FeatureExtractor
+from ml.dataset import ShardedDataset, ShardWriter
+from structure.note_table import NoteTable
+
+
+# ---------------------
+# MeasureEmbedder class
+# ---------------------
+class MeasureEmbedder(FeatureExtractor):
+    """
+    Class to embed every measure of many scores as a unit vector, so that the cosine similarity of two measures is
+    the dot product of their vectors. A measure is every note starting in it, across all parts. Its vector joins, as
+    FeatureExtractor computes them for scores:
+        pitch class histogram, duration weighted
+        interval histogram, between successive onsets of each staff within the measure
+        duration histogram, as a measure of rhythm
+        density, the notes and distinct onsets of the measure, each as log(1 + count) / log(1 + max_notes)
+    Each block is scaled to unit length before they are joined, so each weighs alike, and the whole to unit length
+    after. A measure without notes is all zeros.
+
+    Every measure of every score is computed at once, each measure of the corpus being one group of the bincounts.
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 max_interval: Union[int, np.integer] = 7,
+                 duration_range: tuple[int, int] = (-3, 2),
+                 max_notes: Union[int, np.integer] = 32):
+        """
+        :param max_interval: Largest interval, in semitones, with its own bin
+        :param duration_range: Exponents of the shortest and longest durations with their own bin, in quarter notes
+        :param max_notes: Count at which density reaches 1
+        """
+        super().__init__(weighted=True, max_interval=max_interval, duration_range=duration_range)
+        if max_notes <= 0:
+            raise ValueError(f'Density needs a positive count of notes, not {max_notes}.')
+        self.max_notes = int(max_notes)
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def dimensions(self) -> int:
+        """
+        Length of each measure's vector
+        """
+        return 12 + 2 * self.max_interval + 1 + self.duration_range[1] - self.duration_range[0] + 1 + 2
+
+    # -------
+    # Methods
+    # -------
+    def embed(self, tables: list[NoteTable]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Embeds every measure of many scores, up to the last measure of each with a note starting in it
+
+        :param tables: The NoteTable of each score
+        :return: A float32 array with a row per measure, the measures of each score in order and one score after
+            another; and the offsets at which each score's measures start, the last being the total
+        """
+        score, onset, duration, pitch, part, staff, measure = self._columns_(tables)
+        measures = np.array([int(table.measure.max(initial=-1)) + 1 for table in tables], dtype=np.int64)
+        offsets = np.zeros(len(tables) + 1, dtype=np.int64)
+        np.cumsum(measures, out=offsets[1:])
+        count = int(offsets[-1])
+
+        group = offsets[:-1][score] + measure
+        resolution = np.array([table.resolution for table in tables], dtype=np.float64)
+        quarters = duration / resolution[score]
+
+        # Distinct onsets of each measure, the first of each in sorted order
+        order = np.lexsort((onset, group))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (group[order][1:] != group[order][:-1]) | (onset[order][1:] != onset[order][:-1])
+        scale = np.log1p(self.max_notes)
+        density = np.column_stack([np.log1p(np.bincount(group, minlength=count)) / scale,
+                                   np.log1p(np.bincount(group[order][first], minlength=count)) / scale])
+
+        blocks = [self._pitch_classes_(group, pitch, quarters, count),
+                  self._intervals_(group, part, staff, onset, pitch, count),
+                  self._durations_(group, quarters, count),
+                  np.minimum(density, 1)]
+        vectors = np.hstack([self._unit_(block) for block in blocks])
+        return self._unit_(vectors).astype(np.float32), offsets
+
+    def write(self,
+              directory: str,
+              tables: list[NoteTable],
+              keys: list[str] | None = None,
+              shard_size: Union[int, np.integer] = 1 << 20) -> None:
+        """
+        Embeds the measures of many scores into a dataset, one array per score, for a MeasureIndex. Each score is
+        kept under its key, and adds to a dataset already in the directory
+
+        :param directory: Where the dataset is written
+        :param tables: The NoteTable of each score
+        :param keys: A name for each score, e.g. its path
+        :param shard_size: Measures per shard
+        """
+        vectors, offsets = self.embed(tables)
+        with ShardWriter(directory, shard_size, resume=True) as writer:
+            for index in range(len(tables)):
+                writer.append(vectors[offsets[index]:offsets[index + 1]], key=keys[index] if keys else None)
+
+    @staticmethod
+    def _unit_(vectors: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norm > 0, norm, 1)
+
+
+# ------------------
+# MeasureIndex class
+# ------------------
+class MeasureIndex:
+    """
+    Class to find the measures most like a query among every measure embedded in a dataset by MeasureEmbedder. The
+    vectors stay memory-mapped on disk; a search reads them a block of rows at a time, and scores each block against
+    every query in one matrix product, keeping the best k of each. Unit vectors make the product the cosine
+    similarity.
+
+    Embeddings have a few dozen dimensions, where a k-d tree prunes little and a brute-force product over
+    contiguous memory is the faster search.
+
+    index = MeasureIndex('embeddings/')
+    similarity, scores, measures = index.search(index.vector(0, 12), k=5)
+    print([index.keys[score] for score in scores[0]])
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, directory: str, block_size: Union[int, np.integer] = 1 << 18):
+        """
+        :param directory: A dataset written by MeasureEmbedder.write()
+        :param block_size: Rows scored at once; bounds the memory a search takes
+        """
+        self.dataset = ShardedDataset(directory)
+        self.block_size = int(block_size)
+        self.keys = self.dataset.keys
+
+        # Where each shard's scores start within it, in dataset order
+        self._shard_scores_ = [np.flatnonzero(self.dataset.shards == shard)
+                               for shard in range(self.dataset.shard_count)]
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return int(self.dataset.lengths.sum())
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.dataset.directory} measures={len(self)}>'
+
+    # -------
+    # Methods
+    # -------
+    def vector(self, score: Union[int, np.integer], measure: Union[int, np.integer]) -> np.ndarray:
+        """
+        Returns the embedding of a measure of a score of the dataset
+        """
+        return np.array(self.dataset[score][measure])
+
+    def search(self,
+               queries: np.ndarray,
+               k: Union[int, np.integer] = 10) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the measures most similar to each query
+
+        :param queries: A vector, or an array of shape (queries, dimensions), as from MeasureEmbedder.embed()
+        :param k: How many measures to find for each query
+        :return: Arrays of shape (queries, k), best first: the cosine similarity of each measure found, the index of
+            its score in the dataset, and its index in the score. Where fewer than k measures exist, the rest are -1
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norm = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norm > 0, norm, 1)
+        k = int(k)
+
+        best_similarity = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_shard = np.zeros((len(queries), 0), dtype=np.int64)
+        best_row = np.zeros((len(queries), 0), dtype=np.int64)
+        for shard in range(self.dataset.shard_count):
+            vectors = self.dataset.shard(shard)
+            for start in range(0, len(vectors), self.block_size):
+                similarity = queries @ np.asarray(vectors[start:start + self.block_size]).T
+                top = self._top_(similarity, k)
+                best_similarity = np.hstack([best_similarity, np.take_along_axis(similarity, top, axis=1)])
+                best_shard = np.hstack([best_shard, np.full(top.shape, shard)])
+                best_row = np.hstack([best_row, top + start])
+
+                keep = self._top_(best_similarity, k)
+                best_similarity = np.take_along_axis(best_similarity, keep, axis=1)
+                best_shard = np.take_along_axis(best_shard, keep, axis=1)
+                best_row = np.take_along_axis(best_row, keep, axis=1)
+
+        order = np.argsort(-best_similarity, axis=1, kind='stable')
+        best_similarity = np.take_along_axis(best_similarity, order, axis=1)
+        scores, measures = self._locate_(np.take_along_axis(best_shard, order, axis=1),
+                                         np.take_along_axis(best_row, order, axis=1))
+
+        missing = k - best_similarity.shape[1]
+        if missing > 0:
+            best_similarity = np.pad(best_similarity, ((0, 0), (0, missing)), constant_values=-1)
+            scores = np.pad(scores, ((0, 0), (0, missing)), constant_values=-1)
+            measures = np.pad(measures, ((0, 0), (0, missing)), constant_values=-1)
+        return best_similarity, scores, measures
+
+    def _locate_(self, shards: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Turns rows of shards into scores of the dataset and measures of the scores
+        """
+        scores = np.zeros(shards.shape, dtype=np.int64)
+        for shard, in_shard in enumerate(self._shard_scores_):
+            here = shards == shard
+            found = in_shard[np.searchsorted(self.dataset.starts[in_shard], rows[here], side='right') - 1]
+            scores[here] = found
+        return scores, rows - self.dataset.starts[scores]
+
+    @staticmethod
+    def _top_(similarity: np.ndarray, k: int) -> np.ndarray:
+        """
+        Columns of the k largest values of each row, in no order
+        """
+        if similarity.shape[1] <= k:
+            return np.broadcast_to(np.arange(similarity.shape[1]), similarity.shape)
+        return np.argpartition(-similarity, k - 1, axis=1)[:, :k]
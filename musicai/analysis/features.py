@@ -0,0 +1,207 @@
+"""
+Summary features of whole scores, computed for a corpus at once from NoteTables
+"""
+from typing import Union
+
+import numpy as np
+
+from structure.note_table import NoteTable
+
+
+# ----------------------
+# FeatureExtractor class
+# ----------------------
+class FeatureExtractor:
+    """
+    Class to compute a fixed-length feature vector for each of many scores. The NoteTables of every score are joined
+    into one set of columns tagged with the score they came from, and each feature is then a bincount, reduction, or
+    cumulative sum over the whole corpus at once; nothing loops over scores or notes.
+
+    The features, in the order of names, are:
+        pitch class histogram, 12 bins, weighted by duration unless weighted is False
+        interval histogram, from down max_interval semitones to up max_interval, between the highest notes of
+            successive onsets in each staff; larger leaps fall in the outer bins
+        duration histogram, durations rounded to a power of two of a quarter note, from 2^duration_range[0] to
+            2^duration_range[1] quarters, outliers falling in the outer bins
+        notes per measure, mean, standard deviation, and maximum
+        pitch range, lowest, highest, span, and mean MIDI pitch
+        polyphony, mean and maximum notes sounding at once, the mean taken over the time any note sounds
+
+    Histograms are normalized to sum to 1. A score without notes gets zeros.
+
+    extractor = FeatureExtractor()
+    features = extractor.extract([NoteTable.from_score(score) for score in scores])
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 weighted: bool = True,
+                 max_interval: Union[int, np.integer] = 12,
+                 duration_range: tuple[int, int] = (-4, 3)):
+        """
+        :param weighted: Whether the pitch class histogram is weighted by duration, rather than counting notes
+        :param max_interval: Largest interval, in semitones, with its own bin
+        :param duration_range: Exponents of the shortest and longest durations with their own bin, in quarter notes
+        """
+        if max_interval < 0:
+            raise ValueError(f'The largest interval cannot be negative, {max_interval}.')
+        if duration_range[0] > duration_range[1]:
+            raise ValueError(f'A duration range cannot run from 2^{duration_range[0]} down to 2^{duration_range[1]}.')
+        self.weighted = weighted
+        self.max_interval = int(max_interval)
+        self.duration_range = (int(duration_range[0]), int(duration_range[1]))
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} features={len(self.names)}>'
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def names(self) -> list[str]:
+        """
+        Name of each column of the feature matrix
+        """
+        low, high = self.duration_range
+        return ([f'pitch_class_{pitch_class}' for pitch_class in range(12)] +
+                [f'interval_{interval}' for interval in range(-self.max_interval, self.max_interval + 1)] +
+                [f'duration_2^{exponent}' for exponent in range(low, high + 1)] +
+                ['measure_notes_mean', 'measure_notes_std', 'measure_notes_max',
+                 'pitch_min', 'pitch_max', 'pitch_span', 'pitch_mean',
+                 'polyphony_mean', 'polyphony_max'])
+
+    # -------
+    # Methods
+    # -------
+    def extract(self, tables: list[NoteTable]) -> np.ndarray:
+        """
+        Computes the features of many scores
+
+        :param tables: The NoteTable of each score
+        :return: A float64 matrix with a row per score and a column per name
+        """
+        count = len(tables)
+        score, onset, duration, pitch, part, staff, measure = self._columns_(tables)
+        resolution = np.array([table.resolution for table in tables], dtype=np.float64)
+        quarters = duration / resolution[score]
+
+        return np.hstack([self._pitch_classes_(score, pitch, quarters, count),
+                          self._intervals_(score, part, staff, onset, pitch, count),
+                          self._durations_(score, quarters, count),
+                          self._measure_notes_(score, measure, tables),
+                          self._pitch_range_(score, pitch, count),
+                          self._polyphony_(score, onset, duration, resolution, count)])
+
+    def extract_scores(self, scores: list) -> np.ndarray:
+        """
+        Computes the features of many Scores, tabulating each first
+        """
+        return self.extract([NoteTable.from_score(score) for score in scores])
+
+    def _columns_(self, tables: list[NoteTable]) -> tuple[np.ndarray, ...]:
+        """
+        Joins the tables into int64 columns: the index of each note's table, then onset, duration, pitch, part, staff,
+        and measure
+        """
+        columns = [np.repeat(np.arange(len(tables)), [len(table) for table in tables])]
+        for name in ('onset', 'duration', 'pitch', 'part', 'staff', 'measure'):
+            columns.append(np.concatenate([np.zeros(0, dtype=np.int64)] + [getattr(table, name) for table in tables]))
+        return tuple(columns)
+
+    def _pitch_classes_(self, score: np.ndarray, pitch: np.ndarray, quarters: np.ndarray, count: int) -> np.ndarray:
+        weights = quarters if self.weighted else None
+        return self._normalize_(np.bincount(score * 12 + pitch % 12, weights, count * 12).reshape(count, 12))
+
+    def _intervals_(self,
+                    score: np.ndarray,
+                    part: np.ndarray,
+                    staff: np.ndarray,
+                    onset: np.ndarray,
+                    pitch: np.ndarray,
+                    count: int) -> np.ndarray:
+        """
+        Histogram of the steps between the highest notes of successive onsets of each staff
+        """
+        bins = 2 * self.max_interval + 1
+        # Order by staff, onset, then pitch, so the last of each onset is its highest note
+        stream = (score * (part.max(initial=0) + 1) + part) * (staff.max(initial=0) + 1) + staff
+        order = np.lexsort((pitch, onset, stream))
+        stream, onset, pitch, score = stream[order], onset[order], pitch[order], score[order]
+
+        top = np.ones(len(order), dtype=bool)
+        top[:-1] = (stream[1:] != stream[:-1]) | (onset[1:] != onset[:-1])
+        stream, pitch, score = stream[top], pitch[top], score[top]
+
+        follows = stream[1:] == stream[:-1]
+        steps = np.clip(pitch[1:] - pitch[:-1], -self.max_interval, self.max_interval)[follows] + self.max_interval
+        return self._normalize_(np.bincount(score[1:][follows] * bins + steps, minlength=count * bins)
+                                .reshape(count, bins).astype(np.float64))
+
+    def _durations_(self, score: np.ndarray, quarters: np.ndarray, count: int) -> np.ndarray:
+        low, high = self.duration_range
+        bins = high - low + 1
+        exponent = np.clip(np.rint(np.log2(np.maximum(quarters, 2.0 ** (low - 1)))), low, high).astype(np.int64) - low
+        return self._normalize_(np.bincount(score * bins + exponent, minlength=count * bins)
+                                .reshape(count, bins).astype(np.float64))
+
+    def _measure_notes_(self, score: np.ndarray, measure: np.ndarray, tables: list[NoteTable]) -> np.ndarray:
+        """
+        Mean, deviation, and maximum of notes per measure, counting measures without notes, up to the last with one
+        """
+        measures = np.array([int(table.measure.max(initial=-1)) + 1 for table in tables], dtype=np.int64)
+        first = np.cumsum(measures) - measures
+        per_measure = np.bincount(first[score] + measure, minlength=int(measures.sum())).astype(np.float64)
+
+        owner = np.repeat(np.arange(len(tables)), measures)
+        safe = np.maximum(measures, 1)
+        mean = np.bincount(owner, per_measure, len(tables)) / safe
+        variance = np.bincount(owner, (per_measure - mean[owner]) ** 2, len(tables)) / safe
+        maximum = np.zeros(len(tables))
+        np.maximum.at(maximum, owner, per_measure)
+        return np.column_stack([mean, np.sqrt(variance), maximum])
+
+    def _pitch_range_(self, score: np.ndarray, pitch: np.ndarray, count: int) -> np.ndarray:
+        notes = np.bincount(score, minlength=count)
+        low, high = np.full(count, 128), np.full(count, -1)
+        np.minimum.at(low, score, pitch)
+        np.maximum.at(high, score, pitch)
+        low, high = np.where(notes > 0, low, 0), np.where(notes > 0, high, 0)
+        mean = np.bincount(score, pitch, count) / np.maximum(notes, 1)
+        return np.column_stack([low, high, high - low, mean]).astype(np.float64)
+
+    def _polyphony_(self,
+                    score: np.ndarray,
+                    onset: np.ndarray,
+                    duration: np.ndarray,
+                    resolution: np.ndarray,
+                    count: int) -> np.ndarray:
+        """
+        Counts notes sounding between successive note starts and ends, a running sum over the sorted events
+        """
+        time = np.concatenate([onset, onset + duration])
+        change = np.concatenate([np.ones(len(onset), dtype=np.int64), -np.ones(len(onset), dtype=np.int64)])
+        owner = np.concatenate([score, score])
+        # Ends sort before starts at the same time, so notes that merely touch never count as overlapping
+        order = np.lexsort((change, time, owner))
+        time, change, owner = time[order], change[order], owner[order]
+
+        sounding = np.cumsum(change)
+        span = np.zeros(len(time))
+        span[:-1] = np.where(owner[1:] == owner[:-1], time[1:] - time[:-1], 0)
+        span /= resolution[owner]
+
+        weighted = np.bincount(owner, span * sounding, count)
+        active = np.bincount(owner, span * (sounding > 0), count)
+        maximum = np.zeros(count)
+        np.maximum.at(maximum, owner, sounding)
+        return np.column_stack([weighted / np.where(active > 0, active, 1), maximum])
+
+    @staticmethod
+    def _normalize_(histogram: np.ndarray) -> np.ndarray:
+        total = histogram.sum(axis=1, keepdims=True)
+        return histogram / np.where(total > 0, total, 1)
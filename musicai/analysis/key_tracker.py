@@ -0,0 +1,156 @@
+"""
+Local key detection over sliding windows of a score
+"""
+from typing import Union
+
+import numpy as np
+
+from util import LookupEnum
+from structure.key import Key
+from structure.note_table import NoteTable
+
+
+# ---------------
+# WindowUnit enum
+# ---------------
+class WindowUnit(LookupEnum):
+    """
+    Enum to represent what KeyTracker windows are counted in
+    """
+    MEASURES = 'measures'
+    BEATS = 'beats'  # Quarter notes
+
+    def __str__(self) -> str:
+        return self.value
+
+
+# ----------------
+# KeyTracker class
+# ----------------
+class KeyTracker:
+    """
+    Class to find the key of every window of a score with the Krumhansl-Schmuckler algorithm, as Key.find_key does
+    for a single histogram. Windows are window units long and start every hop units, the last ones running short at
+    the end of the score.
+
+    How long each pitch class has sounded up to every window edge is found at once, by NoteTable.cumulative_chroma(),
+    so each window's duration-weighted histogram is a single subtraction. The windows are then z-scored together and
+    correlated against all 24 of Key.KEY_PROFILES in one matrix product.
+
+    tracker = KeyTracker(window=4, hop=1)
+    starts, ends, keys, confidence = tracker.track_score(score)
+    print([Key.profile_key(key) for key in keys])
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 window: Union[int, np.integer] = 4,
+                 hop: Union[int, np.integer] = 1,
+                 unit: WindowUnit = WindowUnit.MEASURES):
+        """
+        :param window: Length of a window, in units
+        :param hop: Units from the start of one window to the next
+        :param unit: Whether windows are counted in measures or beats
+        """
+        if window <= 0 or hop <= 0:
+            raise ValueError(f'Windows need a positive length and hop, not {window} and {hop}.')
+        self.window = int(window)
+        self.hop = int(hop)
+        self.unit = WindowUnit(unit)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} window={self.window} hop={self.hop} {self.unit}>'
+
+    # -------
+    # Methods
+    # -------
+    def track(self,
+              table: NoteTable,
+              measure_starts: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the key of every window of a score
+
+        :param table: The NoteTable of the score
+        :param measure_starts: Onset of each measure, in ticks of the table, when windows are counted in measures
+        :return: Start and end of each window in ticks; the row of Key.KEY_PROFILES best matching it, or -1 where
+            nothing sounds; and how well, as the correlation between the two
+        """
+        edges = self._edges_(table, measure_starts)
+        units = len(edges) - 1
+        first = np.arange(0, max(units, 1), self.hop)
+        last = np.minimum(first + self.window, units)
+
+        sounded = table.cumulative_chroma(edges)
+        histograms = (sounded[:, last] - sounded[:, first]).T.astype(np.float64)
+        keys, confidence = self.correlate(histograms)
+        return edges[first], edges[last], keys, confidence
+
+    def track_score(self, score) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the key of every window of a Score, taking measures from its first staff
+
+        :param score: The Score, whose timeline is updated first if it has none
+        :return: As track()
+        """
+        table = NoteTable.from_score(score)
+        parts = [part for system in score.systems for part in system.parts]
+        measures = parts[0].measures if len(parts) > 0 else []
+        return self.track(table, np.array([measure.tick_onset for measure in measures], dtype=np.int64))
+
+    def _edges_(self, table: NoteTable, measure_starts: np.ndarray | None) -> np.ndarray:
+        """
+        Every unit boundary from the start of the score to its end, the end included
+        """
+        end = max(table.end, int((table.onset + table.duration).max(initial=0)))
+        if self.unit is WindowUnit.BEATS:
+            starts = np.arange(0, end, table.resolution, dtype=np.int64)
+        elif measure_starts is None:
+            raise ValueError('Windows counted in measures need the onset of each measure.')
+        else:
+            starts = np.asarray(measure_starts, dtype=np.int64)
+        return np.unique(np.concatenate([[0], starts[starts < end], [end]]))
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def correlate(cls, histograms: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Matches many pitch class histograms against every key profile at once
+
+        :param histograms: An array of shape (windows, 12)
+        :return: The best matching row of Key.KEY_PROFILES for each histogram, or -1 for a flat one, and the
+            correlation with it
+        """
+        centred = histograms - histograms.mean(axis=1, keepdims=True)
+        deviation = centred.std(axis=1, keepdims=True)
+        flat = deviation[:, 0] == 0
+        correlation = (centred / np.where(flat[:, np.newaxis], 1, deviation)) @ Key.KEY_PROFILES.T / 12
+
+        keys = np.where(flat, -1, np.argmax(correlation, axis=1))
+        confidence = np.where(flat, 0.0, correlation.max(axis=1, initial=-1))
+        return keys, confidence
+
+    @classmethod
+    def segment(cls,
+                starts: np.ndarray,
+                ends: np.ndarray,
+                keys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Joins runs of windows in the same key into segments. A segment lasts from its first window's start to the
+        next segment's, so overlapping windows give segments that do not overlap
+
+        :param starts: Start of each window, as from track()
+        :param ends: End of each window
+        :param keys: Key of each window
+        :return: Start, end, and key of each segment
+        """
+        if len(keys) == 0:
+            return starts, ends, keys
+        first = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+        return starts[first], np.append(starts[first[1:]], ends[-1]), keys[first]
@@ -0,0 +1,269 @@
+"""
+On-disk inverted index of melodic n-grams, for finding motifs across a corpus
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import warnings
+from fractions import Fraction
+from typing import NamedTuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from fileio.mxml import MusicXML
+from structure.note_table import NoteTable
+from structure.score import Score
+
+
+# ----------------
+# MotifMatch tuple
+# ----------------
+class MotifMatch(NamedTuple):
+    """
+    Where a motif was found: the first note of the match
+    """
+    path: str
+    part: int  # Counting the parts of every part system from the top of the score
+    staff: int  # 0 is the part's primary staff
+    measure: int  # Index of the measure in its staff
+    offset: Fraction  # From the start of the measure, in quarter notes
+
+
+# ----------------
+# MotifIndex class
+# ----------------
+class MotifIndex:
+    """
+    Class to index the melodic n-grams of many scores in a SQLite database, and to search them for motifs.
+
+    Each staff of each part is one voice, whose melody is its highest note at each onset. Every run of n successive
+    notes of a voice is stored once, under three keys: its pitches, its intervals, for searches in any
+    transposition, and its rhythm, the quarter notes from each onset to the next. Each key has its own index, so a
+    search looks up its n-grams rather than reading every score. A motif longer than n is looked up by n-grams
+    along its length, and kept where they line up; a shorter one by the n-grams it begins.
+
+    Files are added one at a time and committed as they are, so the index grows with the corpus; adding a file
+    again replaces its n-grams if it has changed since.
+
+    with MotifIndex('motifs.db') as index:
+        index.add_files(glob.glob('scores/*.musicxml'))
+        matches = index.search(pitches=[67, 67, 67, 63])
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, path: str, n: Union[int, np.integer] = 4):
+        """
+        :param path: The database file, made if missing
+        :param n: Notes per n-gram; an existing index keeps the n it was made with
+        """
+        if n < 2:
+            raise ValueError(f'Melodic n-grams need at least two notes, not {n}.')
+        self.path = path
+        self._connection_ = sqlite3.connect(path)
+        self._connection_.executescript('''
+            CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value INTEGER);
+            CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, modified REAL);
+            CREATE TABLE IF NOT EXISTS grams (file INTEGER, part INTEGER, staff INTEGER, position INTEGER,
+                                              measure INTEGER, offset TEXT, pitches TEXT, intervals TEXT,
+                                              rhythm TEXT);
+            CREATE INDEX IF NOT EXISTS grams_pitches ON grams (pitches);
+            CREATE INDEX IF NOT EXISTS grams_intervals ON grams (intervals);
+            CREATE INDEX IF NOT EXISTS grams_rhythm ON grams (rhythm);
+            CREATE INDEX IF NOT EXISTS grams_file ON grams (file);
+        ''')
+        self._connection_.execute('INSERT OR IGNORE INTO settings VALUES (?, ?)', ('n', int(n)))
+        self._connection_.commit()
+        self.n: int = self._connection_.execute("SELECT value FROM settings WHERE name = 'n'").fetchone()[0]
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return self._connection_.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.path} n={self.n} files={len(self)}>'
+
+    def __enter__(self) -> 'MotifIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def paths(self) -> list[str]:
+        """
+        Every file in the index
+        """
+        return [row[0] for row in self._connection_.execute('SELECT path FROM files ORDER BY id')]
+
+    # -------
+    # Methods
+    # -------
+    def add(self, path: str, score: Score | None = None) -> bool:
+        """
+        Indexes a file, replacing what was indexed for it before
+
+        :param path: Path of the MusicXML file, under which matches are reported
+        :param score: The file's Score, if already loaded. Without one, the file is loaded only when it has changed
+            since it was indexed
+        :return: Whether the file was indexed, rather than found unchanged
+        """
+        modified = os.path.getmtime(path) if os.path.exists(path) else None
+        row = self._connection_.execute('SELECT id, modified FROM files WHERE path = ?', (path,)).fetchone()
+        if score is None and row is not None and modified is not None and row[1] == modified:
+            return False
+        if score is None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                score = MusicXML.load(path)
+
+        with self._connection_:
+            if row is not None:
+                self._connection_.execute('DELETE FROM grams WHERE file = ?', (row[0],))
+                self._connection_.execute('UPDATE files SET modified = ? WHERE id = ?', (modified, row[0]))
+                file = row[0]
+            else:
+                file = self._connection_.execute('INSERT INTO files (path, modified) VALUES (?, ?)',
+                                                 (path, modified)).lastrowid
+            self._connection_.executemany('INSERT INTO grams VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                          ((file,) + gram for gram in self._grams_(score)))
+        return True
+
+    def add_files(self, paths: list[str]) -> int:
+        """
+        Indexes many files, skipping those unchanged since they were indexed, and warning of those that fail to load
+
+        :return: How many files were indexed
+        """
+        added = 0
+        for path in paths:
+            try:
+                added += self.add(path)
+            except Exception as error:
+                warnings.warn(f'Unable to index {path}: {error!r}')
+        return added
+
+    def remove(self, path: str) -> None:
+        """
+        Takes a file out of the index
+        """
+        with self._connection_:
+            row = self._connection_.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+            if row is not None:
+                self._connection_.execute('DELETE FROM grams WHERE file = ?', (row[0],))
+                self._connection_.execute('DELETE FROM files WHERE id = ?', (row[0],))
+
+    def search(self,
+               pitches: list[int] | None = None,
+               rhythm: list[Union[int, float, Fraction]] | None = None,
+               transpose: bool = True) -> list[MotifMatch]:
+        """
+        Finds a motif by its pitches, its rhythm, or both
+
+        :param pitches: MIDI pitch of each note of the motif
+        :param rhythm: Quarter notes from each onset of the motif to the next, one fewer than its notes
+        :param transpose: Whether the pitches match in any transposition, rather than only as given
+        :return: Where each match starts, in the order of the index
+        """
+        if pitches is None and rhythm is None:
+            raise ValueError('A motif needs pitches, a rhythm, or both.')
+        if pitches is not None and rhythm is not None and len(rhythm) != len(pitches) - 1:
+            raise ValueError(f'A rhythm of {len(pitches)} notes has {len(pitches) - 1} onset steps, not '
+                             f'{len(rhythm)}.')
+        notes = len(pitches) if pitches is not None else len(rhythm) + 1
+        if notes < 2:
+            raise ValueError('A motif needs at least two notes.')
+
+        def keys(start: int) -> list[tuple[str, str]]:
+            end = start + min(self.n, notes)
+            found = []
+            if pitches is not None:
+                found.append(('intervals', np.diff(pitches[start:end])) if transpose else
+                             ('pitches', pitches[start:end]))
+            if rhythm is not None:
+                found.append(('rhythm', [Fraction(step) for step in rhythm[start:end - 1]]))
+            return [(column, MotifIndex._key_(values)) for column, values in found]
+
+        # n-grams from every n - 1 notes, and one ending at the motif's last note, overlap the whole motif
+        starts = sorted(set(range(0, max(notes - self.n, 0) + 1, self.n - 1)) | {max(notes - self.n, 0)})
+        found = None
+        for start in starts:
+            rows = self._lookup_(keys(start), prefix=notes < self.n)
+            places = {(file, part, staff, position - start): (measure, offset)
+                      for file, part, staff, position, measure, offset in rows}
+            found = places if found is None else {place: found[place] for place in found if place in places}
+
+        paths = dict(self._connection_.execute('SELECT id, path FROM files'))
+        return [MotifMatch(paths[file], part, staff, measure, Fraction(offset))
+                for (file, part, staff, position), (measure, offset) in sorted(found.items())]
+
+    def close(self) -> None:
+        self._connection_.close()
+
+    def _lookup_(self, keys: list[tuple[str, str]], prefix: bool) -> list[tuple]:
+        """
+        Returns the n-grams matching every key, or beginning with every key when the motif is shorter than n
+        """
+        conditions, values = [], []
+        for column, key in keys:
+            if prefix:
+                # Keys that go on past this one continue with a comma; ',' + 1 is '-'
+                conditions.append(f'{column} >= ? AND {column} < ?')
+                values += [key + ',', key + '-']
+            else:
+                conditions.append(f'{column} = ?')
+                values.append(key)
+        return self._connection_.execute('SELECT file, part, staff, position, measure, offset FROM grams WHERE '
+                                         + ' AND '.join(conditions), values).fetchall()
+
+    def _grams_(self, score: Score):
+        """
+        Yields the (part, staff, position, measure, offset, pitches, intervals, rhythm) of every n-gram of a score
+        """
+        table = NoteTable.from_score(score)
+        parts = [part for system in score.systems for part in system.parts]
+        staves = max((len(part.staves) for part in parts), default=1)
+
+        # Onset of every measure of every staff, in one array, with where each staff's measures begin
+        measure_onsets = [[measure.tick_onset for measure in measure_list]
+                          for part in parts for measure_list in part.staves + [[]] * (staves - len(part.staves))]
+        first_measure = np.cumsum([0] + [len(onsets) for onsets in measure_onsets])
+        measure_onsets = np.array([onset for onsets in measure_onsets for onset in onsets], dtype=np.int64)
+
+        # The highest note of each onset of each staff
+        stream = table.part.astype(np.int64) * staves + table.staff
+        order = np.lexsort((table.pitch, table.onset, stream))
+        top = np.ones(len(order), dtype=bool)
+        top[:-1] = (stream[order][1:] != stream[order][:-1]) | (table.onset[order][1:] != table.onset[order][:-1])
+        order = order[top]
+        stream, onset, pitch, measure = stream[order], table.onset[order], table.pitch[order], table.measure[order]
+        if len(order) < self.n:
+            return
+
+        position = np.arange(len(order)) - np.searchsorted(stream, stream)
+        offset = onset - measure_onsets[first_measure[stream] + measure]
+        # Runs of n notes within one staff
+        starts = np.flatnonzero(stream[:len(order) - self.n + 1] == stream[self.n - 1:])
+        pitch_windows = sliding_window_view(pitch.astype(np.int64), self.n)[starts]
+        onset_windows = sliding_window_view(onset, self.n)[starts]
+
+        resolution = table.resolution
+        for index, pitches, onsets in zip(starts.tolist(), pitch_windows, onset_windows):
+            yield (int(stream[index] // staves), int(stream[index] % staves), int(position[index]),
+                   int(measure[index]), str(Fraction(int(offset[index]), resolution)),
+                   MotifIndex._key_(pitches), MotifIndex._key_(np.diff(pitches)),
+                   MotifIndex._key_([Fraction(int(step), resolution) for step in np.diff(onsets)]))
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def _key_(cls, values) -> str:
+        return ','.join(str(value) for value in values)
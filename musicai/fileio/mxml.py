@@ -10,6 +10,7 @@ from structure.note_mark import StemType, Beam, BeamType, TieType, ArticulationT
 from structure.clef import Clef, ClefOctave, ClefType
 from structure.key import ModeType, KeyType, Key
 from structure.lyric import Lyric, SyllabicType
+from structure.mark_index import MarkInterval
 from structure.measure import Measure, Barline, BarlineType, BarlineLocation, Transposition
 from structure.measure_mark import MeasureMark, InstantaneousMeasureMark, DynamicMark, DynamicType
 from structure.note import NoteType, Ratio, NoteValue, Rest, Note, NoteGroup
@@ -50,35 +51,11 @@ class MXMLConversion:
 
         # 'if' instead of 'elif' here is purposeful--Barline leads into BarlineType
         if isinstance(value, BarlineType):
-            match value:
-                case BarlineType.NONE:
-                    return 'none'
-                case BarlineType.SHORT:
-                    return 'short'
-                case BarlineType.TICK:
-                    return 'tick'
-                case BarlineType.REGULAR:
-                    return 'regular'
-                case BarlineType.DOUBLE:
-                    return 'light-light'
-                case BarlineType.FINAL:
-                    return 'light-heavy'
-                case BarlineType.REVERSE_FINAL:
-                    return 'heavy-light'
-                case BarlineType.HEAVY:
-                    return 'heavy'
-                case BarlineType.DOUBLE_HEAVY:
-                    return 'heavy-heavy'
-                case BarlineType.DASHED:
-                    return 'dashed'
-                case BarlineType.DOTTED:
-                    return 'dotted'
-                case BarlineType.INVISIBLE:
-                    return 'none'
-                case _:
-                    warnings.warn(f'Barline {value} has a value invalid with mxml. Defaulting to invisible barline.',
-                                  stacklevel=2)
-                    return 'none'
+            if (bar_style := value.to_mxml()) == '':
+                warnings.warn(f'Barline {value} has a value invalid with mxml. Defaulting to invisible barline.',
+                              stacklevel=2)
+                return 'none'
+            return bar_style
 
         else:
             raise TypeError(
@@ -156,31 +133,12 @@ class MXMLConversion:
         if not isinstance(value, str):
             return BarlineType.NONE
 
-        match value:
-            case 'dashed':
-                return BarlineType.DASHED
-            case 'dotted':
-                return BarlineType.DOTTED
-            case 'heavy':
-                return BarlineType.HEAVY
-            case 'heavy-heavy':
-                return BarlineType.DOUBLE_HEAVY
-            case 'heavy-light':
-                return BarlineType.REVERSE_FINAL
-            case 'light-heavy':
-                return BarlineType.FINAL
-            case 'light-light':
-                return BarlineType.DOUBLE
-            case 'none':
-                return BarlineType.NONE
-            case 'regular':
-                return BarlineType.REGULAR
-            case 'short':
-                return BarlineType.SHORT
-            case 'tick':
-                return BarlineType.TICK
-            case _:
-                return BarlineType.NONE
+        if value == 'heavy-light':
+            # REVERSE_FINAL shares its value with FINAL, so it is an alias with no bar-style of its own
+            return BarlineType.REVERSE_FINAL
+
+        barlinetype = BarlineType.by_mxml(value)
+        return BarlineType.NONE if barlinetype is None else barlinetype
 
     @classmethod
     def barlinelocation_from_str(cls, value: str) -> BarlineLocation:
@@ -350,46 +308,7 @@ class MXMLConversion:
             value = value.get_ratiod_notetype()
 
         if isinstance(value, NoteType):
-            match value:
-                # Allowed mxml values
-                case NoteType.ONE_THOUSAND_TWENTY_FOURTH:
-                    return '1024th'
-                case NoteType.FIVE_HUNDRED_TWELFTH:
-                    return '512th'
-                case NoteType.TWO_FIFTY_SIXTH:
-                    return '256th'
-                case NoteType.ONE_TWENTY_EIGHTH:
-                    return '128th'
-                case NoteType.SIXTY_FOURTH:
-                    return '64th'
-                case NoteType.THIRTY_SECOND:
-                    return '32nd'
-                case NoteType.SIXTEENTH:
-                    return '16th'
-                case NoteType.EIGHTH:
-                    return 'eighth'
-                case NoteType.QUARTER:
-                    return 'quarter'
-                case NoteType.HALF:
-                    return 'half'
-                case NoteType.WHOLE:
-                    return 'whole'
-                case NoteType.DOUBLE:
-                    return 'breve'
-                case NoteType.LONG:
-                    return 'long'
-                case NoteType.LARGE:
-                    return 'maxima'
-
-                # Unallowed mxml values
-                case NoteType.TWO_THOUSAND_FORTY_EIGHTH:
-                    return '2048th'
-                case NoteType.FOUR_THOUSAND_NINETY_SIXTH:
-                    return '4096th'
-
-                # Default value is nothing
-                case _:
-                    return ''
+            return value.to_mxml()
 
         else:
             raise TypeError(
@@ -451,9 +370,8 @@ class MXMLConversion:
         if not isinstance(stem_elem, ET.Element):
             return StemType.UP
 
-        if stem_elem.text.upper() in [st.name for st in StemType]:
-            # print(f'-!-!-Made Stemtype{StemType[stem_elem.text.upper()].name} from text {stem_elem.text}!')
-            return StemType[stem_elem.text.upper()]
+        if (stemtype := StemType.by_name(stem_elem.text)) is not None:
+            return stemtype
         else:
             raise ValueError(
                 f'Cannot make a stem from stemtype {stem_elem.text}.')
@@ -487,12 +405,10 @@ class MXMLConversion:
         :return:
         """
 
-        bt_name = beam_elem.text.replace(' ', '_').upper()
-
-        if bt_name not in [bt_enum.name for bt_enum in BeamType]:
+        bt = BeamType.by_name(beam_elem.text.replace(' ', '_'))
+        if bt is None:
             return None
 
-        bt = BeamType[bt_name]
         b_num = beam_elem.get('number')
 
         if b_num is not None:
@@ -532,8 +448,8 @@ class MXMLConversion:
         if notehead_name == 'X':
             return Notehead(notehead_type=NoteheadType.CROSSHEAD)
 
-        elif notehead_name in [nht.name for nht in NoteheadType]:
-            return Notehead(notehead_type=NoteheadType[notehead_name])
+        elif (notehead_type := NoteheadType.by_name(notehead_name)) is not None:
+            return Notehead(notehead_type=notehead_type)
 
         else:
             raise ValueError(
@@ -653,8 +569,8 @@ class MXMLConversion:
                           f'HairpinType.STANDARD', stacklevel=2)
             return HairpinType.STANDARD
 
-        if xml_numeric in [ht.value for ht in HairpinType]:
-            return HairpinType(xml_numeric)
+        if (hairpin_type := HairpinType.by_value(xml_numeric)) is not None:
+            return hairpin_type
 
         else:
             warnings.warn(f'Cannot make a HairpinType from xml attribute of value {xml_numeric}. Defaulting to '
@@ -1069,6 +985,10 @@ class MusicXML:
             new_score.set_part_by_mxml_index(
                 MusicXML._load_part(part_elem, to_load), part_index)
 
+        # Places every note and measure mark on the score's integer tick timeline
+        new_score.update_timeline()
+        new_score.update_accidentals()
+
         return new_score
 
     @classmethod
@@ -1141,95 +1061,97 @@ class MusicXML:
             else:
                 raise ImportError('No initial divisions value found')
 
-        current_measure = 0
-        for measure_elem in part_item:
-            if measure_elem.tag != 'measure':
-                raise NotImplementedError(
-                    f'The non-measure element {measure_elem.tag} is under the Parts element')
-
-            # For every staff
-            # Staff must be incremented sometimes because mxml begins staff index at 1, not 0
-            for staff in range(staff_count):
-
-                initial_m = Measure(time=prev_measure[staff].time, key=prev_measure[staff].key,
-                                    clef=prev_measure[staff].clef)
-                initial_m.transposition = prev_measure[staff].transposition
-
-                # Returns the MEASURE and the running list of MEASURE MARKS
-                loaded_measure = MusicXML._load_measure(measure_elem,
-                                                        initial_m,
-                                                        prev_measure[staff].divisions,
-                                                        current_measure,
-                                                        prev_measure[staff].measure_marks,
-                                                        staff=(staff + 1))
-                prev_measure[staff].measure_marks = loaded_measure[1]
-
-                loaded_part.append(loaded_measure[0], staff + 1)
-
-                # Updates the divisions amount if applicable
-                for attribute_element in measure_elem.findall('attributes'):
-                    if attribute_element.find('divisions') is not None:
-                        prev_measure[staff].divisions = int(
-                            attribute_element.find('divisions').text)
-
-                # UPDATE THE RUNNING TIME SIGNATURE OR THE NEW MEASURE
-                if loaded_measure[0].time is not None:
-                    prev_measure[staff].time = loaded_measure[0].time
-                else:
-                    loaded_measure[0].time = prev_measure[staff].time
-
-                # UPDATE THE RUNNING KEY OR THE NEW MEASURE
-                if loaded_measure[0].key is not None:
-                    prev_measure[staff].key = loaded_measure[0].key
-                else:
-                    loaded_measure[0].key = prev_measure[staff].key
-
-                # UPDATE THE RUNNING CLEF OR THE NEW MEASURE
-                if loaded_measure[0].clef is not None:
-                    prev_measure[staff].clef = loaded_measure[0].clef
-                else:
-                    loaded_measure[0].clef = prev_measure[staff].clef
+        # Barlines are updated once the whole part is built
+        with loaded_part.bulk():
+            current_measure = 0
+            for measure_elem in part_item:
+                if measure_elem.tag != 'measure':
+                    raise NotImplementedError(
+                        f'The non-measure element {measure_elem.tag} is under the Parts element')
+
+                # For every staff
+                # Staff must be incremented sometimes because mxml begins staff index at 1, not 0
+                for staff in range(staff_count):
+
+                    initial_m = Measure(time=prev_measure[staff].time, key=prev_measure[staff].key,
+                                        clef=prev_measure[staff].clef)
+                    initial_m.transposition = prev_measure[staff].transposition
+
+                    # Returns the MEASURE and the running list of MEASURE MARKS
+                    loaded_measure = MusicXML._load_measure(measure_elem,
+                                                            initial_m,
+                                                            prev_measure[staff].divisions,
+                                                            current_measure,
+                                                            prev_measure[staff].measure_marks,
+                                                            staff=(staff + 1))
+                    prev_measure[staff].measure_marks = loaded_measure[1]
+
+                    loaded_part.append(loaded_measure[0], staff + 1)
+
+                    # Updates the divisions amount if applicable
+                    for attribute_element in measure_elem.findall('attributes'):
+                        if attribute_element.find('divisions') is not None:
+                            prev_measure[staff].divisions = int(
+                                attribute_element.find('divisions').text)
+
+                    # UPDATE THE RUNNING TIME SIGNATURE OR THE NEW MEASURE
+                    if loaded_measure[0].time is not None:
+                        prev_measure[staff].time = loaded_measure[0].time
+                    else:
+                        loaded_measure[0].time = prev_measure[staff].time
 
-                # UPDATE THE RUNNING TRANSPOSITION OR THE NEW MEASURE
-                if loaded_measure[0].transposition is not None:
-                    prev_measure[staff].transposition = loaded_measure[0].transposition
-                else:
+                    # UPDATE THE RUNNING KEY OR THE NEW MEASURE
+                    if loaded_measure[0].key is not None:
+                        prev_measure[staff].key = loaded_measure[0].key
+                    else:
+                        loaded_measure[0].key = prev_measure[staff].key
 
-                    if prev_measure[staff].transposition is None:
-                        loaded_measure[0].transposition = Transposition()
+                    # UPDATE THE RUNNING CLEF OR THE NEW MEASURE
+                    if loaded_measure[0].clef is not None:
+                        prev_measure[staff].clef = loaded_measure[0].clef
                     else:
-                        loaded_measure[0].transposition = prev_measure[staff].transposition
+                        loaded_measure[0].clef = prev_measure[staff].clef
 
-                # Implement every completed measure mark:
-                # TODO: Set this up so it appends to staff-specific measure mark lists
+                    # UPDATE THE RUNNING TRANSPOSITION OR THE NEW MEASURE
+                    if loaded_measure[0].transposition is not None:
+                        prev_measure[staff].transposition = loaded_measure[0].transposition
+                    else:
 
-                for mm in prev_measure[staff].measure_marks:
-                    # A non-InstantaneousMeasureMark is completed if it's end_point is not 0
-                    # TODO: What if the measure mark ends at 0 on the next measure? This doesn't work then
-                    if mm is not InstantaneousMeasureMark and mm.end_point != 0:
+                        if prev_measure[staff].transposition is None:
+                            loaded_measure[0].transposition = Transposition()
+                        else:
+                            loaded_measure[0].transposition = prev_measure[staff].transposition
 
-                        if mm.measure_index < len(loaded_part.measures):
-                            print(
-                                f'MM starting at {mm.start_point}, ending at '
-                                f'{mm.end_point}, with measure_span {mm.measure_span} has been added to measure '
-                                f'{mm.measure_index}!')
+                    # Implement every completed measure mark:
+                    # TODO: Set this up so it appends to staff-specific measure mark lists
 
-                            # Append the MeasureMark to the part's measure
-                            loaded_part.measures[mm.measure_index].measure_marks.append(
-                                mm)
-                            # Remove this MeasureMark from the running-total list of measure marks
-                            prev_measure[staff].measure_marks.remove(mm)
+                    for mm in prev_measure[staff].measure_marks:
+                        # A non-InstantaneousMeasureMark is completed if it's end_point is not 0
+                        # TODO: What if the measure mark ends at 0 on the next measure? This doesn't work then
+                        if mm is not InstantaneousMeasureMark and mm.end_point != 0:
 
-                # MeasureMarks that have not been resolved yet are noted to span for +1 measure
-                for mm in prev_measure[staff].measure_marks:
-                    if isinstance(mm, MeasureMark):
-                        print(f'incrementing measure span for {mm}')
-                        mm.measure_span += 1
+                            if mm.measure_index < len(loaded_part.measures):
+                                print(
+                                    f'MM starting at {mm.start_point}, ending at '
+                                    f'{mm.end_point}, with measure_span {mm.measure_span} has been added to measure '
+                                    f'{mm.measure_index}!')
+
+                                # Append the MeasureMark to the part's measure
+                                loaded_part.measures[mm.measure_index].measure_marks.append(
+                                    mm)
+                                # Remove this MeasureMark from the running-total list of measure marks
+                                prev_measure[staff].measure_marks.remove(mm)
+
+                    # MeasureMarks that have not been resolved yet are noted to span for +1 measure
+                    for mm in prev_measure[staff].measure_marks:
+                        if isinstance(mm, MeasureMark):
+                            print(f'incrementing measure span for {mm}')
+                            mm.measure_span += 1
 
-                print(
-                    f'\nCurrent persisting MeasureMarks: {prev_measure[staff].measure_marks}\n')
+                    print(
+                        f'\nCurrent persisting MeasureMarks: {prev_measure[staff].measure_marks}\n')
 
-            current_measure += 1
+                current_measure += 1
 
         # At the end of the constructed part:
         # Unresolved MeasureMarks are now wrapped up, with their end being at the score-end
@@ -1511,6 +1433,8 @@ class MusicXML:
                                         for dynamic_mark in \
                                                 MXMLConversion.dynamic_marks_from_elem(dir_type,
                                                                                        current_musical_location):
+                                            # start_point is counted in this measure's divisions
+                                            dynamic_mark.divisions = divisions
                                             measure.measure_marks.append(
                                                 dynamic_mark)
 
@@ -1989,8 +1913,8 @@ class MusicXML:
             old_st_clef = None
             if m_index != 0:
                 old_st_clef = copy.deepcopy(
-                    part.multi_staves[staff][m_index - 1].clef)
-            new_st_clef = copy.deepcopy(part.multi_staves[staff][m_index]).clef
+                    part.staves[staff + 1][m_index - 1].clef)
+            new_st_clef = copy.deepcopy(part.staves[staff + 1][m_index]).clef
 
             # If new clef is unequal to previous:
             if m_index == 0 or not new_st_clef.is_equivilant(old_st_clef):
@@ -2034,9 +1958,9 @@ class MusicXML:
             old_transpose = Transposition()
             if m_index != 0:
                 old_transpose = copy.deepcopy(
-                    part.multi_staves[staff][m_index - 1].transposition)
+                    part.staves[staff + 1][m_index - 1].transposition)
             new_tranpose = copy.deepcopy(
-                part.multi_staves[staff][m_index]).transposition
+                part.staves[staff + 1][m_index]).transposition
 
             # If new tranposition is unequal to previous:
             first_irregular_trans = m_index == 0 and not new_tranpose.is_equivilant(
@@ -2133,7 +2057,11 @@ class MusicXML:
         return notat_elem
 
     @classmethod
-    def _save_note(cls, saved_note: Note, staff: int = 1, voice: int = 1) -> ET.Element:
+    def _save_note(cls,
+                   saved_note: Note,
+                   staff: int = 1,
+                   voice: int = 1,
+                   accidentals: dict | None = None) -> ET.Element:
         """
         Returns a <note> element used in <measure>. This is based on the passed in note and staff line.
 
@@ -2142,6 +2070,7 @@ class MusicXML:
 
         :param saved_note:
         :param staff: Represents which staff the note starts one, and starts at 1
+        :param accidentals: The accidentals shown, as returned by Score.displayed_accidentals()
         :return:
         """
 
@@ -2218,6 +2147,14 @@ class MusicXML:
             for n in range(saved_note.get_dot_count()):
                 ET.SubElement(note_elem, 'dot')
 
+        # ACCIDENTAL, as decided by Score.displayed_accidentals()
+        if accidentals is not None and id(saved_note) in accidentals:
+            accidental, cautionary = accidentals[id(saved_note)]
+            accidental_elem = ET.SubElement(note_elem, 'accidental')
+            accidental_elem.text = accidental.to_mxml()
+            if cautionary:
+                accidental_elem.attrib['cautionary'] = 'yes'
+
         # TIME MODIFICATION
         if not saved_note.value.ratio.is_regular():
             note_elem.append(MXMLConversion.ratio_to_elem(saved_note))
@@ -2251,7 +2188,11 @@ class MusicXML:
         return note_elem
 
     @classmethod
-    def _save_note_group(cls, saved_note: NoteGroup, staff: int = 1, voice: int = 1) -> list[ET.Element]:
+    def _save_note_group(cls,
+                         saved_note: NoteGroup,
+                         staff: int = 1,
+                         voice: int = 1,
+                         accidentals: dict | None = None) -> list[ET.Element]:
         """
         Returns a list of <note> elements used in <measure> which represents a chord, based on the passed in
         NoteGroup.
@@ -2261,6 +2202,7 @@ class MusicXML:
         :param saved_note:
         :param staff:
         :param voice:
+        :param accidentals: The accidentals shown, as returned by Score.displayed_accidentals()
         :return:
         """
 
@@ -2268,7 +2210,7 @@ class MusicXML:
 
         # Makes an element for every note
         for note in saved_note.notes:
-            note_elems.append(MusicXML._save_note(note, staff, voice))
+            note_elems.append(MusicXML._save_note(note, staff, voice, accidentals))
 
         # Adds the chord elements
         for i in range(len(note_elems)):
@@ -2287,7 +2229,81 @@ class MusicXML:
         return note_elems
 
     @classmethod
-    def _save_part(cls, part_elem: ET.Element, saved_part: Part, part_count: int) -> ET.Element:
+    def _save_measure_marks(cls,
+                            measure_elem: ET.Element,
+                            marks_to_start: list[MarkInterval],
+                            marks_to_end: list[MarkInterval],
+                            tick: int,
+                            staff: int = 0) -> None:
+        """
+        Adds <direction> elements to a measure for every opened mark which has ended by a tick, and then for every mark
+        which has started by it. Both lists are updated: started marks which need stopping are moved to marks_to_end.
+
+        :param measure_elem: The <measure> element to add to
+        :param marks_to_start: Marks of this measure and staff which have not been started yet, ordered by start
+        :param marks_to_end: Marks which have been started and not yet stopped
+        :param tick: Absolute tick of the part's timeline at which the directions are placed
+        :param staff: Starting at 0 to represent the primary staff
+        :return:
+        """
+        from structure.measure_mark import DynamicChangeMark
+
+        for interval in [interval for interval in marks_to_end if interval.end <= tick]:
+            MusicXML._save_measure_mark_direction(measure_elem, interval.mark, staff, stop=True)
+            marks_to_end.remove(interval)
+
+        while len(marks_to_start) > 0 and marks_to_start[0].start <= tick:
+            interval = marks_to_start.pop(0)
+            MusicXML._save_measure_mark_direction(measure_elem, interval.mark, staff)
+
+            # Only wedges need to be closed later on
+            if isinstance(interval.mark, DynamicChangeMark):
+                marks_to_end.append(interval)
+
+    @classmethod
+    def _save_measure_mark_direction(cls,
+                                     measure_elem: ET.Element,
+                                     mm: MeasureMark,
+                                     staff: int = 0,
+                                     stop: bool = False) -> ET.Element:
+        """
+        Adds a <direction> element starting, or stopping, a measure mark to a measure.
+
+        TODO: Add MeasureMark.to_mxml() to support the other types of measure marks
+
+        :param measure_elem: The <measure> element to add to
+        :param mm: The measure mark
+        :param staff: Starting at 0 to represent the primary staff
+        :param stop: Whether to stop the mark rather than start it
+        :return: The <direction> element
+        """
+        from structure.measure_mark import DynamicChangeMark
+
+        direction_elem = ET.SubElement(measure_elem, 'direction')
+        direction_type_elem = ET.SubElement(direction_elem, 'direction-type')
+
+        # INSTANTANEOUS MEASURE MARKS
+        if isinstance(mm, DynamicMark):
+            dyn = ET.SubElement(direction_type_elem, 'dynamics')
+            ET.SubElement(dyn, f'{mm.dynamic_type.abbr}')
+
+        # NON-INSTANTANEOUS MEASURE MARKS
+        elif isinstance(mm, DynamicChangeMark):
+            wedge_type = 'stop' if stop else MXMLConversion.mm_type_to_str(mm)
+            ET.SubElement(direction_type_elem, 'wedge', {'color': '#000000', 'type': wedge_type})
+
+        ET.SubElement(direction_elem, 'voice')
+        direction_elem.find('voice').text = f'{1}'
+        ET.SubElement(direction_elem, 'staff')
+        direction_elem.find('staff').text = f'{staff + 1}'
+        return direction_elem
+
+    @classmethod
+    def _save_part(cls,
+                   part_elem: ET.Element,
+                   saved_part: Part,
+                   part_count: int,
+                   accidentals: dict | None = None) -> ET.Element:
         """
         Returns a <part> element based on a passed in pre-existing <part> element, a MusicAI Part, and the part ID
         number.
@@ -2297,11 +2313,16 @@ class MusicXML:
         :param part_elem:
         :param saved_part:
         :param part_count: The Part ID number, e.g. "P3". No adjustment needed, it already starts at 1.
+        :param accidentals: The accidentals shown, as returned by Score.displayed_accidentals()
         :return:
         """
 
-        # Running total of measure marks, for all staves
-        s_measure_marks_to_end: list[list[MeasureMark]] = [
+        # Marks are placed by tick, so every note's tick offset is taken at the resolution the index was built with
+        mark_index = saved_part.mark_index
+        resolution = mark_index.resolution
+
+        # Hairpins which have been started and not yet stopped, for all staves
+        s_measure_marks_to_end: list[list[MarkInterval]] = [
             [] for x in range(0, saved_part.staff_count())]
 
         # FOR EVERY MEASURE
@@ -2328,10 +2349,7 @@ class MusicXML:
                     f'Measure {measure} has a left-sided barline that HAS NOT been represented!')
 
             # NOTES and MEASURE MARKS, for EVERY STAFF
-            for staff in range(saved_part.staff_count()):
-
-                # Gets THIS STAFF
-                staved_measure = saved_part.get_staff(staff)[measure_index]
+            for staff, staved_measure in enumerate(saved_part.column(measure_index)):
 
                 # Add backup element if this is a secondary-staff
                 if staff > 0:
@@ -2344,84 +2362,32 @@ class MusicXML:
                     new_measure_elem.find('backup').find(
                         'duration').text = str(backup_count)
 
-                current_musical_pos = 0
-                measure_marks_to_save = staved_measure.measure_marks.copy()
+                measure_start = staved_measure.tick_onset
+                measure_end = measure_start + staved_measure.tick_duration
+                marks_to_start = [interval for interval in mark_index.starting_between(measure_start, measure_end)
+                                  if interval.staff_index == staff]
+                note_ticks = [measure_start + offset for offset in staved_measure.tick_offsets(resolution)]
 
                 # FOR EVERY NOTE
-                for s_note in staved_measure.notes:
-
-                    # MAY NEED TO START A MEASURE MARK BEFORE THE NOTE
-                    for mm in measure_marks_to_save:
-                        if mm.start_point <= current_musical_pos:
-                            # Print the mark and remove it from the list
-                            direction_elem = ET.SubElement(
-                                new_measure_elem, 'direction')
-
-                            # TODO: Add MeasureMark.to_mxml() so multiple <direction>'s don't get made in a row
-
-                            # INSTANTANEOUS MEASURE MARKS
-                            from structure.measure_mark import DynamicMark, DynamicChangeMark
-                            if isinstance(mm, DynamicMark):
-                                ET.SubElement(direction_elem, 'direction-type')
-                                dyn = ET.SubElement(direction_elem.find(
-                                    'direction-type'), 'dynamics')
-                                ET.SubElement(dyn, f'{mm.dynamic_type.abbr}')
-
-                            # NON-INSTANTANEOUS MEASURE MARKS
-                            elif isinstance(mm, DynamicChangeMark):
-                                ET.SubElement(direction_elem, 'direction-type')
-                                ET.SubElement(direction_elem.find('direction-type'), 'wedge',
-                                              {'color': '#000000', 'type': MXMLConversion.mm_type_to_str(mm)})
-
-                                # Add it to the list of opened measure marks (so mm will later be checked to be closed)
-                                s_measure_marks_to_end[staff].append(mm)
-
-                            ET.SubElement(direction_elem, 'voice')
-                            direction_elem.find('voice').text = f'{1}'
-                            ET.SubElement(direction_elem, 'staff')
-                            direction_elem.find('staff').text = f'{staff + 1}'
-                            measure_marks_to_save.remove(mm)
-
-                    # TODO: Currently only works for non-overlapping measure marks
-                    # MAY NEED TO STOP A MEASURE MARK BEFORE THE NOTE
-                    for mm in s_measure_marks_to_end[staff]:
-
-                        # If the measure mark is in this measure and its end point has been reached
-                        if mm.measure_span < 1 and mm.end_point <= current_musical_pos:
-                            direction_elem = ET.SubElement(
-                                new_measure_elem, 'direction')
-
-                            # TODO: Add a function to add 'STOP' tags depending on the mark-type
-                            from structure.measure_mark import DynamicChangeMark
-                            if isinstance(mm, DynamicChangeMark):
-                                ET.SubElement(direction_elem, 'direction-type')
-                                ET.SubElement(direction_elem.find('direction-type'), 'wedge',
-                                              {'color': '#000000', 'type': 'stop'})
-
-                                ET.SubElement(direction_elem, 'voice')
-                                direction_elem.find('voice').text = f'{1}'
-                                ET.SubElement(direction_elem, 'staff')
-                                direction_elem.find(
-                                    'staff').text = f'{staff + 1}'
-
-                            # The mark is discarded as now it's been implemented
-                            s_measure_marks_to_end[staff].remove(mm)
+                for s_note, note_tick in zip(staved_measure.iter_notes(), note_ticks):
+
+                    # MAY NEED TO STOP OR START MEASURE MARKS BEFORE THE NOTE
+                    MusicXML._save_measure_marks(new_measure_elem, marks_to_start, s_measure_marks_to_end[staff],
+                                                 note_tick, staff)
 
                     # NOTE GROUP
                     if isinstance(s_note, NoteGroup):
-                        for elem in MusicXML._save_note_group(s_note, staff=staff + 1):
+                        for elem in MusicXML._save_note_group(s_note, staff=staff + 1, accidentals=accidentals):
                             new_measure_elem.append(elem)
 
                     # NOTE
                     else:
                         new_measure_elem.append(
-                            MusicXML._save_note(s_note, staff=staff + 1))
+                            MusicXML._save_note(s_note, staff=staff + 1, accidentals=accidentals))
 
-                    # UPDATE CURRENT_MUSICAL_POSITION AND RUNNING LIST OF MEASURE MARKS
-                    for mm in s_measure_marks_to_end[staff]:
-                        mm.measure_span -= 1
-                    current_musical_pos += (s_note.value.value *
-                                            4) * s_note.division
+                # Marks stopping at or starting after the last note are placed at the end of the measure
+                MusicXML._save_measure_marks(new_measure_elem, marks_to_start, s_measure_marks_to_end[staff],
+                                             measure_end, staff)
 
             # IRREGULAR RS BARLINE
             if measure.has_irregular_rs_barline():
@@ -2450,22 +2416,9 @@ class MusicXML:
                 measure_list = part_elem.findall('measure')
                 final_measure_elem = measure_list[-1]
 
-                direction_elem = ET.SubElement(final_measure_elem, 'direction')
-
                 # Add in a stop wedge at the end for the measure mark
-                from structure.measure_mark import DynamicChangeMark
-                for mm in s_measure_marks_to_end[staff]:
-                    # TODO: Implement MeasureMark_to_mxml with ability for 'STOP' tags
-
-                    if isinstance(mm, DynamicChangeMark):
-                        ET.SubElement(direction_elem, 'direction-type')
-                        ET.SubElement(direction_elem.find('direction-type'), 'wedge',
-                                      {'color': '#000000', 'type': 'stop'})
-
-                        ET.SubElement(direction_elem, 'voice')
-                        direction_elem.find('voice').text = f'{1}'
-                        ET.SubElement(direction_elem, 'staff')
-                        direction_elem.find('staff').text = f'{staff + 1}'
+                for interval in s_measure_marks_to_end[staff]:
+                    MusicXML._save_measure_mark_direction(final_measure_elem, interval.mark, staff, stop=True)
 
         return part_elem
 
@@ -2489,6 +2442,9 @@ class MusicXML:
         :return:
         """
 
+        # Worked out again for any measures edited since the score was loaded, without writing to the score
+        accidentals = score.displayed_accidentals()
+
         mxml_body = '<score-partwise version="4.0"><part-list></part-list>' \
                     '</score-partwise>'
 
@@ -2539,7 +2495,7 @@ class MusicXML:
                 # SAVE EVERY MEASURE
                 part_elem = ET.SubElement(
                     root, 'part', {'id': f'P{part_id_num}'})
-                part_elem = MusicXML._save_part(part_elem, part, part_id_num)
+                part_elem = MusicXML._save_part(part_elem, part, part_id_num, accidentals)
 
                 # Part ID number is incremented
                 part_id_num += 1
@@ -0,0 +1,371 @@
+"""
+Seeded data augmentation over NoteTables and piano rolls, for use inside a data loader
+"""
+from typing import Union
+
+import numpy as np
+
+from structure.note_table import NoteTable
+
+
+# ------------------
+# Augmentation class
+# ------------------
+class Augmentation:
+    """
+    Base class of the augmentations. Each works on a NoteTable or on a piano roll, as from to_pianoroll(), of shape
+    (128, steps) or (channels, 128, steps), and returns a new one, leaving its input as it was. Every augmentation
+    draws a few numbers per sample, or one per note, and then works on whole columns or arrays at once.
+
+    An augmentation is seeded at construction, or given a generator or seed per call, e.g. from the sample index so
+    data loader workers never repeat each other:
+
+    augment = Compose([Transpose(-5, 6), TimeStretch(0.9, 1.1), VelocityJitter(8)], seed=0)
+    table = augment(NoteTable.from_records(dataset[index], resolution), rng=index)
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, seed: Union[int, np.integer, None] = None):
+        """
+        :param seed: Seed of the generator used when a call is given none
+        """
+        self.rng = np.random.default_rng(seed)
+
+    # --------
+    # Override
+    # --------
+    def __call__(self,
+                 data: Union[NoteTable, np.ndarray],
+                 rng: Union[np.random.Generator, int, np.integer, None] = None) -> Union[NoteTable, np.ndarray]:
+        """
+        :param data: A NoteTable, or a piano roll
+        :param rng: A generator, or a seed for one, or None to use the augmentation's own
+        :return: The augmented table or roll
+        """
+        rng = self.rng if rng is None else np.random.default_rng(rng)
+        if isinstance(data, NoteTable):
+            return self.apply_table(data, rng)
+        if isinstance(data, np.ndarray) and data.ndim in (2, 3) and data.shape[-2] == 128:
+            return self.apply_roll(data, rng)
+        raise TypeError(f'Cannot augment {type(data).__name__}; expected a NoteTable or a piano roll of 128 pitches.')
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        raise NotImplementedError
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        raise NotImplementedError
+
+
+# -------------
+# Compose class
+# -------------
+class Compose(Augmentation):
+    """
+    Class to apply augmentations one after another, all drawing from the same generator
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, augmentations: list[Augmentation], seed: Union[int, np.integer, None] = None):
+        """
+        :param augmentations: The augmentations, in the order they are applied
+        :param seed: Seed of the generator used when a call is given none
+        """
+        super().__init__(seed)
+        self.augmentations = list(augmentations)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.augmentations}>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        for augmentation in self.augmentations:
+            table = augmentation.apply_table(table, rng)
+        return table
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        for augmentation in self.augmentations:
+            roll = augmentation.apply_roll(roll, rng)
+        return roll
+
+
+# ---------------
+# Transpose class
+# ---------------
+class Transpose(Augmentation):
+    """
+    Class to shift every pitch by the same random number of semitones. The shift is clamped so that every note stays
+    within the pitch range, rather than notes being clipped to its edges
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 low: Union[int, np.integer] = -6,
+                 high: Union[int, np.integer] = 6,
+                 pitch_range: tuple[int, int] = (0, 127),
+                 seed: Union[int, np.integer, None] = None):
+        """
+        :param low: Lowest shift, in semitones
+        :param high: Highest shift, in semitones, included
+        :param pitch_range: Lowest and highest MIDI pitch notes may be shifted to
+        :param seed: Seed of the generator used when a call is given none
+        """
+        super().__init__(seed)
+        if low > high:
+            raise ValueError(f'A transposition range cannot run from {low} down to {high}.')
+        self.low, self.high = int(low), int(high)
+        self.pitch_range = (int(pitch_range[0]), int(pitch_range[1]))
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} [{self.low}, {self.high}]>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        shift = self._shift_(table.pitch, rng)
+        return table.replace(pitch=table.pitch + shift)
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        sounding = np.flatnonzero(roll.any(axis=tuple(axis for axis in range(roll.ndim) if axis != roll.ndim - 2)))
+        shift = self._shift_(sounding, rng)
+        shifted = np.zeros_like(roll)
+        if shift >= 0:
+            shifted[..., shift:, :] = roll[..., :128 - shift, :]
+        else:
+            shifted[..., :shift, :] = roll[..., -shift:, :]
+        return shifted
+
+    def _shift_(self, pitches: np.ndarray, rng: np.random.Generator) -> int:
+        shift = int(rng.integers(self.low, self.high, endpoint=True))
+        if len(pitches) == 0:
+            return shift
+        return int(np.clip(shift, self.pitch_range[0] - pitches.min(), self.pitch_range[1] - pitches.max()))
+
+
+# -----------------
+# TimeStretch class
+# -----------------
+class TimeStretch(Augmentation):
+    """
+    Class to scale every onset and duration by the same random factor, rounded to whole ticks or steps. Notes last
+    at least one tick
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 low: float = 0.9,
+                 high: float = 1.1,
+                 seed: Union[int, np.integer, None] = None):
+        """
+        :param low: Lowest factor; below 1 is faster
+        :param high: Highest factor
+        :param seed: Seed of the generator used when a call is given none
+        """
+        super().__init__(seed)
+        if not 0 < low <= high:
+            raise ValueError(f'Stretch factors must be positive and run upwards, not from {low} to {high}.')
+        self.low, self.high = float(low), float(high)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} [{self.low}, {self.high}]>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        factor = rng.uniform(self.low, self.high)
+        onset = np.rint(table.onset * factor).astype(np.int64)
+        end = np.rint((table.onset + table.duration) * factor).astype(np.int64)
+        return table.replace(onset=onset, duration=np.maximum(end - onset, 1), end=int(round(table.end * factor)))
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Resamples the time axis, each new step taking the nearest old one
+        """
+        factor = rng.uniform(self.low, self.high)
+        steps = roll.shape[-1]
+        source = np.minimum((np.arange(max(int(round(steps * factor)), 1)) / factor).astype(np.int64), steps - 1)
+        return roll[..., source]
+
+
+# --------------------
+# VelocityJitter class
+# --------------------
+class VelocityJitter(Augmentation):
+    """
+    Class to add normal noise to velocities, kept within 1 to 127. Each note of a table gets its own offset; a roll
+    has no notes, so each pitch of each channel gets one, and a note keeps a single velocity for its length. Binary
+    rolls are left as they are
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, std: float = 8.0, seed: Union[int, np.integer, None] = None):
+        """
+        :param std: Standard deviation of the noise, in MIDI velocity
+        :param seed: Seed of the generator used when a call is given none
+        """
+        super().__init__(seed)
+        if std < 0:
+            raise ValueError(f'Velocity noise cannot have a negative deviation, {std}.')
+        self.std = float(std)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} std={self.std}>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        return table.replace(velocity=self._jitter_(table.velocity, self._noise_(len(table), rng)))
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        if roll.max(initial=0) <= 1:
+            return roll
+        jittered = self._jitter_(roll, self._noise_(roll.shape[:-1], rng)[..., np.newaxis])
+        jittered[roll == 0] = 0
+        return jittered
+
+    def _noise_(self, shape, rng: np.random.Generator) -> np.ndarray:
+        return np.rint(rng.normal(0, self.std, shape)).astype(np.int16)
+
+    @staticmethod
+    def _jitter_(velocity: np.ndarray, noise: np.ndarray) -> np.ndarray:
+        """
+        Adds whole-number noise in 16-bit integers, which is far cheaper over a roll than floats
+        """
+        return np.clip(velocity.astype(np.int16) + noise, 1, 127).astype(velocity.dtype)
+
+
+# -----------------
+# PartDropout class
+# -----------------
+class PartDropout(Augmentation):
+    """
+    Class to drop each part at random. At least one part that has notes is always kept. A roll must have a channel
+    per part
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, p: float = 0.2, seed: Union[int, np.integer, None] = None):
+        """
+        :param p: Chance of each part being dropped
+        :param seed: Seed of the generator used when a call is given none
+        """
+        super().__init__(seed)
+        if not 0 <= p <= 1:
+            raise ValueError(f'Dropout needs a chance between 0 and 1, not {p}.')
+        self.p = float(p)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} p={self.p}>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        parts, part_index = np.unique(table.part, return_inverse=True)
+        keep = self._keep_(len(parts), rng)
+        return table.select(keep[part_index])
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        if roll.ndim != 3:
+            raise ValueError('Part dropout needs a piano roll with a channel per part.')
+        sounding = np.flatnonzero(roll.any(axis=(1, 2)))
+        keep = np.zeros(len(roll), dtype=bool)
+        keep[sounding] = self._keep_(len(sounding), rng)
+        return roll * keep[:, np.newaxis, np.newaxis].astype(roll.dtype)
+
+    def _keep_(self, count: int, rng: np.random.Generator) -> np.ndarray:
+        keep = rng.random(count) >= self.p
+        if count > 0 and not keep.any():
+            keep[rng.integers(count)] = True
+        return keep
+
+
+# ----------------
+# WindowCrop class
+# ----------------
+class WindowCrop(Augmentation):
+    """
+    Class to cut a window of fixed length from a random point. Notes sounding across an edge of the window are cut
+    to it, and times are counted from its start. A score shorter than the window is kept whole
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 quarters: Union[int, np.integer],
+                 resolution: Union[int, np.integer] = 4,
+                 seed: Union[int, np.integer, None] = None):
+        """
+        :param quarters: Length of the window, in quarter notes
+        :param resolution: Steps per quarter note of the rolls cropped; tables carry their own
+        :param seed: Seed of the generator used when a call is given none
+        """
+        super().__init__(seed)
+        if quarters <= 0 or resolution <= 0:
+            raise ValueError(f'A window needs a positive length and resolution, not {quarters} and {resolution}.')
+        self.quarters = int(quarters)
+        self.resolution = int(resolution)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} quarters={self.quarters}>'
+
+    # -------
+    # Methods
+    # -------
+    def apply_table(self, table: NoteTable, rng: np.random.Generator) -> NoteTable:
+        length = self.quarters * table.resolution
+        end = max(table.end, int((table.onset + table.duration).max(initial=0)))
+        start = int(rng.integers(0, max(end - length, 0), endpoint=True))
+        stop = start + length
+
+        selected = table.select((table.onset < stop) & (table.onset + table.duration > start))
+        onset = np.maximum(selected.onset, start)
+        duration = np.minimum(selected.onset + selected.duration, stop) - onset
+        return selected.replace(onset=onset - start, duration=duration, end=min(length, end - start))
+
+    def apply_roll(self, roll: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        length = self.quarters * self.resolution
+        start = int(rng.integers(0, max(roll.shape[-1] - length, 0), endpoint=True))
+        return roll[..., start:start + length].copy()
+
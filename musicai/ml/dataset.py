@@ -0,0 +1,333 @@
+"""
+Sharded .npy datasets, written once and read back through memory maps
+"""
+import json
+import os
+from typing import Union
+
+import numpy as np
+
+
+# -----------------
+# ShardWriter class
+# -----------------
+class ShardWriter:
+    """
+    Class to write many arrays, e.g. token sequences, piano rolls, or note table records, into a directory of .npy
+    shards of about shard_size rows each, with an index of where each array lies. All arrays must share their dtype
+    and every dimension but the first, which is the one windows are taken along; store a piano roll transposed, time
+    first.
+
+    An array is never split between shards, so each can be read back as a single slice of one shard. Only the shard
+    being filled is held in memory. Each time a shard is written, the index is committed with it. The arrays of the
+    shard being filled are also appended to a pending log as they arrive, so a dataset left by a crashed run is
+    resumed with every array appended before the crash: those in written shards, and the rest from the log.
+
+    with ShardWriter('corpus/') as writer:
+        for score in scores:
+            writer.append(tokenizer.encode(score))
+    """
+    _INDEX_DTYPE_ = np.dtype([('shard', np.int32), ('start', np.int64), ('length', np.int64)])
+    PENDING_ROWS = 'pending.bin'  # The rows of every array not yet in a shard, one after another
+    PENDING_LOG = 'pending.txt'  # A line of [index, key, length] per array, written once its rows are in
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, directory: str, shard_size: Union[int, np.integer] = 1 << 24, resume: bool = False):
+        """
+        :param directory: Where the shards are written; made if missing
+        :param shard_size: How many rows a shard holds before a new one is started. An array longer than this gets a
+            shard of its own
+        :param resume: Whether to add to a dataset already in the directory, with any arrays in its pending log, rather
+            than start a new one
+        """
+        self.directory = directory
+        self.shard_size = int(shard_size)
+        os.makedirs(directory, exist_ok=True)
+
+        self.dtype: np.dtype | None = None
+        self.row_shape: tuple | None = None
+        self.shard_count = 0
+
+        self._pending_: list[np.ndarray] = []
+        self._pending_rows_ = 0
+        self._index_: list[tuple] = []
+        self.keys: list[str | None] = []
+        self._log_ = None  # (rows file, log file), open while arrays are pending
+
+        if resume and os.path.exists(os.path.join(directory, 'dataset.json')):
+            dataset = ShardedDataset(directory)
+            self.dtype, self.row_shape, self.shard_count = dataset.dtype, dataset.row_shape, dataset.shard_count
+            self._index_ = [(int(shard), int(start), int(length))
+                            for shard, start, length in zip(dataset.shards, dataset.starts, dataset.lengths)]
+            self.keys = list(dataset.keys)
+            # The log was emptied when the last shard was written, so what it holds belongs to the next one
+            for array, key in self._recover_():
+                self._index_.append((self.shard_count, self._pending_rows_, len(array)))
+                self.keys.append(key)
+                self._pending_.append(array)
+                self._pending_rows_ += len(array)
+        else:
+            self._clear_log_()
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return len(self._index_)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.directory} arrays={len(self._index_)} shards={self.shard_count}>'
+
+    def __enter__(self) -> 'ShardWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    # -------
+    # Methods
+    # -------
+    def append(self, array: np.ndarray, key: str | None = None) -> int:
+        """
+        Adds an array to the dataset
+
+        :param array: The array, with the dataset's dtype and row shape; the first array sets both
+        :param key: A name for the array, e.g. the file it came from, kept in ShardedDataset.keys
+        :return: The array's index in the dataset
+        """
+        array = np.asarray(array)
+        if array.ndim == 0:
+            raise ValueError('Cannot add a scalar to a dataset; arrays need at least one dimension.')
+
+        if self.dtype is None:
+            self.dtype, self.row_shape = array.dtype, array.shape[1:]
+        elif array.shape[1:] != self.row_shape:
+            raise ValueError(f'An array of rows shaped {array.shape[1:]} cannot join a dataset of rows shaped '
+                             f'{self.row_shape}.')
+        elif not np.can_cast(array.dtype, self.dtype, casting='same_kind'):
+            raise TypeError(f'An array of {array.dtype} cannot join a dataset of {self.dtype}.')
+
+        if len(self._index_) == 0:
+            # Commits the dtype and row shape, which the pending log needs to be read back
+            self._commit_()
+        if self._pending_rows_ > 0 and self._pending_rows_ + len(array) > self.shard_size:
+            self._flush_()
+
+        array = np.ascontiguousarray(array.astype(self.dtype, copy=False))
+        self._log_array_(len(self._index_), key, array)
+
+        self._index_.append((self.shard_count, self._pending_rows_, len(array)))
+        self.keys.append(key)
+        self._pending_.append(array)
+        self._pending_rows_ += len(array)
+        return len(self._index_) - 1
+
+    def close(self) -> None:
+        """
+        Writes the last shard, and commits it. The dataset can be read from then on
+        """
+        if self._pending_rows_ > 0:
+            self._flush_()
+        else:
+            self._commit_()
+
+        if self._log_ is not None:
+            for file in self._log_:
+                file.close()
+            self._log_ = None
+        for name in (ShardWriter.PENDING_ROWS, ShardWriter.PENDING_LOG):
+            if os.path.exists(os.path.join(self.directory, name)):
+                os.remove(os.path.join(self.directory, name))
+
+    def _flush_(self) -> None:
+        np.save(ShardedDataset.shard_path(self.directory, self.shard_count), np.concatenate(self._pending_))
+        self.shard_count += 1
+        self._pending_ = []
+        self._pending_rows_ = 0
+        self._commit_()
+        self._clear_log_()
+
+    def _log_array_(self, index: int, key: str | None, array: np.ndarray) -> None:
+        """
+        Appends an array to the pending log. Its rows go first and its line after, so a line is only ever read back
+        with all of its rows
+        """
+        if self._log_ is None:
+            self._log_ = (open(os.path.join(self.directory, ShardWriter.PENDING_ROWS), 'ab'),
+                          open(os.path.join(self.directory, ShardWriter.PENDING_LOG), 'a'))
+        rows, log = self._log_
+        rows.write(array.tobytes())
+        rows.flush()
+        log.write(json.dumps([index, key, len(array)]) + '\n')
+        log.flush()
+
+    def _clear_log_(self) -> None:
+        """
+        Empties the pending log, once every array in it is in a committed shard
+        """
+        if self._log_ is not None:
+            for file in self._log_:
+                file.close()
+            self._log_ = None
+        open(os.path.join(self.directory, ShardWriter.PENDING_ROWS), 'wb').close()
+        open(os.path.join(self.directory, ShardWriter.PENDING_LOG), 'w').close()
+
+    def _recover_(self) -> list[tuple[np.ndarray, str | None]]:
+        """
+        Reads back the arrays of the pending log which are not in a committed shard. The log is cut back to its last
+        whole line, dropping whatever a crash left half written, and is appended to from there
+
+        :return: (array, key) for each, in the order they were appended
+        """
+        rows_path = os.path.join(self.directory, ShardWriter.PENDING_ROWS)
+        log_path = os.path.join(self.directory, ShardWriter.PENDING_LOG)
+        if self.dtype is None or not os.path.exists(log_path) or not os.path.exists(rows_path):
+            self._clear_log_()
+            return []
+
+        row_bytes = int(np.prod(self.row_shape, dtype=np.int64)) * self.dtype.itemsize
+        rows_size = os.path.getsize(rows_path)
+        recovered = []
+        log_end = rows_end = 0  # Bytes of each file read back whole
+        with open(log_path, 'rb') as log:
+            for line in log:
+                try:
+                    index, key, length = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n') or rows_end + length * row_bytes > rows_size:
+                    break
+                # The log is emptied just after its shard is committed, so a crash between the two leaves those arrays
+                if index >= len(self._index_):
+                    array = np.fromfile(rows_path, dtype=self.dtype, count=length * row_bytes // self.dtype.itemsize,
+                                        offset=rows_end)
+                    recovered.append((array.reshape((length,) + tuple(self.row_shape)), key))
+                log_end += len(line)
+                rows_end += length * row_bytes
+
+        os.truncate(log_path, log_end)
+        os.truncate(rows_path, rows_end)
+        return recovered
+
+    def _commit_(self) -> None:
+        """
+        Writes the index and description of every array in a written shard. Each file is replaced whole, and the
+        description, which says how many arrays there are, goes last, so a reader never sees a partial commit
+        """
+        committed = len(self._index_) - len(self._pending_)
+
+        index_path = os.path.join(self.directory, 'index.npy')
+        with open(index_path + '.tmp', 'wb') as file:
+            np.save(file, np.array(self._index_[:committed], dtype=ShardWriter._INDEX_DTYPE_))
+        os.replace(index_path + '.tmp', index_path)
+
+        description_path = os.path.join(self.directory, 'dataset.json')
+        with open(description_path + '.tmp', 'w') as file:
+            json.dump({'dtype': np.lib.format.dtype_to_descr(self.dtype) if self.dtype is not None else None,
+                       'row_shape': list(self.row_shape) if self.row_shape is not None else [],
+                       'shards': self.shard_count,
+                       'arrays': committed,
+                       'keys': self.keys[:committed]}, file)
+        os.replace(description_path + '.tmp', description_path)
+
+
+# --------------------
+# ShardedDataset class
+# --------------------
+class ShardedDataset:
+    """
+    Class to read a dataset written by ShardWriter. Shards are memory-mapped the first time they are needed, so any
+    array, or any window of one, is a slice of a map: found in constant time and never copied. Processes reading the
+    same dataset share the operating system's page cache rather than each holding its own copy.
+
+    Maps are not carried when the dataset is pickled, e.g. into a data loader's worker processes; each process opens
+    its own on first use.
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, directory: str):
+        """
+        :param directory: A directory written by ShardWriter
+        """
+        self.directory = directory
+        with open(os.path.join(directory, 'dataset.json')) as file:
+            description = json.load(file)
+        self.shard_count: int = description['shards']
+        self.dtype = np.lib.format.descr_to_dtype(description['dtype']) if description['dtype'] is not None else None
+        self.row_shape = tuple(description['row_shape'])
+        self.keys: list[str | None] = description['keys']
+
+        index = np.load(os.path.join(directory, 'index.npy'))[:description['arrays']]
+        self.shards: np.ndarray = index['shard']
+        self.starts: np.ndarray = index['start']
+        self.lengths: np.ndarray = index['length']
+
+        self._maps_: dict[int, np.ndarray] = {}
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.directory} arrays={len(self)} shards={self.shard_count}>'
+
+    def __getitem__(self, index: Union[int, np.integer]) -> np.ndarray:
+        """
+        Returns an array of the dataset, as a read-only view into its shard
+        """
+        index = int(index)
+        if not -len(self) <= index < len(self):
+            raise IndexError(f'Index {index} is out of range for a dataset of {len(self)} arrays.')
+        start = self.starts[index]
+        return self._map_(int(self.shards[index]))[start:start + self.lengths[index]]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state['_maps_'] = {}
+        return state
+
+    # -------
+    # Methods
+    # -------
+    def window(self,
+               index: Union[int, np.integer],
+               start: Union[int, np.integer],
+               length: Union[int, np.integer]) -> np.ndarray:
+        """
+        Returns rows [start, start + length) of an array of the dataset, as a read-only view into its shard. The
+        window is cut short at the end of the array
+
+        :param index: Which array
+        :param start: First row of the window
+        :param length: How many rows
+        :return:
+        """
+        return self[index][start:start + length]
+
+    def shard(self, shard: Union[int, np.integer]) -> np.ndarray:
+        """
+        Returns a whole shard, every array in it one after another, as a read-only map; e.g. to scan the dataset a
+        shard at a time
+        """
+        shard = int(shard)
+        if not 0 <= shard < self.shard_count:
+            raise IndexError(f'Shard {shard} is out of range for a dataset of {self.shard_count} shards.')
+        return self._map_(shard)
+
+    def _map_(self, shard: int) -> np.ndarray:
+        if shard not in self._maps_:
+            self._maps_[shard] = np.load(ShardedDataset.shard_path(self.directory, shard), mmap_mode='r')
+        return self._maps_[shard]
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def shard_path(cls, directory: str, shard: Union[int, np.integer]) -> str:
+        return os.path.join(directory, f'shard-{int(shard):05d}.npy')
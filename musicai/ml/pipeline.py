@@ -0,0 +1,250 @@
+"""
+Streaming conversion of a MusicXML corpus into a sharded dataset, over worker processes
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+import warnings
+from typing import Callable, Union
+
+import numpy as np
+
+from fileio.mxml import MusicXML
+from ml.dataset import ShardWriter
+from ml.tokens import Tokenizer
+from structure.score import Score
+
+
+# ----------------
+# StageStats class
+# ----------------
+class StageStats:
+    """
+    Class to hold how many items a stage of a Pipeline handled, and how long it spent on them
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, name: str, items: int = 0, seconds: float = 0.0):
+        """
+        :param name: Name of the stage
+        :param items: How many items the stage handled
+        :param seconds: Time the stage spent on them, summed over every process running it
+        """
+        self.name = name
+        self.items = items
+        self.seconds = seconds
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.name} items={self.items} seconds={self.seconds:.3f}>'
+
+    def __str__(self) -> str:
+        return f'{self.name:<10}{self.items:>8} items{self.seconds:>10.2f} s{self.throughput:>10.1f} items/s'
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def throughput(self) -> float:
+        """
+        Items handled per second of a single process
+        """
+        return self.items / self.seconds if self.seconds > 0 else 0.0
+
+    # -------
+    # Methods
+    # -------
+    def add(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.seconds += seconds
+
+
+# --------------
+# Pipeline class
+# --------------
+class Pipeline:
+    """
+    Class to convert MusicXML files into a ShardedDataset, in the stages load → transform → encode → write. Worker
+    processes load, transform, and encode; the calling process writes. Files reach the workers, and arrays come back,
+    through bounded queues, so a slow writer holds up the workers rather than letting arrays pile up in memory, and
+    the workers hold up the reading of paths in turn.
+
+    A worker runs its three stages one after another on each file, so only paths and arrays, never scores, cross
+    between processes.
+
+    Each array is kept under the path it came from, and files that fail are listed in failed.txt in the dataset, so
+    a run stopped part way is resumed by running it again over the same directory: committed and failed files are
+    skipped. Each file is checkpointed as it is written, in the dataset's pending log, so only files still in the
+    workers when a run stopped are converted again.
+
+    pipeline = Pipeline('corpus/', encode=Tokenizer().encode, workers=8)
+    for stats in pipeline.run(glob.glob('scores/**/*.musicxml', recursive=True)):
+        print(stats)
+    """
+    STAGES = ('load', 'transform', 'encode', 'write')
+    FAILED_FILE = 'failed.txt'
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 directory: str,
+                 encode: Callable[[Score], np.ndarray] | None = None,
+                 transform: Callable[[Score], Score] | None = None,
+                 workers: Union[int, np.integer] = 0,
+                 queue_size: Union[int, np.integer] = 16,
+                 shard_size: Union[int, np.integer] = 1 << 24,
+                 quiet: bool = True):
+        """
+        :param directory: Where the dataset is written; a dataset already there is resumed
+        :param encode: Function from a Score to the array stored for it, or None to use Tokenizer().encode
+        :param transform: Function applied to each Score before it is encoded, or None to leave scores as loaded
+        :param workers: How many worker processes to run, or 0 for one per CPU
+        :param queue_size: How many items each queue holds before the stage feeding it waits
+        :param shard_size: Rows per shard of the dataset
+        :param quiet: Whether to hide what loading prints, and the warnings it gives
+        """
+        self.directory = directory
+        self.encode = encode if encode is not None else Tokenizer().encode
+        self.transform = transform
+        self.workers = int(workers) if workers > 0 else os.cpu_count() or 1
+        self.queue_size = int(queue_size)
+        self.shard_size = int(shard_size)
+        self.quiet = quiet
+        self.errors: dict[str, str] = {}
+
+        if self.queue_size <= 0:
+            raise ValueError(f'Queues need a positive size, not {self.queue_size}.')
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {self.directory} workers={self.workers}>'
+
+    # -------
+    # Methods
+    # -------
+    def run(self, paths: list[str]) -> list[StageStats]:
+        """
+        Converts every file not converted by an earlier run over the same directory
+
+        :param paths: Paths of the MusicXML files. Those that fail are kept in errors, with their traceback
+        :return: The stats of each stage, in STAGES order. Worker stages sum their time over every worker, so they
+            compare with the write stage per process
+        """
+        stats = {name: StageStats(name) for name in Pipeline.STAGES}
+
+        with ShardWriter(self.directory, self.shard_size, resume=True) as writer:
+            done = set(writer.keys) | self.failed()
+            paths = [path for path in dict.fromkeys(paths) if path not in done]
+            if len(paths) == 0:
+                return list(stats.values())
+
+            workers = min(self.workers, len(paths))
+            context = multiprocessing.get_context()
+            path_queue = context.Queue(self.queue_size)
+            result_queue = context.Queue(self.queue_size)
+
+            processes = [context.Process(target=Pipeline._work_,
+                                         args=(path_queue, result_queue, self.transform, self.encode, self.quiet),
+                                         daemon=True)
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+
+            # Paths are fed from a thread, so a full path queue never stops this process from draining results
+            feeder = threading.Thread(target=Pipeline._feed_, args=(path_queue, paths, workers), daemon=True)
+            feeder.start()
+
+            try:
+                with open(os.path.join(self.directory, Pipeline.FAILED_FILE), 'a') as failed:
+                    for _ in range(len(paths)):
+                        path, array, error, timings = self._get_(result_queue, processes)
+                        for name, seconds in timings.items():
+                            stats[name].add(1, seconds)
+
+                        if error is not None:
+                            self.errors[path] = error
+                            failed.write(f'{path}\n')
+                            failed.flush()
+                            continue
+
+                        start = time.perf_counter()
+                        writer.append(array, key=path)
+                        stats['write'].add(1, time.perf_counter() - start)
+            finally:
+                feeder.join(timeout=1)
+                for process in processes:
+                    process.join(timeout=1)
+                    if process.is_alive():
+                        process.terminate()
+
+        return list(stats.values())
+
+    def failed(self) -> set[str]:
+        """
+        Returns the paths of files that failed in earlier runs over the directory
+        """
+        path = os.path.join(self.directory, Pipeline.FAILED_FILE)
+        if not os.path.exists(path):
+            return set()
+        with open(path) as file:
+            return {line.rstrip('\n') for line in file if line.strip()}
+
+    @staticmethod
+    def _get_(result_queue, processes: list) -> tuple:
+        """
+        Waits for the next result, failing if every worker has died without sending it
+        """
+        while True:
+            try:
+                return result_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError('Every pipeline worker stopped before all files were converted.')
+
+    @staticmethod
+    def _feed_(path_queue, paths: list[str], workers: int) -> None:
+        for path in paths:
+            path_queue.put(path)
+        for _ in range(workers):
+            path_queue.put(None)
+
+    @staticmethod
+    def _work_(path_queue, result_queue, transform, encode, quiet: bool) -> None:
+        """
+        Runs load, transform, and encode on each path until a None arrives, timing each stage
+        """
+        while (path := path_queue.get()) is not None:
+            timings, array, error = {}, None, None
+            try:
+                start = time.perf_counter()
+                with contextlib.ExitStack() as stack:
+                    if quiet:
+                        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+                        stack.enter_context(warnings.catch_warnings())
+                        warnings.simplefilter('ignore')
+                    score = MusicXML.load(path)
+                timings['load'] = time.perf_counter() - start
+
+                if transform is not None:
+                    start = time.perf_counter()
+                    score = transform(score)
+                    timings['transform'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                array = encode(score)
+                timings['encode'] = time.perf_counter() - start
+            except Exception:
+                error = traceback.format_exc()
+            result_queue.put((path, array, error, timings))
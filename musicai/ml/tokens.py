@@ -0,0 +1,450 @@
+"""
+REMI-style event tokens for sequence models, encoded from and decoded to Scores
+"""
+import warnings
+from fractions import Fraction
+from typing import Union
+
+import numpy as np
+
+from util import LookupEnum
+from structure.key import Key, KeyType, ModeType
+from structure.measure import Measure
+from structure.measure_mark import DynamicMark, DynamicType
+from structure.note import Note, NoteGroup, NoteValue, Rest
+from structure.note_mark import TieType
+from structure.note_table import NoteTable
+from structure.score import Part, PartSystem, Score
+from structure.time import TimeSignature
+
+
+# --------------
+# TokenType enum
+# --------------
+class TokenType(LookupEnum):
+    """
+    Enum to represent the kinds of token. Each kind owns a contiguous range of token ids, in this order
+    """
+    PAD = 0
+    BOS = 1
+    EOS = 2
+    BAR = 3
+    TIME_SIGNATURE = 4
+    KEY = 5
+    POSITION = 6
+    PART = 7
+    PITCH = 8
+    DURATION = 9
+    VELOCITY = 10
+
+
+# ----------------
+# Vocabulary class
+# ----------------
+class Vocabulary:
+    """
+    Class to lay out the token ids of every TokenType. Each kind's values are offset into its own range, so a whole
+    array of values is encoded with one addition, and a whole array of tokens is decoded with one search.
+
+    Time signatures are numerators 1 to 16 over denominators 1 to 32; keys are the 15 key signatures in major and
+    minor, other modes being taken as major.
+    """
+    _DENOMINATORS_ = [1, 2, 4, 8, 16, 32]
+    _MAX_NUMERATOR_ = 16
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 resolution: Union[int, np.integer] = 4,
+                 max_bar_length: Union[int, np.integer] = 8,
+                 max_duration: Union[int, np.integer] = 8,
+                 velocity_bins: Union[int, np.integer] = 32,
+                 max_parts: Union[int, np.integer] = 16):
+        """
+        :param resolution: Positions and duration steps per quarter note
+        :param max_bar_length: Longest bar with its own positions, in quarter notes. Later notes take the last position
+        :param max_duration: Longest duration, in quarter notes. Longer notes are shortened to it
+        :param velocity_bins: How many levels velocities are quantized to
+        :param max_parts: How many parts have their own token. Later parts share the last one
+        """
+        self.resolution = int(resolution)
+        self.max_bar_length = int(max_bar_length)
+        self.max_duration = int(max_duration)
+        self.velocity_bins = int(velocity_bins)
+        self.max_parts = int(max_parts)
+
+        self.sizes = np.array([1, 1, 1, 1,
+                               Vocabulary._MAX_NUMERATOR_ * len(Vocabulary._DENOMINATORS_),
+                               15 * 2,
+                               self.max_bar_length * self.resolution,
+                               self.max_parts,
+                               128,
+                               self.max_duration * self.resolution,
+                               self.velocity_bins], dtype=np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(self.sizes)[:-1]))
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return int(self.sizes.sum())
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} tokens={len(self)} resolution={self.resolution}>'
+
+    # -------
+    # Methods
+    # -------
+    def encode(self, token_type: TokenType, values: Union[int, np.integer, np.ndarray]) -> Union[int, np.ndarray]:
+        """
+        Returns the token ids of values of one kind
+
+        :param token_type:
+        :param values: A value, or an array of them, from 0 up to the size of the kind
+        :return: The token id, or an array of them
+        """
+        return values + self.offsets[token_type.value]
+
+    def decode(self, tokens: np.ndarray) -> (np.ndarray, np.ndarray):
+        """
+        Splits token ids into their kinds and values
+
+        :param tokens: An array of token ids
+        :return: Arrays of TokenType values and of the value within each kind
+        """
+        tokens = np.asarray(tokens, dtype=np.int64)
+        if np.any((tokens < 0) | (tokens >= len(self))):
+            raise ValueError(f'Token ids must be between 0 and {len(self) - 1}.')
+        types = np.searchsorted(self.offsets, tokens, side='right') - 1
+        return types, tokens - self.offsets[types]
+
+    def time_signature_value(self, time: TimeSignature) -> int:
+        numerator = min(max(int(time.numerator), 1), Vocabulary._MAX_NUMERATOR_)
+        denominator = Vocabulary._DENOMINATORS_.index(int(time.denominator)) \
+            if int(time.denominator) in Vocabulary._DENOMINATORS_ else Vocabulary._DENOMINATORS_.index(4)
+        return (numerator - 1) * len(Vocabulary._DENOMINATORS_) + denominator
+
+    def time_signature_from_value(self, value: Union[int, np.integer]) -> TimeSignature:
+        numerator, denominator = divmod(int(value), len(Vocabulary._DENOMINATORS_))
+        return TimeSignature(numerator + 1, Vocabulary._DENOMINATORS_[denominator])
+
+    def key_value(self, key: Key) -> int:
+        return (min(max(key.fifths(), -7), 7) + 7) * 2 + (key.modetype == ModeType.MINOR)
+
+    def key_from_value(self, value: Union[int, np.integer]) -> Key:
+        fifths, minor = divmod(int(value), 2)
+        mode = ModeType.MINOR if minor else ModeType.MAJOR
+        return Key(KeyType.find(fifths - 7, mode), mode)
+
+
+# ---------------
+# Tokenizer class
+# ---------------
+class Tokenizer:
+    """
+    Class to turn Scores into REMI-style token sequences for sequence models, and back. A sequence is
+
+    BOS, then for each bar: BAR, TIME_SIGNATURE and KEY when they change, then for each onset: POSITION, then for
+    each note starting there: PART, PITCH, DURATION, VELOCITY; and last EOS.
+
+    Encoding reads the notes through a NoteTable, and lays out every token of a score with array operations, so the
+    time per score is spent walking it once rather than on each token. Bars are the measures of the score's columns.
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, vocabulary: Vocabulary | None = None, part_tokens: bool = True):
+        """
+        :param vocabulary: The token layout, or the default Vocabulary if None
+        :param part_tokens: Whether each note is preceded by a PART token. Without them, decoding gives one part
+        """
+        self.vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        self.part_tokens = part_tokens
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} {repr(self.vocabulary)} part_tokens={self.part_tokens}>'
+
+    # -------
+    # Methods
+    # -------
+    def encode(self, score: Score) -> np.ndarray:
+        """
+        Encodes a score as a token sequence
+
+        :param score: The Score, e.g. from MusicXML.load()
+        :return: An int32 array of token ids
+        """
+        vocabulary = self.vocabulary
+        table = NoteTable.from_score(score)
+        bar_starts, time_values, key_values = self._bars_(score)
+        bar_count = len(bar_starts)
+
+        # Bar headers: BAR, then TIME_SIGNATURE and KEY in the first bar and wherever they change
+        bars = np.arange(bar_count)
+        time_changed = np.ones(bar_count, dtype=bool)
+        time_changed[1:] = time_values[1:] != time_values[:-1]
+        key_changed = np.ones(bar_count, dtype=bool)
+        key_changed[1:] = key_values[1:] != key_values[:-1]
+
+        header_bar = np.concatenate((bars, bars[time_changed], bars[key_changed]))
+        header_slot = np.concatenate((np.zeros(bar_count), np.ones(time_changed.sum()), np.full(key_changed.sum(), 2)))
+        header_token = np.concatenate((np.full(bar_count, vocabulary.encode(TokenType.BAR, 0)),
+                                       vocabulary.encode(TokenType.TIME_SIGNATURE, time_values[time_changed]),
+                                       vocabulary.encode(TokenType.KEY, key_values[key_changed])))
+
+        # Notes, quantized to the vocabulary's steps. Each goes in the bar its onset falls in, rather than the
+        # measure it was read from, as the notes of an overfull measure run on into the next
+        ticks_per_step = table.resolution / vocabulary.resolution
+        bar = np.maximum(np.searchsorted(bar_starts, table.onset, side='right') - 1, 0)
+        position = np.round((table.onset - bar_starts[bar]) / ticks_per_step).astype(np.int64)
+        positions = vocabulary.sizes[TokenType.POSITION.value]
+        if np.any(past := position >= positions):
+            warnings.warn(f'{np.count_nonzero(past)} notes start past the longest bar of the vocabulary, '
+                          f'{vocabulary.max_bar_length} quarter notes, and take its last position.')
+        position = np.clip(position, 0, positions - 1)
+        duration = np.clip(np.round(table.duration / ticks_per_step).astype(np.int64),
+                           1, vocabulary.sizes[TokenType.DURATION.value])
+        velocity = table.velocity.astype(np.int64) * vocabulary.velocity_bins // 128
+        part = np.minimum(table.part, vocabulary.max_parts - 1)
+
+        note_order = np.lexsort((table.pitch, part, position, bar))
+        bar, position, duration, velocity, part = (bar[note_order], position[note_order], duration[note_order],
+                                                   velocity[note_order], part[note_order])
+        pitch = table.pitch[note_order].astype(np.int64)
+        note_count = len(note_order)
+        rank = np.arange(note_count)
+
+        # A POSITION token before the first note at each onset
+        new_position = np.ones(note_count, dtype=bool)
+        new_position[1:] = (bar[1:] != bar[:-1]) | (position[1:] != position[:-1])
+
+        note_slots = [(TokenType.PITCH, pitch), (TokenType.DURATION, duration - 1), (TokenType.VELOCITY, velocity)]
+        if self.part_tokens:
+            note_slots.insert(0, (TokenType.PART, part))
+
+        note_bar = np.concatenate([bar[new_position]] + [bar] * len(note_slots))
+        note_position = np.concatenate([position[new_position]] + [position] * len(note_slots))
+        note_rank = np.concatenate([rank[new_position] - 1] + [rank] * len(note_slots))
+        note_slot = np.concatenate([np.zeros(new_position.sum())] +
+                                   [np.full(note_count, slot) for slot in range(len(note_slots))])
+        note_token = np.concatenate([vocabulary.encode(TokenType.POSITION, position[new_position])] +
+                                    [vocabulary.encode(token_type, values) for token_type, values in note_slots])
+
+        # Headers come before the notes of their bar; within a bar, tokens follow the notes' order
+        order = np.lexsort((np.concatenate((header_slot, note_slot)),
+                            np.concatenate((np.zeros(len(header_bar)), note_rank)),
+                            np.concatenate((np.zeros(len(header_bar)), note_position)),
+                            np.concatenate((np.zeros(len(header_bar)), np.ones(len(note_bar)))),
+                            np.concatenate((header_bar, note_bar))))
+        tokens = np.concatenate((header_token, note_token))[order]
+
+        return np.concatenate(([vocabulary.encode(TokenType.BOS, 0)], tokens,
+                               [vocabulary.encode(TokenType.EOS, 0)])).astype(np.int32)
+
+    def encode_batch(self, scores: list[Score]) -> (np.ndarray, np.ndarray):
+        """
+        Encodes many scores into one flat array
+
+        :param scores:
+        :return: The token ids of every score, one after another, and the offsets where each score starts, with the
+            end of the last one appended, so score i is tokens[offsets[i]:offsets[i + 1]]
+        """
+        sequences = [self.encode(score) for score in scores]
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum([len(sequence) for sequence in sequences], out=offsets[1:])
+        tokens = np.concatenate(sequences) if len(sequences) > 0 else np.empty(0, dtype=np.int32)
+        return tokens, offsets
+
+    def decode(self, tokens: np.ndarray) -> Score:
+        """
+        Rebuilds a Score from a token sequence. Notes starting together in a part become a NoteGroup lasting as long
+        as the shortest of them, and each note is cut short where the next onset of its part comes, with rests filling
+        the gaps. Durations no single NoteValue can hold, and notes running past their bar, are written as tied notes.
+        A DynamicMark is placed wherever a part's velocity moves to a different dynamic
+
+        :param tokens: An array of token ids, as from encode()
+        :return:
+        """
+        vocabulary = self.vocabulary
+        types, values = vocabulary.decode(tokens)
+
+        time = TimeSignature(4, 4)
+        key = Key()
+        bars = []  # (time signature, key, {part: [(position, pitch, duration, velocity)]})
+        position = 0
+        part = 0
+        pitch = None
+        duration = 1
+        for token_type, value in zip(types.tolist(), values.tolist()):
+            match token_type:
+                case TokenType.BAR.value:
+                    bars.append((time, key, {}))
+                    position = 0
+                case TokenType.TIME_SIGNATURE.value:
+                    time = vocabulary.time_signature_from_value(value)
+                    if len(bars) > 0:
+                        bars[-1] = (time, bars[-1][1], bars[-1][2])
+                case TokenType.KEY.value:
+                    key = vocabulary.key_from_value(value)
+                    if len(bars) > 0:
+                        bars[-1] = (bars[-1][0], key, bars[-1][2])
+                case TokenType.POSITION.value:
+                    position = value
+                case TokenType.PART.value:
+                    part = value
+                case TokenType.PITCH.value:
+                    pitch = value
+                case TokenType.DURATION.value:
+                    duration = value + 1
+                case TokenType.VELOCITY.value:
+                    if pitch is not None and len(bars) > 0:
+                        velocity = (value * 128 + 64) // vocabulary.velocity_bins
+                        bars[-1][2].setdefault(part, []).append((position, pitch, duration, velocity))
+                    pitch = None
+
+        part_count = max((max(notes.keys()) + 1 for time, key, notes in bars if len(notes) > 0), default=1)
+        system = PartSystem()
+        for part_index in range(part_count):
+            new_part = Part()
+            dynamic = None
+            carried, spilled = [], []
+            measures = []
+            for time, key, notes in bars:
+                measure, dynamic, carried, spilled = self._measure_(time, key, spilled + notes.get(part_index, []),
+                                                                    dynamic, carried)
+                measures.append(measure)
+            # Notes starting past the last bar get bars of their own
+            while len(spilled) > 0:
+                measure, dynamic, carried, spilled = self._measure_(time, key, spilled, dynamic, carried)
+                measures.append(measure)
+            new_part.extend(measures)
+            system.append(new_part)
+
+        score = Score()
+        score.append(system)
+        score.update_timeline()
+        return score
+
+    def decode_batch(self, tokens: np.ndarray, offsets: np.ndarray) -> list[Score]:
+        """
+        Rebuilds every score of a flat array, as from encode_batch()
+
+        :param tokens:
+        :param offsets:
+        :return:
+        """
+        return [self.decode(tokens[offsets[index]:offsets[index + 1]]) for index in range(len(offsets) - 1)]
+
+    def _bars_(self, score: Score) -> (np.ndarray, np.ndarray, np.ndarray):
+        """
+        The start tick, time signature value, and key value of every column of a score
+        """
+        starts, time_values, key_values = [], [], []
+        time = TimeSignature(4, 4)
+        key = Key()
+        measure_index = 0
+        while len(column := score.column(measure_index)) > 0:
+            measure = column[0][2]
+            time = measure.time if measure.time is not None else time
+            key = measure.key if measure.key is not None else key
+
+            starts.append(measure.tick_onset)
+            time_values.append(self.vocabulary.time_signature_value(time))
+            key_values.append(self.vocabulary.key_value(key))
+            measure_index += 1
+
+        return np.array(starts, dtype=np.int64), np.array(time_values, dtype=np.int64), \
+            np.array(key_values, dtype=np.int64)
+
+    def _measure_(self,
+                  time: TimeSignature,
+                  key: Key,
+                  notes: list[tuple],
+                  dynamic: DynamicType | None,
+                  carried: list[tuple]) -> (Measure, DynamicType | None, list[tuple], list[tuple]):
+        """
+        Builds one measure of a part from its decoded notes. Notes carried from the previous measure start it, tied
+        from their first halves. Returns the measure, the dynamic in effect at its end, the notes running past it,
+        and the notes starting past it, placed in the next measure
+        """
+        resolution = self.vocabulary.resolution
+        measure = Measure(time=time, key=key)
+        bar_length = Fraction(time.numerator * 4 * resolution, time.denominator)
+
+        tied_in = {pitch for position, pitch, duration, velocity in carried}
+        notes = sorted(carried + notes)
+        spilled = [(position - bar_length, pitch, duration, velocity)
+                   for position, pitch, duration, velocity in notes if position >= bar_length]
+        onsets = sorted({position for position, pitch, duration, velocity in notes if position < bar_length})
+        cursor = 0
+        carry = []
+        for index, onset in enumerate(onsets):
+            chord = [note for note in notes if note[0] == onset]
+            pitches = sorted({pitch for position, pitch, duration, velocity in chord})
+            next_onset = onsets[index + 1] if index + 1 < len(onsets) else bar_length
+            duration = min(duration for position, pitch, duration, velocity in chord)
+            length = min(duration, next_onset - onset)
+
+            velocity = max(velocity for position, pitch, duration, velocity in chord)
+            if (nearest := Tokenizer._dynamic_(velocity)) != dynamic:
+                mark = DynamicMark(nearest, onset)
+                mark.divisions = resolution
+                measure.measure_marks.append(mark)
+                dynamic = nearest
+
+            # Only the last chord of the bar can run on into the next one
+            if duration > length and next_onset == bar_length:
+                carry = [(0, pitch, duration - length, velocity) for pitch in pitches]
+
+            if onset > cursor:
+                self._append_(measure, key, [], onset - cursor)
+            self._append_(measure, key, pitches, length, tied_in if onset == 0 else set(), len(carry) > 0)
+            cursor = onset + length
+
+        if cursor < bar_length:
+            self._append_(measure, key, [], bar_length - cursor)
+        return measure, dynamic, carry, spilled
+
+    def _append_(self,
+                 measure: Measure,
+                 key: Key,
+                 pitches: list[int],
+                 steps: Union[int, Fraction],
+                 tied_in: set[int] = frozenset(),
+                 tied_out: bool = False) -> None:
+        """
+        Appends a note, chord, or rest lasting steps, as tied pieces if no single NoteValue lasts that long. The
+        pitches in tied_in are tied from the previous note, and with tied_out every pitch is tied to the next one
+        """
+        pieces = NoteValue.decompose(Fraction(steps, 4 * self.vocabulary.resolution))
+        for index, value in enumerate(pieces):
+            if len(pitches) == 0:
+                rest = Rest()
+                rest.value = value
+                measure.append(rest)
+                continue
+
+            if len(pitches) == 1:
+                note = Note(value=value, pitch=key.find_pitch(pitches[0]))
+            else:
+                note = NoteGroup(value=value, notes=[Note(value=value, pitch=key.find_pitch(pitch))
+                                                     for pitch in pitches])
+            for pitch, tied in zip(pitches, note.notes if note.is_note_group() else [note]):
+                if index > 0 or pitch in tied_in:
+                    tied.marks.add(TieType.STOP)
+                if index < len(pieces) - 1 or tied_out:
+                    tied.marks.add(TieType.START)
+            measure.append(note)
+
+    @classmethod
+    def _dynamic_(cls, velocity: Union[int, np.integer]) -> DynamicType:
+        """
+        The DynamicType whose velocity is closest
+        """
+        return min((dynamic for dynamic in DynamicType if dynamic != DynamicType.NONE),
+                   key=lambda dynamic: abs(dynamic.velocity - velocity))
@@ -1,13 +1,211 @@
-import pandas as pd
+"""
+Tempo map of a score, converting between beats and seconds
+"""
+import heapq
+from typing import Union
 
+import numpy as np
 
+from structure.measure_mark import TempoChangeMark, TempoMark
+from structure.time import Tempo
+
+
+# -------------
+# BeatMap class
+# -------------
 class BeatMap:
+    """
+    Class to map beats (quarter notes) from the start of a score to seconds and back, following its tempo marks.
+
+    The map is a list of segments, each starting at a breakpoint with a tempo and a slope. Between tempo marks the
+    slope is 0 and the tempo constant; over a tempo change (accelerando, ritardando) the tempo moves linearly with the
+    beat. The time at each breakpoint is kept as a cumulative array, so converting any number of positions is one
+    search and a closed-form step within the segment, done for whole arrays at once.
+    """
+    _DEFAULT_TEMPO_ = Tempo(120)
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 beats: Union[list, np.ndarray],
+                 tempos: Union[list, np.ndarray],
+                 slopes: Union[list, np.ndarray, None] = None):
+        """
+        :param beats: Where each segment starts, in beats; the first must be 0 and the rest increasing
+        :param tempos: The tempo at the start of each segment, in quarter notes per minute
+        :param slopes: How fast the tempo changes over each segment, in quarter notes per minute per beat. All 0 if
+            None
+        """
+        self.beats = np.asarray(beats, dtype=np.float64)
+        self.tempos = np.asarray(tempos, dtype=np.float64)
+        self.slopes = np.zeros_like(self.beats) if slopes is None else np.asarray(slopes, dtype=np.float64)
+
+        if len(self.beats) == 0 or self.beats[0] != 0:
+            raise ValueError('A BeatMap must have a segment starting at beat 0.')
+        if not (len(self.beats) == len(self.tempos) == len(self.slopes)):
+            raise ValueError(f'A BeatMap needs as many tempos ({len(self.tempos)}) and slopes ({len(self.slopes)}) '
+                             f'as segments ({len(self.beats)}).')
+        if np.any(np.diff(self.beats) <= 0):
+            raise ValueError('The segments of a BeatMap must start at increasing beats.')
+        if np.any(self.tempos <= 0) or np.any(self._tempo_in_(np.arange(len(self.beats) - 1),
+                                                              np.diff(self.beats)) <= 0):
+            raise ValueError('The tempo of a BeatMap must stay above 0.')
+
+        # Seconds from the start of the score to the start of each segment
+        self.seconds = np.zeros_like(self.beats)
+        if len(self.beats) > 1:
+            np.cumsum(self._elapsed_(np.arange(len(self.beats) - 1), np.diff(self.beats)), out=self.seconds[1:])
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return len(self.beats)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} segments={len(self.beats)}>'
+
+    # -------
+    # Methods
+    # -------
+    def to_seconds(self, beats: Union[float, int, np.ndarray, list]) -> Union[float, np.ndarray]:
+        """
+        Converts positions in beats to seconds from the start of the score. Positions before 0 follow the first tempo
+
+        :param beats: A position, or an array of them, in quarter notes
+        :return: The seconds, as a float or an array of the same shape
+        """
+        beats = np.asarray(beats, dtype=np.float64)
+        segment = self._segment_(self.beats, beats)
+        seconds = self.seconds[segment] + self._elapsed_(segment, beats - self.beats[segment])
+        return seconds if seconds.ndim > 0 else float(seconds)
+
+    def to_beats(self, seconds: Union[float, int, np.ndarray, list]) -> Union[float, np.ndarray]:
+        """
+        Converts seconds from the start of the score to positions in beats, the inverse of to_seconds()
+
+        :param seconds: A time, or an array of them, in seconds
+        :return: The beats, as a float or an array of the same shape
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+        segment = self._segment_(self.seconds, seconds)
+        tempos = self.tempos[segment]
+        slopes = self.slopes[segment]
+        elapsed = seconds - self.seconds[segment]
+
+        constant = slopes == 0
+        safe_slopes = np.where(constant, 1.0, slopes)
+        beats = self.beats[segment] + np.where(constant,
+                                               tempos * elapsed / 60,
+                                               tempos / safe_slopes * np.expm1(safe_slopes * elapsed / 60))
+        return beats if beats.ndim > 0 else float(beats)
+
+    def tempo_at(self, beats: Union[float, int, np.ndarray, list]) -> Union[float, np.ndarray]:
+        """
+        Returns the tempo in effect at positions in beats
+
+        :param beats: A position, or an array of them, in quarter notes
+        :return: The tempo in quarter notes per minute, as a float or an array of the same shape
+        """
+        beats = np.asarray(beats, dtype=np.float64)
+        segment = self._segment_(self.beats, beats)
+        tempos = self._tempo_in_(segment, beats - self.beats[segment])
+        return tempos if tempos.ndim > 0 else float(tempos)
+
+    def _segment_(self, starts: np.ndarray, values: np.ndarray) -> np.ndarray:
+        return np.maximum(np.searchsorted(starts, values, side='right') - 1, 0)
+
+    def _tempo_in_(self, segment: np.ndarray, offset: np.ndarray) -> np.ndarray:
+        return self.tempos[segment] + self.slopes[segment] * offset
+
+    def _elapsed_(self, segment: np.ndarray, offset: np.ndarray) -> np.ndarray:
+        """
+        Seconds taken to play offset beats from the start of each segment. With the tempo T(b) = q + k * b, this is
+        the integral of 60 / T(b), which is 60 * b / q if k is 0 and 60 / k * ln(1 + k * b / q) otherwise
+        """
+        tempos = self.tempos[segment]
+        slopes = self.slopes[segment]
+
+        constant = slopes == 0
+        safe_slopes = np.where(constant, 1.0, slopes)
+        return np.where(constant,
+                        60 * offset / tempos,
+                        60 / safe_slopes * np.log1p(safe_slopes * offset / tempos))
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def from_score(cls, score) -> 'BeatMap':
+        """
+        Builds the tempo map of a score from the TempoMarks and TempoChangeMarks of every part, starting from
+        score.tempo, or 120 quarter notes per minute without one. A tempo change moves the tempo linearly over its
+        span, to the tempo it had times the change's type value raised to its intensity, e.g. 1.5 ** 2 for a molto
+        accelerando. A tempo mark within a change ends it.
+
+        :param score: The Score to map, whose timeline is updated first if it has none
+        :return:
+        """
+        if score.resolution == 0:
+            score.update_timeline()
+
+        # (beat, order, mark, end beat): the order keeps marks at the same beat in score order. The end of a change is
+        # pushed with a negative order, so it comes before anything else starting where it ends
+        # Parts often repeat the same tempo change, which must only be applied once
+        marks = []
+        changes = set()
+        for system in score.systems:
+            for part in system.parts:
+                mark_index = part.mark_index
+                for interval in mark_index:
+                    start = interval.start / mark_index.resolution
+                    if isinstance(interval.mark, TempoMark) and interval.mark.tempo is not None \
+                            and interval.mark.tempo.tempo:
+                        marks.append((start, len(marks) + 1, interval.mark, None))
+                    elif isinstance(interval.mark, TempoChangeMark) and (interval.start, interval.end) not in changes:
+                        changes.add((interval.start, interval.end))
+                        marks.append((start, len(marks) + 1, interval.mark, interval.end / mark_index.resolution))
+        heapq.heapify(marks)
+
+        initial = score.tempo if score.tempo is not None else cls._DEFAULT_TEMPO_
+        beats, tempos, slopes = [0.0], [cls._quarters_per_minute_(initial)], [0.0]
+
+        def add_segment(beat: float, tempo: float, slope: float):
+            if beat == beats[-1]:
+                tempos[-1], slopes[-1] = tempo, slope
+            else:
+                beats.append(beat)
+                tempos.append(tempo)
+                slopes.append(slope)
+
+        active_change = None
+        while len(marks) > 0:
+            beat, order, mark, end = heapq.heappop(marks)
+            current = tempos[-1] + slopes[-1] * (beat - beats[-1])
+
+            if isinstance(mark, TempoMark):
+                add_segment(beat, cls._quarters_per_minute_(mark.tempo), 0.0)
+                active_change = None
+
+            elif end is None:
+                # The end of a change, unless a later mark has already ended it
+                if mark is active_change:
+                    add_segment(beat, current, 0.0)
+                    active_change = None
 
-    def __init__(self):
-        columns = ['Note', 'Start', 'Duration']
-        _beat_df_ = pd.DataFrame(columns=columns)
-        print(_beat_df_)
+            else:
+                target = current * mark.tempo_change_type.value ** mark.intensity.value
+                if end > beat:
+                    add_segment(beat, current, (target - current) / (end - beat))
+                    heapq.heappush(marks, (end, -order, mark, None))
+                    active_change = mark
+                else:
+                    add_segment(beat, target, 0.0)
+                    active_change = None
 
+        return cls(beats, tempos, slopes)
 
-if __name__ == '__main__':
-    BeatMap()
+    @classmethod
+    def _quarters_per_minute_(cls, tempo: Tempo) -> float:
+        return float(tempo.tempo) * float(tempo.beat_unit.fraction) * 4
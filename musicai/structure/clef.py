@@ -1,13 +1,14 @@
-from enum import Enum
 from typing import Union
 
 import numpy as np
 
+from util import LookupEnum
+
 
 # -------------
 # ClefType enum
 # -------------
-class ClefType(Enum):
+class ClefType(LookupEnum):
     """
     Enum to represent the type of the clef
     """
@@ -60,7 +61,7 @@ class ClefType(Enum):
 # ---------------
 # ClefOctave enum
 # ---------------
-class ClefOctave(Enum):
+class ClefOctave(LookupEnum):
     """
     Enum to represent the octave adjustment
     """
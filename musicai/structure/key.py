@@ -1,7 +1,9 @@
-from enum import Enum
+from typing import Union
+
 import numpy as np
 from scipy import stats, linalg
 
+from util import LookupEnum
 from structure.pitch import Chromatic, Step, Accidental, Pitch, Octave
 
 # -------------
@@ -9,7 +11,7 @@ from structure.pitch import Chromatic, Step, Accidental, Pitch, Octave
 # -------------
 
 
-class ModeType(Enum):
+class ModeType(LookupEnum):
     """
     ModeType defines the mode of a scale
     """
@@ -47,15 +49,13 @@ class ModeType(Enum):
             elif value == 'm':
                 return ModeType.MINOR
         else:
-            for name, member in cls.__members__.items():
-                if member.name == value.upper():
-                    return ModeType[name]
+            return cls.by_name(value)
 
 
 # ------------
 # KeyType enum
 # ------------
-class KeyType(Enum):
+class KeyType(LookupEnum):
     """
     KeyType defines the mode of a scale
     """
@@ -81,6 +81,7 @@ class KeyType(Enum):
     A = (3, 0)
     E = (4, 1)
     B = (5, 2)
+    Fs = (6, 3)
     Cs = (7, 4)
     Gs = (8, 5)  # eqv. to Ab major, Ab minor
     Ds = (9, 6)  # eqv. to Eb major, Eb minor
@@ -126,10 +127,7 @@ class KeyType(Enum):
             return value
 
         elif isinstance(value, (float, np.inexact, int, np.integer)):
-            idx = 0 if mode == ModeType.MAJOR else 1
-            for name, member in cls.__members__.items():
-                if member.value[idx] == value:
-                    return KeyType[name]
+            return cls.by_attribute('major_fifths' if mode == ModeType.MAJOR else 'minor_fifths', value)
 
         elif isinstance(value, str):
             if value.title() in cls.__members__:
@@ -162,347 +160,16 @@ class KeyType(Enum):
 class Scale:
     """
      Class to represent a musical scale
+
+     How every MIDI note is spelled in every key is worked out once from the key signatures, into dense tables indexed
+     by [keytype, mode, midi]. Notes in the scale take the key signature's alteration of their step; notes outside of
+     it are spelled natural if possible, otherwise sharp in sharp (and neutral) keys and flat in flat keys.
      """
-    __scales = {
-        KeyType.Cbb: [
-            # Cbb Major (theoretical)
-            [
-                # TODO
-            ],
-            # Cbb Natural Minor (theoretical)
-            [
-                # TODO
-            ]
-        ],
-        KeyType.Gbb: [
-            # Gbb Major (theoretical)
-            [
-                # TODO
-            ],
-            # Gbb Natural Minor (theoretical)
-            [
-                # TODO
-            ]
-        ],
-        KeyType.Dbb: [
-            # Dbb Major (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, None, Chromatic.Fb, Chromatic.Gbb,
-                None, Chromatic.Abb, None, Chromatic.Bb, None, Chromatic.Cb
-            ],
-            # Dbb Natural Minor (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, Chromatic.Fbb, None, Chromatic.Gbb,
-                None, Chromatic.Abb, Chromatic.Bbbb, None, Chromatic.Cbb, None
-            ]
-        ],
-        KeyType.Abb: [
-            # Abb Major (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, None, Chromatic.Fb, None,
-                Chromatic.Gb, Chromatic.Abb, None, Chromatic.Bb, None, Chromatic.Cb
-            ],
-            # Abb Natural Minor (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, Chromatic.Fbb, None, Chromatic.Gbb,
-                None, Chromatic.Abb, None, Chromatic.Bbb, Chromatic.Cbb, None
-            ]
-        ],
-        KeyType.Ebb: [
-            # Ebb Major (theoretical)
-            [
-                None, Chromatic.Db, Chromatic.Ebb, None, Chromatic.Fb, None,
-                Chromatic.Gb, Chromatic.Abb, None, Chromatic.Bb, None, Chromatic.Cb
-            ],
-            # Ebb Natural Minor (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, None, Chromatic.Fb, Chromatic.Gbb,
-                None, Chromatic.Abb, None, Chromatic.Bbb, Chromatic.Cbb, None
-            ]
-        ],
-        KeyType.Bbb: [
-            # Bbb Major
-            [
-                None, Chromatic.Db, Chromatic.Ebb, None, Chromatic.Fb, None,
-                Chromatic.Gb, None, Chromatic.Ab, Chromatic.Bbb, None, Chromatic.Cb
-            ],
-            # Bbb Natural Minor (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, None, Chromatic.Fb, Chromatic.Gbb,
-                None, Chromatic.Abb, None, Chromatic.Bbb, None, Chromatic.Cb
-            ]
-        ],
-        KeyType.Fb: [
-            # Fb Major (theoretical)
-            [
-                None, Chromatic.Db, None, Chromatic.Eb, Chromatic.Fb, None,
-                Chromatic.Gb, None, Chromatic.Ab, Chromatic.Bbb, None, Chromatic.Cb
-            ],
-            # Fb Natural Minor (theoretical)
-            [
-                Chromatic.Dbb, None, Chromatic.Ebb, None, Chromatic.Fb, None,
-                Chromatic.Gb, Chromatic.Abb, None, Chromatic.Bbb, None, Chromatic.Cb
-            ]
-        ],
-
-        KeyType.Cb: [
-            # Cb Major
-            [
-                None, Chromatic.Db, None, Chromatic.Eb, Chromatic.Fb, None,
-                Chromatic.Gb, None, Chromatic.Ab, None, Chromatic.Bb, Chromatic.Cb
-            ],
-            # Cb Natural Minor (theoretical)
-            [
-                None, Chromatic.Db, Chromatic.Ebb, None, Chromatic.Fb, None,
-                Chromatic.Gb, Chromatic.Abb, None, Chromatic.Bbb, None, Chromatic.Cb
-            ]
-        ],
-        KeyType.Gb: [
-            # Gb Major
-            [
-                None, Chromatic.Db, None, Chromatic.Eb, None, Chromatic.F,
-                Chromatic.Gb, None, Chromatic.Ab, None, Chromatic.Bb, Chromatic.Cb
-            ],
-            # Gb Natural Minor (theoretical)
-            [
-                None, Chromatic.Db, Chromatic.Ebb, None, Chromatic.Fb, None,
-                Chromatic.Gb, None, Chromatic.Ab, Chromatic.Bbb, None, Chromatic.Cb
-            ]
-        ],
-        KeyType.Db: [
-            # Db Major
-            [
-                Chromatic.C, Chromatic.Db, None, Chromatic.Eb, None, Chromatic.F,
-                Chromatic.Gb, None, Chromatic.Ab, None, Chromatic.Bb, None
-            ],
-            # Db Natural Minor (theoretical)
-            [
-                None, Chromatic.Db, None, Chromatic.Eb, Chromatic.Fb, None,
-                Chromatic.Gb, None, Chromatic.Ab, Chromatic.Bbb, None, Chromatic.Cb
-            ]
-        ],
-        KeyType.Ab: [
-            # Ab Major
-            [
-                Chromatic.C, Chromatic.Db, None, Chromatic.Eb, None, Chromatic.F,
-                None, Chromatic.G, Chromatic.Ab, None, Chromatic.Bb, None
-            ],
-            # Ab Natural Minor
-            [
-                None, Chromatic.Db, None, Chromatic.Eb, Chromatic.Fb, None,
-                Chromatic.Gb, None, Chromatic.Ab, None, Chromatic.Bb, Chromatic.Cb
-
-            ]
-        ],
-        KeyType.Eb: [
-            # Eb Major
-            [
-                Chromatic.C, None, Chromatic.D, Chromatic.Eb, None, Chromatic.F,
-                None, Chromatic.G, Chromatic.Ab, None, Chromatic.Bb, None
-            ],
-            # Eb Natural Minor
-            [
-                None, Chromatic.Db, None, Chromatic.Eb, None, Chromatic.F,
-                Chromatic.Gb, None, Chromatic.Ab, None, Chromatic.Bb, Chromatic.Cb
-            ]
-        ],
-        KeyType.Bb: [
-            # Bb Major
-            [
-                Chromatic.C, None, Chromatic.D, Chromatic.Eb, None, Chromatic.F,
-                None, Chromatic.G, None, Chromatic.A, Chromatic.Bb, None
-            ],
-            # Bb Natural Minor
-            [
-                Chromatic.C, Chromatic.Db, None, Chromatic.Eb, None, Chromatic.F,
-                Chromatic.Gb, None, Chromatic.Ab, None, Chromatic.Bb, None
-            ]
-        ],
-        KeyType.F: [
-            # F Major
-            [
-                Chromatic.C, None, Chromatic.D, None, Chromatic.E, Chromatic.F,
-                None, Chromatic.G, None, Chromatic.A, Chromatic.Bb, None
-            ],
-            # F Natural Minor
-            [
-                Chromatic.C, Chromatic.Db, None, Chromatic.Eb, None, Chromatic.F,
-                None, Chromatic.G, Chromatic.Ab, None, Chromatic.Bb, None
-            ]
-        ],
-        KeyType.C: [
-            # C Major
-            [
-                Chromatic.C, None, Chromatic.D, None, Chromatic.E, Chromatic.F,
-                None, Chromatic.G, None, Chromatic.A, None, Chromatic.B
-            ],
-            # C Natural Minor
-            [
-                Chromatic.C, None, Chromatic.D, Chromatic.Eb, None, Chromatic.F,
-                None, Chromatic.G, Chromatic.Ab, None, Chromatic.Bb, None
-            ]
-        ],
-        KeyType.G: [
-            # G Major
-            [
-                Chromatic.C, None, Chromatic.D, None, Chromatic.E, None,
-                Chromatic.Fs, Chromatic.G, None, Chromatic.A, None, Chromatic.B
-            ],
-            # G Natural Minor
-            [
-                Chromatic.C, None, Chromatic.D, Chromatic.Eb, None, Chromatic.F,
-                None, Chromatic.G, None, Chromatic.A, Chromatic.Bb, None
-            ]
-        ],
-        KeyType.D: [
-            # D Major
-            [
-                None, Chromatic.Cs, Chromatic.D, None, Chromatic.E, None,
-                Chromatic.Fs, Chromatic.G, None, Chromatic.A, None, Chromatic.B
-            ],
-            # D Natural Minor
-            [
-                Chromatic.C, None, Chromatic.D, None, Chromatic.E, Chromatic.F, None, Chromatic.G, None, Chromatic.A,
-                Chromatic.Bb, None
-            ]
-        ],
-        KeyType.A: [
-            # A Major
-            [
-                None, Chromatic.Cs, Chromatic.D, None, Chromatic.E, None,
-                Chromatic.Fs, None, Chromatic.Gs, Chromatic.A, None, Chromatic.B
-            ],
-            # A Natural Minor
-            [
-                Chromatic.C, None, Chromatic.D, None, Chromatic.E, Chromatic.F,
-                None, Chromatic.G, None, Chromatic.A, None, Chromatic.B
-            ]
-        ],
-        KeyType.E: [
-            # E Major
-            [
-                None, Chromatic.Cs, None, Chromatic.Ds, Chromatic.E, None,
-                Chromatic.Fs, None, Chromatic.Gs, Chromatic.A, None, Chromatic.B
-            ],
-            # E Natural Minor
-            [
-                Chromatic.C, None, Chromatic.D, None, Chromatic.E, None,
-                Chromatic.Fs, Chromatic.G, None, Chromatic.A, None, Chromatic.B
-            ]
-        ],
-        KeyType.B: [
-            # B Major
-            [
-                None, Chromatic.Cs, None, Chromatic.Ds, Chromatic.E, None,
-                Chromatic.Fs, None, Chromatic.Gs, None, Chromatic.As, Chromatic.B
-            ],
-            # B Natural Minor
-            [
-                None, Chromatic.Cs, Chromatic.D, None, Chromatic.E, None,
-                Chromatic.Fs, Chromatic.G, None, Chromatic.A, None, Chromatic.B
-            ]
-        ],
-        # KeyType.Fs: [
-        #     # Fs Major
-        #     [
-        #         None, Chromatic.Cs, None, Chromatic.Ds, None, Chromatic.Es,
-        #         Chromatic.Fs, None, Chromatic.Gs, None, Chromatic.As, Chromatic.B
-        #     ],
-        #     # Fs Natural Minor
-        #     [
-        #         None, Chromatic.Cs, Chromatic.D, None, Chromatic.E, None, Chromatic.Fs, None, Chromatic.Gs,
-        #         Chromatic.A, None, Chromatic.B
-        #     ]
-        # ],
-        KeyType.Cs: [
-            # Cs Major
-            [
-                Chromatic.Bs, Chromatic.Cs, None, Chromatic.Ds, None, Chromatic.Es,
-                Chromatic.Fs, None, Chromatic.Gs, None, Chromatic.As, None
-            ],
-            # Cs Natural Minor
-            [
-                None, Chromatic.Cs, None, Chromatic.Ds, Chromatic.E, None,
-                Chromatic.Fs, None, Chromatic.Gs, Chromatic.A, None, Chromatic.B
-            ]
-        ],
-        KeyType.Gs: [
-            # Gs Major (theoretical)
-            [
-                Chromatic.Bs, Chromatic.Cs, None, Chromatic.Ds, None, Chromatic.Es,
-                None, Chromatic.Fss, Chromatic.Gs, None, Chromatic.As, None
-            ],
-            # Gs Natural Minor
-            [
-                None, Chromatic.Cs, None, Chromatic.Ds, Chromatic.E, None,
-                Chromatic.Fs, None, Chromatic.Gs, None, Chromatic.As, Chromatic.B
-            ]
-        ],
-        KeyType.Ds: [
-            # Ds Major (theoretical)
-            [
-                Chromatic.Bs, None, Chromatic.Css, Chromatic.Ds, None, Chromatic.Es,
-                None, Chromatic.Fss, Chromatic.Gs, None, Chromatic.As, None
-            ],
-            # Ds Minor
-            [
-                None, Chromatic.Cs, None, Chromatic.Ds, None, Chromatic.Es,
-                Chromatic.Fs, None, Chromatic.Gs, None, Chromatic.As, Chromatic.B
-            ]
-        ],
-        KeyType.As: [
-            # As Major (theoretical)
-            [
-                Chromatic.Bs, None, Chromatic.Css, Chromatic.Ds, None, Chromatic.Es,
-                None, Chromatic.Fss, None, Chromatic.Gss, Chromatic.As, None
-            ],
-            # As Natural Minor
-            [
-                Chromatic.Bs, Chromatic.Cs, None, Chromatic.Ds, None, Chromatic.Es,
-                Chromatic.Fs, None, Chromatic.Gs, None, Chromatic.As, None
-            ]
-        ],
-        KeyType.Es: [
-            # Es Major (theoretical)
-            [
-                # TODO
-            ],
-            # Es Natural Minor (theoretical)
-            [
-                # TODO
-            ]
-        ],
-        KeyType.Bs: [
-            # Bs Major (theoretical)
-            [
-                # TODO
-            ],
-            # Bs Natural Minor (theoretical)
-            [
-                # TODO
-            ]
-        ],
-        KeyType.Fss: [
-            # Fss Major (theoretical)
-            [
-                # TODO
-            ],
-            # Fss Natural Minor (theoretical)
-            [
-                # TODO
-            ]
-        ],
-        KeyType.Css: [
-            # Css Major (theoretical)
-            [
-                # TODO
-            ],
-            # Css Natural Minor (theoretical)
-            [
-                # TODO
-            ]
-        ],
-    }
+    KEYTYPES = list(KeyType)
+    STEPS = list(Step)
+
+    _KEYTYPE_INDEX_ = {keytype: index for index, keytype in enumerate(KEYTYPES)}
+    _tables_ = None
 
     # -----------
     # Constructor
@@ -513,13 +180,94 @@ class Scale:
     # ---------
     # Methods
     # ---------
-    def find(self, midi):
-        pitch_class = midi % 12
-        return Scale.__scales[self.key.keytype][int(self.key.modetype)][pitch_class]
+    def find(self, midi) -> Chromatic | None:
+        """
+        Returns the scale degree a MIDI note or pitch class falls on, or None if it is not in the scale
+        """
+        return Scale.tables()['degrees'][self.index() + (int(midi) % 12,)]
+
+    def index(self) -> tuple[int, int]:
+        """
+        Returns the (keytype, mode) index of this scale's key into the spelling tables
+        """
+        return Scale._KEYTYPE_INDEX_[self.key.keytype], int(self.key.modetype)
 
     # -------------
     # Class Methods
     # -------------
+    @classmethod
+    def key_alters(cls, fifths: int) -> list[int]:
+        """
+        Returns the alteration a key signature gives each step, in the order of Step. Keys past seven sharps or flats
+        double the alteration of the first steps in the cycle
+
+        :param fifths: Positive for sharps, negative for flats
+        :return:
+        """
+        alters = [0] * len(cls.STEPS)
+        cycle = Key.SHARPS if fifths > 0 else Key.FLATS
+        for index in range(abs(fifths)):
+            alters[cls.STEPS.index(cycle[index % len(cycle)])] += 1 if fifths > 0 else -1
+        return alters
+
+    @classmethod
+    def tables(cls) -> dict[str, np.ndarray]:
+        """
+        Returns the spelling tables, building them on first use:
+
+        - 'steps', 'octaves', 'alters': [keytype, mode, midi] -> index into Scale.STEPS, scientific octave, alteration
+        - 'accidentals': [keytype, mode, midi] -> whether the spelled note needs an accidental against the key signature
+        - 'degrees': [keytype, mode, pitch class] -> Chromatic scale degree, or None for notes outside of the scale
+        """
+        if cls._tables_ is not None:
+            return cls._tables_
+
+        chromatics = {}
+        for chromatic in Chromatic:
+            chromatics.setdefault((chromatic.pitch.step, int(chromatic.pitch.alter.alter)), chromatic)
+
+        shape = (len(cls.KEYTYPES), len(ModeType), 128)
+        steps = np.zeros(shape, dtype=np.int8)
+        octaves = np.zeros(shape, dtype=np.int8)
+        alters = np.zeros(shape, dtype=np.int8)
+        accidentals = np.zeros(shape, dtype=bool)
+        degrees = np.full(shape[:2] + (12,), None, dtype=object)
+
+        midi = np.arange(128)
+        naturals = {step.value: step_index for step_index, step in enumerate(cls.STEPS)}
+
+        for keytype_index, keytype in enumerate(cls.KEYTYPES):
+            for mode in ModeType:
+                fifths = keytype.fifths(mode)
+                key_alters = cls.key_alters(fifths)
+
+                # (step index, alteration) for every pitch class
+                spelling = [None] * 12
+                for step_index, step in enumerate(cls.STEPS):
+                    spelling[(step.value + key_alters[step_index]) % 12] = (step_index, key_alters[step_index])
+                for pitch_class in range(12):
+                    if spelling[pitch_class] is not None:
+                        step_index, alter = spelling[pitch_class]
+                        degrees[keytype_index, int(mode), pitch_class] = chromatics.get((cls.STEPS[step_index], alter))
+                    elif pitch_class in naturals:
+                        spelling[pitch_class] = (naturals[pitch_class], 0)
+                    elif fifths >= 0:
+                        spelling[pitch_class] = (naturals[(pitch_class - 1) % 12], 1)
+                    else:
+                        spelling[pitch_class] = (naturals[(pitch_class + 1) % 12], -1)
+
+                pitch_class_steps = np.array([step_index for step_index, alter in spelling], dtype=np.int8)
+                pitch_class_alters = np.array([alter for step_index, alter in spelling], dtype=np.int8)
+
+                table = (keytype_index, int(mode))
+                steps[table] = pitch_class_steps[midi % 12]
+                alters[table] = pitch_class_alters[midi % 12]
+                octaves[table] = (midi - alters[table]) // 12 - 1
+                accidentals[table] = alters[table] != np.array(key_alters, dtype=np.int8)[steps[table]]
+
+        cls._tables_ = {'steps': steps, 'octaves': octaves, 'alters': alters, 'accidentals': accidentals,
+                        'degrees': degrees}
+        return cls._tables_
 
 
 # ---------
@@ -532,6 +280,17 @@ class Key:
     SHARPS = [Step.F, Step.C, Step.G, Step.D, Step.A, Step.E, Step.B]
     FLATS = [Step.B, Step.E, Step.A, Step.D, Step.G, Step.C, Step.F]
 
+    _ALTER_ACCIDENTALS_ = {-2: Accidental.DOUBLE_FLAT, -1: Accidental.FLAT, 0: Accidental.NONE,
+                           1: Accidental.SHARP, 2: Accidental.DOUBLE_SHARP}
+
+    # Coefficients from Krumhansl and Schmuckler, as reported here: http://rnhart.net/articles/key-finding/
+    # z-scored once, and rotated to every root: rows 0 to 11 are the major keys on C to B, 12 to 23 the minor keys
+    KEY_PROFILES = np.vstack([linalg.circulant(stats.zscore(profile)).T for profile in (
+        np.asarray([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88]),
+        np.asarray([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17]))])
+    _MAJOR_FIFTHS_ = [0, -5, 2, -3, 4, -1, 6, 1, -4, 3, -2, 5]
+    _MINOR_FIFTHS_ = [-3, 4, -1, -6, 1, -4, 3, -2, 5, 0, -5, 2]
+
     # -----------
     # Constructor
     # -----------
@@ -565,11 +324,15 @@ class Key:
     # ---------
     # Methods
     # ---------
-    def degree(self, midi: int) -> Chromatic:
+    def degree(self, midi: int) -> Chromatic | None:
         return self.scale.find(midi)
 
-    def has_accidental(self, midi: int) -> bool:
-        return self.degree(midi) is None
+    def has_accidental(self, midi: Union[int, np.integer, np.ndarray]) -> Union[bool, np.ndarray]:
+        """
+        Tells whether a MIDI note, spelled in this key, needs an accidental against the key signature. Also takes an
+        array of MIDI notes, e.g. every note of a part, and returns an array of bools
+        """
+        return Scale.tables()['accidentals'][self.scale.index() + (Key._check_midi_(midi),)]
 
     def is_flat(self) -> bool:
         return self.keytype.fifths(self.modetype) < 0
@@ -592,42 +355,30 @@ class Key:
             # CMaj or Amin
             return []
 
-    def find_pitch(self, midi):
-        pitch_class = midi % 12
-        pitch_height = midi // 12
-        step = self.scale.find(pitch_class)
+    def find_pitch(self, midi: Union[int, np.integer]) -> Pitch:
+        """
+        Spells a MIDI note in this key
 
-        if step is not None:
-            pitch = Pitch((step, Octave.find(pitch_height)),
-                          alter=Accidental.NONE)
-        else:
-            if Step.has_value(pitch_class):
-                # add natural sign
-                step = Step(pitch_class)
-                accidental = Accidental.NATURAL
-                pitch = Pitch((step, Octave.find(pitch_height)),
-                              alter=Accidental.NATURAL)
-            else:
-                alter = 0
-                accidental = Accidental.NONE
-                if self.keytype.fifths(self.modetype) >= 0:
-                    # add sharp
-                    alter = -1
-                    accidental = Accidental.SHARP
-                else:
-                    # add flat
-                    alter = 1
-                    accidental = Accidental.FLAT
-                step = Step(pitch_class + alter)
-                if step is not None:
-                    suffix = 'b' if alter >= 0 else 's'
-                    chromatic = Chromatic[str(step) + suffix]
-                    pitch = chromatic.pitch
-                    return pitch
-                else:
-                    raise ValueError(
-                        f'Error: could not match midi note {midi} in key {self}')
-        return pitch
+        :param midi:
+        :return: A new Pitch, whose alter is the note's actual alteration (e.g. SHARP for F# in G major)
+        """
+        index = self.scale.index() + (Key._check_midi_(midi),)
+        tables = Scale.tables()
+        return Pitch(Scale.STEPS[tables['steps'][index]],
+                     Octave.from_int(int(tables['octaves'][index])),
+                     Key._ALTER_ACCIDENTALS_[int(tables['alters'][index])])
+
+    def spell(self, midi: Union[int, np.integer, np.ndarray]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Spells MIDI notes in this key without making Pitch objects
+
+        :param midi: A MIDI note, or an array of them
+        :return: Arrays of step indices into Scale.STEPS, scientific octaves, alterations in semitones, and whether an
+            accidental is needed against the key signature
+        """
+        index = self.scale.index() + (Key._check_midi_(midi),)
+        tables = Scale.tables()
+        return tables['steps'][index], tables['octaves'][index], tables['alters'][index], tables['accidentals'][index]
 
     def is_minor(self) -> bool:
         if self.modetype == ModeType.MINOR:
@@ -661,42 +412,40 @@ class Key:
     def find(cls, key) -> 'Key':
         pass
 
+    @classmethod
+    def _check_midi_(cls, midi: Union[int, np.integer, np.ndarray]) -> Union[int, np.ndarray]:
+        """
+        Makes sure MIDI notes can index the spelling tables, as negative indices would silently wrap around
+        """
+        if isinstance(midi, np.ndarray):
+            if midi.size > 0 and (midi.min() < 0 or midi.max() > 127):
+                raise ValueError(f'MIDI notes must be between 0 and 127, not {midi.min()} to {midi.max()}.')
+            return midi.astype(np.intp, copy=False)
+
+        if not 0 <= midi <= 127:
+            raise ValueError(f'MIDI note {midi} must be between 0 and 127.')
+        return int(midi)
+
     @classmethod
     def find_key(cls, pitch_histogram):
         """ Krumhansl-Schmuckler key-finding algorithm
 
             Source: https://gist.github.com/bmcfee/1f66825cef2eb34c839b42dddbad49fd
         """
-        X = stats.zscore(pitch_histogram)
-
-        # Coefficients from Kumhansl and Schmuckler
-        # as reported here: http://rnhart.net/articles/key-finding/
-        major = np.asarray([6.35, 2.23, 3.48, 2.33, 4.38,
-                            4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
-        major = stats.zscore(major)
-
-        minor = np.asarray([6.33, 2.68, 3.52, 5.38, 2.60,
-                            3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
-        minor = stats.zscore(minor)
-
-        major = linalg.circulant(major)
-        minor = linalg.circulant(minor)
-
-        major_r = major.T.dot(X)
-        minor_r = minor.T.dot(X)
-
-        mode = ModeType.MAJOR
-        if np.max(major_r) > np.max(minor_r):
-            mode = ModeType.MAJOR
-            root = np.argmax(major_r)
+        correlation = Key.KEY_PROFILES.dot(stats.zscore(pitch_histogram))
+        if np.max(correlation[:12]) > np.max(correlation[12:]):
+            return cls.profile_key(np.argmax(correlation[:12]))
         else:
-            mode = ModeType.MINOR
-            root = np.argmax(minor_r)
+            return cls.profile_key(12 + np.argmax(correlation[12:]))
 
-        major_fifths = [0, -5, 2, -3, 4, -1, 6, 1, -4, 3, -2, 5]
-        minor_fifths = [-3, 4, 1, -6, -1, -4, 3, -2, 5, 0, -5, 2]
+    @classmethod
+    def profile_key(cls, index: Union[int, np.integer]) -> 'Key':
+        """
+        Returns the key of a row of KEY_PROFILES
 
-        if mode is ModeType.MAJOR:
-            return Key(KeyType.find(major_fifths[root], mode), mode)
-        else:
-            return Key(KeyType.find(minor_fifths[root], mode), mode)
+        :param index: 0 to 11 for the major keys on C to B, 12 to 23 for the minor keys
+        :return:
+        """
+        root, mode = int(index) % 12, ModeType.MAJOR if index < 12 else ModeType.MINOR
+        fifths = Key._MAJOR_FIFTHS_ if mode is ModeType.MAJOR else Key._MINOR_FIFTHS_
+        return Key(KeyType.find(fifths[root], mode), mode)
@@ -1,10 +1,10 @@
-from enum import Enum
+from util import LookupEnum
 
 
 # -----------------
 # SyllabicType enum
 # -----------------
-class SyllabicType(Enum):
+class SyllabicType(LookupEnum):
     """
     Enum to represent which type of syllable
     """
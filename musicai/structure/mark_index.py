@@ -0,0 +1,196 @@
+"""
+Interval index over the MeasureMarks of a part, in absolute ticks
+"""
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from typing import NamedTuple, Union
+
+import numpy as np
+
+from structure.measure_mark import MeasureMark
+
+
+# ------------------
+# MarkInterval tuple
+# ------------------
+class MarkInterval(NamedTuple):
+    """
+    Where a measure mark lies in a part's tick timeline. Instantaneous marks have start == end
+    """
+    start: int
+    end: int
+    staff_index: int  # 0 is the primary staff
+    measure_index: int  # The measure holding the mark
+    mark: MeasureMark
+
+
+# ---------------
+# MarkIndex class
+# ---------------
+class MarkIndex:
+    """
+    Class to answer which measure marks of a part are active at a tick, or overlap a range of ticks, without scanning
+    back through the measures.
+
+    The intervals are sorted by start and laid out as an implicit balanced tree, the node of the range [lo, hi) being
+    its middle entry. Each node stores the greatest end in its range, so both queries visit O(log n + k) entries.
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, intervals: list[MarkInterval], resolution: Union[int, np.integer]):
+        """
+        :param intervals: The intervals to index, in any order
+        :param resolution: Ticks per quarter note of the timeline the intervals are in
+        """
+        self.resolution = int(resolution)
+        self.intervals: list[MarkInterval] = sorted(intervals, key=lambda interval: (interval.start, interval.end))
+
+        self._starts_: list[int] = [interval.start for interval in self.intervals]
+        self._max_ends_: list[int] = [0] * len(self.intervals)
+        self._build_(0, len(self.intervals))
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def __iter__(self):
+        return iter(self.intervals)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} marks={len(self.intervals)} resolution={self.resolution}>'
+
+    # -------
+    # Methods
+    # -------
+    def at(self, tick: Union[int, np.integer], mark_type: type = MeasureMark) -> list[MarkInterval]:
+        """
+        Finds every mark active at a tick. A mark is active from its start up to, but not including, its end, and an
+        instantaneous mark only at its start
+
+        :param tick: Absolute tick in the part
+        :param mark_type: Only marks of this class (or a subclass of it) are returned
+        :return: The active marks, ordered by start
+        """
+        found = []
+        self._stab_(0, len(self.intervals), int(tick), mark_type, found)
+        return found
+
+    def overlapping(self,
+                    start: Union[int, np.integer],
+                    end: Union[int, np.integer],
+                    mark_type: type = MeasureMark) -> list[MarkInterval]:
+        """
+        Finds every mark overlapping the ticks [start, end). Instantaneous marks overlap the range if they fall in it
+
+        :param start: Inclusive absolute start tick
+        :param end: Exclusive absolute end tick
+        :param mark_type: Only marks of this class (or a subclass of it) are returned
+        :return: The overlapping marks, ordered by start
+        """
+        found = []
+        if end > start:
+            self._range_(0, len(self.intervals), int(start), int(end), mark_type, found)
+        return found
+
+    def starting_between(self,
+                         start: Union[int, np.integer],
+                         end: Union[int, np.integer],
+                         mark_type: type = MeasureMark) -> list[MarkInterval]:
+        """
+        Finds every mark starting within the ticks [start, end)
+
+        :param start: Inclusive absolute start tick
+        :param end: Exclusive absolute end tick
+        :param mark_type: Only marks of this class (or a subclass of it) are returned
+        :return: The marks, ordered by start
+        """
+        return [interval for interval in self.intervals[bisect_left(self._starts_, start):
+                                                        bisect_left(self._starts_, end)]
+                if isinstance(interval.mark, mark_type)]
+
+    def latest(self, tick: Union[int, np.integer], mark_type: type = MeasureMark) -> MarkInterval | None:
+        """
+        Finds the last mark starting at or before a tick, e.g. the dynamic marking in effect for a note
+
+        :param tick: Absolute tick in the part
+        :param mark_type: Only marks of this class (or a subclass of it) are considered
+        :return: The mark, or None if there is none
+        """
+        for index in range(bisect_right(self._starts_, tick) - 1, -1, -1):
+            if isinstance(self.intervals[index].mark, mark_type):
+                return self.intervals[index]
+        return None
+
+    def _build_(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self._max_ends_[mid] = max(self.intervals[mid].end, self._build_(lo, mid), self._build_(mid + 1, hi))
+        return self._max_ends_[mid]
+
+    def _stab_(self, lo: int, hi: int, tick: int, mark_type: type, found: list) -> None:
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        # Nothing in this range reaches the tick; instantaneous marks end where they start, hence '<' and not '<='
+        if self._max_ends_[mid] < tick:
+            return
+
+        self._stab_(lo, mid, tick, mark_type, found)
+        interval = self.intervals[mid]
+        if interval.start <= tick:
+            if (tick < interval.end or interval.start == interval.end == tick) \
+                    and isinstance(interval.mark, mark_type):
+                found.append(interval)
+            self._stab_(mid + 1, hi, tick, mark_type, found)
+
+    def _range_(self, lo: int, hi: int, start: int, end: int, mark_type: type, found: list) -> None:
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_ends_[mid] < start:
+            return
+
+        self._range_(lo, mid, start, end, mark_type, found)
+        interval = self.intervals[mid]
+        if interval.start < end:
+            if (start < interval.end or start <= interval.start == interval.end) \
+                    and isinstance(interval.mark, mark_type):
+                found.append(interval)
+            self._range_(mid + 1, hi, start, end, mark_type, found)
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def from_part(cls, part, resolution: Union[int, np.integer]) -> 'MarkIndex':
+        """
+        Indexes the marks of every staff of a part. The measures must already be placed on the timeline, see
+        Part.update_timeline(). Mark positions are taken from their measures rather than from mark.tick_onset, so the
+        index is also right for views sharing measures with another score.
+
+        :param part: The Part to index
+        :param resolution: Ticks per quarter note the part's timeline was built with
+        :return:
+        """
+        intervals = []
+        for staff_index, measure_list in enumerate(part.staves):
+            if len(measure_list) == 0:
+                continue
+            staff_end = measure_list[-1].tick_onset + measure_list[-1].tick_duration
+
+            for measure_index, measure in enumerate(measure_list):
+                for mm in measure.iter_marks():
+                    end_index = measure_index + mm.measure_span
+                    end_measure_tick = measure_list[end_index].tick_onset if end_index < len(measure_list) \
+                        else staff_end
+
+                    start = measure.tick_onset + round(Fraction(mm.start_point) * resolution / mm.divisions)
+                    end = end_measure_tick + round(Fraction(mm.end_point) * resolution / mm.divisions)
+                    intervals.append(MarkInterval(start, max(start, end), staff_index, measure_index, mm))
+
+        return cls(intervals, resolution)
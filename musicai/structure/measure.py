@@ -1,14 +1,18 @@
+import copy
 import re
 import warnings
-from enum import Enum
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from math import lcm
 import numpy as np
-from typing import Union
+from typing import Iterator, Union
 
+from util import LookupEnum
 from structure.note_mark import StemType
 from structure.measure_mark import MeasureMark
 from structure import measure_mark
 from structure.clef import Clef
-from structure.key import Key
+from structure.key import Key, Scale
 from structure.time import TimeSignature, Tempo
 from structure.note import Note, Rest
 from structure.pitch import Accidental
@@ -17,7 +21,7 @@ from structure.pitch import Accidental
 # ----------------
 # BarlineType enum
 # ----------------
-class BarlineType(Enum):
+class BarlineType(LookupEnum):
     """
     An enum to represent BarlineTypes. An instance of this enum by itself, outside a Barline class, will
     always represent a right-sided barline
@@ -59,6 +63,25 @@ class BarlineType(Enum):
     # -----------
     # Methods
     # -----------
+    def to_mxml(self) -> str:
+        """
+        Returns the text of a MusicXML <bar-style> element for this barline type, or '' if MusicXML has no bar-style
+        for it
+        """
+        # Matched by name, as this is also called while the enum is created, to build its lookups
+        match self.name:
+            case 'NONE' | 'INVISIBLE':
+                return 'none'
+            case 'DOUBLE':
+                return 'light-light'
+            case 'FINAL':
+                return 'light-heavy'
+            case 'DOUBLE_HEAVY':
+                return 'heavy-heavy'
+            case 'SHORT' | 'TICK' | 'REGULAR' | 'HEAVY' | 'DASHED' | 'DOTTED':
+                return self.name.lower()
+            case _:
+                return ''
 
     # -----------
     # Class Methods
@@ -67,8 +90,8 @@ class BarlineType(Enum):
     def from_str(cls, value: str) -> Union['BarlineType', None]:
         value = ''.join(filter(str.isalpha, value)).upper()
 
-        if value in [bt.name for bt in BarlineType]:
-            return BarlineType[value]
+        if (barlinetype := cls.by_name(value)) is not None:
+            return barlinetype
         else:
             # warnings.warn(f'Barline {value.title()} does not exist--returning BarlineType.NONE', stacklevel=2)
             return None
@@ -77,7 +100,7 @@ class BarlineType(Enum):
 # --------------------
 # BarlineLocation enum
 # --------------------
-class BarlineLocation(Enum):
+class BarlineLocation(LookupEnum):
     NONE = 0
     LEFT = 1
     MIDDLE = 2
@@ -161,7 +184,7 @@ class Barline:
 # -------------
 # MeasureStyle Enum
 # -------------
-class MeasureStyle(Enum):
+class MeasureStyle(LookupEnum):
     NONE = None
     MULTIPLE_REST = 0
     MEASURE_REPEAT = 1
@@ -213,6 +236,114 @@ class Transposition:
             return False
 
 
+# --------------
+# NoteList class
+# --------------
+class NoteList(list):
+    """
+    Class to represent the notes of a measure: a list which tells its measure whenever it is edited, so the onset
+    index, tick offsets, and accidentals are worked out again. Each note it holds is tied to the measure as well, so
+    that setting a note's value does the same
+    """
+    __slots__ = ('_measure_',)
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, measure: 'Measure', notes=()):
+        super().__init__(notes)
+        self._measure_ = measure
+        for note in self:
+            self._adopt_(note)
+
+    # --------
+    # Override
+    # --------
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = list(value)
+            super().__setitem__(key, value)
+            self._changed_(value)
+        else:
+            super().__setitem__(key, value)
+            self._changed_([value])
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed_()
+
+    def __iadd__(self, notes):
+        notes = list(notes)
+        super().__iadd__(notes)
+        self._changed_(notes)
+        return self
+
+    def __imul__(self, count):
+        super().__imul__(count)
+        self._changed_()
+        return self
+
+    def __deepcopy__(self, memo) -> 'NoteList':
+        # Filled in without telling the measure, which may itself be only partly copied yet
+        notes = NoteList.__new__(NoteList)
+        memo[id(self)] = notes
+        list.extend(notes, [copy.deepcopy(note, memo) for note in self])
+        notes._measure_ = copy.deepcopy(getattr(self, '_measure_', None), memo)
+        return notes
+
+    # ---------
+    # Methods
+    # ---------
+    def append(self, note: Note) -> None:
+        super().append(note)
+        self._changed_([note])
+
+    def extend(self, notes) -> None:
+        notes = list(notes)
+        super().extend(notes)
+        self._changed_(notes)
+
+    def insert(self, index, note: Note) -> None:
+        super().insert(index, note)
+        self._changed_([note])
+
+    def pop(self, index=-1) -> Note:
+        note = super().pop(index)
+        self._changed_()
+        return note
+
+    def remove(self, note: Note) -> None:
+        super().remove(note)
+        self._changed_()
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed_()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._changed_()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed_()
+
+    def _adopt_(self, note: Note) -> None:
+        if isinstance(note, Note):
+            note._measure_ = self._measure_
+            if note.is_note_group():
+                for grouped_note in note.notes:
+                    grouped_note._measure_ = self._measure_
+
+    def _changed_(self, added: list[Note] = ()) -> None:
+        # The measure is not yet set while an unpickled list is being filled in
+        if getattr(self, '_measure_', None) is None:
+            return
+        for note in added:
+            self._adopt_(note)
+        self._measure_._notes_changed_()
+
+
 # -------------
 # Measure class
 # -------------
@@ -235,6 +366,18 @@ class Measure:
         self.measure_marks: list[MeasureMark] = []
         self.notes: list[Note] = []
 
+        # Prefix sums of note values: the onset of every note, as a fraction of a whole note, kept in step with
+        # self.notes on append so that time lookups can bisect. Any other edit to the notes marks it out of date
+        self._onsets_: list[Fraction] = []
+        self._end_: Fraction = Fraction(0)
+        self._index_current_: bool = True
+        self._tick_offsets_: tuple[int, list[int]] | None = None  # (resolution, offsets) cached by tick_offsets()
+
+        # Accidentals are worked out again only if the notes changed or the measure's context did
+        self.accidentals_dirty: bool = True
+        self._accidental_context_ = None
+        self._accidentals_carried_: dict = {}
+
         self.time: TimeSignature | None = time
         self.clef: Clef | None = clef
         self.key: Key | None = key
@@ -242,6 +385,10 @@ class Measure:
         self.transposition: Transposition | None = Transposition()
         self.divisions: int | np.integer = 256
 
+        # Absolute position and length in the score's tick timeline, set by Score.update_timeline()
+        self.tick_onset: int = 0
+        self.tick_duration: int = 0
+
         self.barline: Barline | BarlineType | list[Barline,
                                                    BarlineType] = barline
 
@@ -257,16 +404,16 @@ class Measure:
     # Override
     # --------
     def __str__(self) -> str:
-        current_musical_pos = 0  # Used to dictate MeasureMark position
-        mm_to_print = self.measure_marks.copy()
+        current_musical_pos = Fraction(0)  # Used to dictate MeasureMark position, in quarter notes
+        mm_to_print = list(self.iter_marks())
         ret_str = ''
 
         # Print every note and measure mark
-        for note in self.notes:
+        for note in self.iter_notes():
 
             # Append the MeasureMark if it's at or behind the current note
-            for mm in mm_to_print:
-                if mm.start_point <= current_musical_pos:
+            for mm in mm_to_print.copy():
+                if Fraction(mm.start_point) / mm.divisions <= current_musical_pos:
                     # Print the mark and remove it from the list
                     ret_str += str(mm) + ' '
                     mm_to_print.remove(mm)
@@ -277,7 +424,7 @@ class Measure:
             ret_str += str(note) + ' '
 
             # Update the current musical location
-            current_musical_pos += (note.value.value * 4) * note.division
+            current_musical_pos += note.value.fraction * 4
 
         # if isinstance(self.barline, list):
         #     ret_str += [str(barline) for barline in self.barlines]
@@ -287,30 +434,136 @@ class Measure:
         return ret_str
 
     def __len__(self):
-        return len(self.notes)
+        return len(self._notes_)
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def notes(self) -> list[Note]:
+        """
+        The notes of this measure, in order, held in a NoteList so that edits to it are noticed. Use iter_notes() to
+        only read them
+        """
+        return self._notes_
+
+    @notes.setter
+    def notes(self, notes: list[Note]):
+        self._notes_ = NoteList(self, notes)
+        self._notes_changed_()
+
+    @property
+    def measure_marks(self) -> list[MeasureMark]:
+        """
+        The measure marks of this measure. Use iter_marks() to only read them
+        """
+        return self._measure_marks_
+
+    @measure_marks.setter
+    def measure_marks(self, measure_marks: list[MeasureMark]):
+        self._measure_marks_ = measure_marks
+
+    @property
+    def length(self) -> Fraction:
+        """
+        The exact length of this measure as a fraction of a whole note. The time signature dictates it; without one,
+        the notes do
+        """
+        if self.time is not None:
+            return Fraction(self.time.numerator, self.time.denominator)
+        return self.content_length
+
+    @property
+    def content_length(self) -> Fraction:
+        """
+        The exact length of the notes in this measure laid end to end, as a fraction of a whole note
+        """
+        self._ensure_index_()
+        return self._end_
+
+    @property
+    def onsets(self) -> list[Fraction]:
+        """
+        The exact onset of every note in this measure, as a fraction of a whole note. Read-only
+        """
+        self._ensure_index_()
+        return self._onsets_
+
+    @property
+    def is_shared(self) -> bool:
+        """
+        Whether this measure is seen through a MeasureView that has not yet been written to, and so must not be edited
+        in place
+        """
+        return False
+
+    @property
+    def resolution(self) -> int:
+        """
+        The smallest amount of ticks per quarter note at which every note, mark, division, and the time signature of
+        this measure fall on a whole number of ticks
+        """
+        resolution = 1
+        if self.divisions is not None:
+            resolution = lcm(resolution, int(self.divisions))
+        if self.time is not None:
+            resolution = lcm(resolution, (Fraction(self.time.numerator, self.time.denominator) * 4).denominator)
+        for note in self.iter_notes():
+            resolution = lcm(resolution, note.value.resolution)
+            if note.is_note_group():
+                for grouped_note in note.notes:
+                    resolution = lcm(resolution, grouped_note.value.resolution)
+        for mm in self.iter_marks():
+            resolution = lcm(resolution, mm.resolution)
+        return resolution
 
     # ---------
     # Methods
     # ---------
     def append(self, notes):
         # TODO add checks for measure full
-        # TODO fix timing
-        # TODO add list of notes
 
         if isinstance(notes,  (list, tuple)):
             for note in notes:
                 self.stem_note(note)
-                self.notes.append(note)
+                self._append_note_(note)
         elif isinstance(notes, Rest):
-            self.notes.append(notes)
+            self._append_note_(notes)
         elif isinstance(notes, Note):
             # self.stem_note(notes) TODO: Automatic note stemming
-            self.notes.append(notes)
+            self._append_note_(notes)
         else:
             raise TypeError(f'Cannot add type {type(notes)} to Measure')
-        self.pack()
 
-        # NOW, ADJUST THE NOTE'S LOCATION
+    def _append_note_(self, note: Note) -> None:
+        """
+        Appends a single note and extends the onset index by one entry, without revisiting earlier notes
+        """
+        self._ensure_index_()
+
+        note.start_point = self._end_
+        self.notes.append(note)
+
+        # The index was current before the append, so one more entry brings it up to date again
+        self._onsets_.append(self._end_)
+        self._end_ += note.value.fraction
+        self._index_current_ = True
+
+    def _ensure_index_(self) -> None:
+        """
+        Rebuilds the onset index if the notes were edited since it was built. Editing self.notes and setting the value
+        of one of its notes are both noticed; editing a note's NoteValue in place is not, and needs a call to pack()
+        """
+        if not self._index_current_:
+            self.pack()
+
+    def _notes_changed_(self) -> None:
+        """
+        Marks the onset index, tick offsets, and accidentals of this measure out of date, after its notes were edited
+        """
+        self._index_current_ = False
+        self._tick_offsets_ = None
+        self.accidentals_dirty = True
 
     def append_at(self,
                   location: Union[int, np.integer, float, np.inexact],
@@ -336,13 +589,106 @@ class Measure:
             self.stem_note(note)
 
     def set_accidentals(self):
+        """
+        Decides which notes of this measure show an accidental, from its own key and ignoring earlier measures
+        """
+        self.accidentals_dirty = True
+        self.update_accidentals(self.key)
+
+    def accidentals_current(self, key: Key | None = None, carried: dict | None = None) -> bool:
+        """
+        Tells whether the accidentals of this measure were worked out for these notes in this context
+        """
+        return not self.accidentals_dirty and self._accidental_context_ == Measure._accidental_context_key_(key,
+                                                                                                           carried)
+
+    def update_accidentals(self, key: Key | None = None, carried: dict | None = None) -> dict:
+        """
+        Decides which notes of this measure show an accidental, setting show_accidental, display_accidental and
+        cautionary_accidental on each. Each staff line, i.e. step and octave, starts the measure with the alteration
+        of the key signature; an accidental is shown whenever a note differs from what is in effect on its line, and
+        then stays in effect until the end of the measure. Notes tied over from an earlier note never show one. The
+        first note on a line altered in the previous measure gets a cautionary accidental if it is back in key.
+
+        Nothing is recomputed if the notes have not changed since the last call with the same context.
+
+        :param key: The key in effect, or None for no key signature
+        :param carried: The lines left altered by the previous measure, as returned by its update_accidentals()
+        :return: The lines this measure leaves altered away from the key signature, as {(step, octave): alter}
+        """
+        if self.accidentals_current(key, carried):
+            return self._accidentals_carried_
+
+        shown, self._accidentals_carried_ = self._work_out_accidentals_(key, carried)
         for note in self.notes:
-            if self.key.has_accidental(note.midi):
-                note.show_accidental = True
-                if note.accidental is None or note.accidental is Accidental.NONE:
-                    # natural
-                    note.accidental = Accidental.NATURAL
-            pass
+            for member in (note.notes if note.is_note_group() else [note]):
+                member.display_accidental, member.cautionary_accidental = shown.get(id(member), (None, False))
+                member.show_accidental = member.display_accidental is not None
+
+        self.accidentals_dirty = False
+        self._accidental_context_ = Measure._accidental_context_key_(key, carried)
+        return self._accidentals_carried_
+
+    def displayed_accidentals(self, key: Key | None = None, carried: dict | None = None) -> tuple[dict, dict]:
+        """
+        Decides which notes of this measure show an accidental as update_accidentals() does, but without setting
+        anything on the notes. If they are already up to date in this context, what they hold is read back instead
+
+        :param key: The key in effect, or None for no key signature
+        :param carried: The lines left altered by the previous measure
+        :return: {id(note): (accidental, cautionary)} for every note showing an accidental, and the lines this measure
+                 leaves altered away from the key signature
+        """
+        if not self.accidentals_current(key, carried):
+            return self._work_out_accidentals_(key, carried)
+
+        shown = {}
+        for note in self.iter_notes():
+            for member in (note.notes if note.is_note_group() else [note]):
+                if member.show_accidental and member.display_accidental is not None:
+                    shown[id(member)] = (member.display_accidental, member.cautionary_accidental)
+        return shown, self._accidentals_carried_
+
+    def _work_out_accidentals_(self, key: Key | None, carried: dict | None) -> tuple[dict, dict]:
+        """
+        Works out the accidentals of this measure, see update_accidentals(), leaving the notes as they are
+
+        :return: {id(note): (accidental, cautionary)} for every note showing an accidental, and the lines this measure
+                 leaves altered away from the key signature
+        """
+        if key is not None:
+            signature = dict(zip(Scale.STEPS, Scale.key_alters(key.fifths())))
+        else:
+            signature = dict.fromkeys(Scale.STEPS, 0)
+
+        state = {}
+        courtesy = dict(carried) if carried is not None else {}
+        shown = {}
+
+        for note in self.iter_notes():
+            members = note.notes if note.is_note_group() else [note]
+            for member in members:
+                if member.is_rest() or not member.is_pitched:
+                    continue
+
+                line = (member.pitch.step, member.pitch.octave)
+                alter = float(member.pitch.alter)
+
+                if member.is_tied_stop() or note.is_tied_stop():
+                    # The alteration carries over from the note tied to, without affecting later notes
+                    courtesy.pop(line, None)
+                    continue
+
+                accidental = Accidental.NATURAL if alter == 0 else member.pitch.alter
+                if alter != state.get(line, signature[member.pitch.step]):
+                    shown[id(member)] = (accidental, False)
+                elif line in courtesy and courtesy[line] != alter:
+                    shown[id(member)] = (accidental, True)
+
+                courtesy.pop(line, None)
+                state[line] = alter
+
+        return shown, {line: alter for line, alter in state.items() if alter != signature[line[0]]}
 
     def set_barline(self, value: Union[Barline, BarlineType, str]):
         if isinstance(value, str):
@@ -380,26 +726,31 @@ class Measure:
         # second half of measure
 
     def min(self):
-        return min(self.notes).value
+        return min(self.iter_notes()).value
 
     def max(self):
-        return max(self.notes).value
+        return max(self.iter_notes()).value
 
     def sum(self):
-        return sum(self.notes)
+        return sum(self.iter_notes())
 
     def len(self):
         return self.time.numerator / self.time.denominator
 
     def count(self):
-        return len(self.notes)
+        return len(self._notes_)
 
     def pack(self):
-        # determine note times
-        time = 0
+        # determine note times, exactly, as fractions of a whole note
+        time = Fraction(0)
+        self._onsets_ = []
         for note in self.notes:
             note.start_point = time
-            time += note.value
+            self._onsets_.append(time)
+            time += note.value.fraction
+        self._end_ = time
+        self._index_current_ = True
+        self._tick_offsets_ = None
         # if time > 1:
         #    raise NotImplementedError
         # elif time == 1.0:
@@ -422,8 +773,129 @@ class Measure:
     def set_note(self):
         pass
 
+    def get_note_at_location(self, location: Union[int, np.integer, float, np.inexact, Fraction]) -> Note | None:
+        """
+        Returns the first note starting at or after the location
+
+        :param location: Where in the measure to find the note, in units of note value
+        :return: The note if one exists at or after the location; otherwise, None
+        """
+        # Fetched first, as a note handed out may be edited: a MeasureView makes its own copy here
+        notes = self.notes
+        self._ensure_index_()
+
+        index = bisect_left(self._onsets_, location)
+        if index < len(notes):
+            return notes[index]
+        return None
+
+    def notes_sounding_at(self, location: Union[int, np.integer, float, np.inexact, Fraction]) -> list[Note]:
+        """
+        Returns the notes which are held at the location: started at or before it, and not yet finished
+
+        :param location: Where in the measure to look, in units of note value
+        :return: The sounding notes, which may be empty
+        """
+        notes = self.notes
+        self._ensure_index_()
+
+        # Notes are laid end to end, so only the latest note to start can still be sounding
+        index = bisect_right(self._onsets_, location) - 1
+        if index < 0 or location >= self._onsets_[index] + notes[index].value.fraction:
+            return []
+        return [notes[index]]
+
+    def notes_between(self,
+                      start: Union[int, np.integer, float, np.inexact, Fraction],
+                      end: Union[int, np.integer, float, np.inexact, Fraction]) -> list[Note]:
+        """
+        Returns the notes which start within the half-open range [start, end)
+
+        :param start: Inclusive start of the range, in units of note value
+        :param end: Exclusive end of the range, in units of note value
+        :return: The notes starting in the range, in order
+        """
+        notes = self.notes
+        self._ensure_index_()
+
+        return notes[bisect_left(self._onsets_, start):bisect_left(self._onsets_, end)]
+
+    def iter_notes(self) -> Iterator[Note]:
+        """
+        Iterates over the notes of this measure in order, for reading only: unlike self.notes, this never has a
+        MeasureView copy the measure it shares
+
+        :return:
+        """
+        return iter(self._notes_)
+
+    def iter_marks(self) -> Iterator[MeasureMark]:
+        """
+        Iterates over the measure marks of this measure, for reading only, as iter_notes() does for notes
+
+        :return:
+        """
+        return iter(self._measure_marks_)
+
+    def writable(self) -> 'Measure':
+        """
+        Returns this measure, ready to be edited. A MeasureView first makes its own copy of the measure it shares
+
+        :return:
+        """
+        return self
+
+    def tick_offsets(self, resolution: Union[int, np.integer]) -> list[int]:
+        """
+        Returns the onset of every note, in ticks from the start of this measure. Unlike note.tick_onset, this holds
+        for every score the measure is shared by. Cached until the notes change
+
+        :param resolution: Ticks per quarter note
+        :return:
+        """
+        self._ensure_index_()
+
+        if self._tick_offsets_ is None or self._tick_offsets_[0] != resolution:
+            offsets = []
+            for onset in self._onsets_:
+                ticks = onset * 4 * int(resolution)
+                if ticks.denominator != 1:
+                    raise ValueError(f'A note at {onset} cannot be placed with a resolution of {resolution} ticks per '
+                                     f'quarter note.')
+                offsets.append(ticks.numerator)
+            self._tick_offsets_ = (resolution, offsets)
+
+        return self._tick_offsets_[1]
+
+    def update_ticks(self,
+                     onset: Union[int, np.integer],
+                     resolution: Union[int, np.integer]) -> int:
+        """
+        Places this measure and its notes on the score's tick timeline. Marks are placed by the owning Part, since
+        they may end in a later measure.
+
+        :param onset: Tick at which this measure begins
+        :param resolution: Ticks per quarter note
+        :return: The length of this measure in ticks
+        """
+        self.tick_onset = int(onset)
+
+        time = self.tick_onset
+        for note in self.notes:
+            note.tick_onset = time
+            note.tick_duration = note.value.ticks(resolution)
+            if note.is_note_group():
+                for grouped_note in note.notes:
+                    grouped_note.tick_onset = time
+                    grouped_note.tick_duration = grouped_note.value.ticks(resolution)
+            time += note.tick_duration
+
+        self.tick_duration = (self.length * 4 * resolution).numerator
+
+        return self.tick_duration
+
     def print_measure_marks(self):
-        print([repr(mm) for mm in self.measure_marks])
+        print([repr(mm) for mm in self.iter_marks()])
 
     def insert_tempo_change(self):
         pass
@@ -532,3 +1004,167 @@ class Measure:
     @classmethod
     def from_abc(cls):
         pass
+
+    @classmethod
+    def _accidental_context_key_(cls, key: Key | None, carried: dict | None) -> tuple:
+        return (None if key is None else (key.keytype, key.modetype),
+                frozenset(carried.items()) if carried is not None else frozenset())
+
+
+# -----------------
+# MeasureView class
+# -----------------
+class MeasureView(Measure):
+    """
+    Class to represent a Measure shared between several scores, as made by slicing a Score. Until it is written to,
+    the view holds nothing but its own place in time, and everything else is read from the shared measure, so edits to
+    the original show through the view. The first write to the view gives it its own deep copy of the measure's
+    contents to work on, leaving the original untouched. Setting an attribute, calling an editing method, and fetching
+    notes or measure_marks, which may then be edited in place, are all writes; iter_notes(), iter_marks(), onsets, and
+    tick_offsets() only read.
+
+    The view keeps its own tick_onset and tick_duration, since the same measure may sit at a different time in each
+    score sharing it.
+    """
+    _LOCAL_ = {'tick_onset', 'tick_duration'}
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, measure: Measure):
+        # A view not yet written to shares the measure behind it rather than being stacked on top
+        if isinstance(measure, MeasureView) and measure.is_shared:
+            measure = measure._base_
+
+        object.__setattr__(self, '_base_', measure)
+        object.__setattr__(self, 'tick_onset', measure.tick_onset)
+        object.__setattr__(self, 'tick_duration', measure.tick_duration)
+
+    # --------
+    # Override
+    # --------
+    def __getattr__(self, name):
+        # Only reached for attributes the view does not hold itself
+        base = vars(self).get('_base_')
+        if base is None or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(base, name)
+
+    def __setattr__(self, name, value):
+        if name not in MeasureView._LOCAL_:
+            self.writable()
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        self.writable()
+        object.__delattr__(self, name)
+
+    def __deepcopy__(self, memo) -> Measure:
+        # A deep copy shares nothing, so it is a plain Measure
+        measure = Measure.__new__(Measure)
+        memo[id(self)] = measure
+        MeasureView._copy_state_(self._target_(), measure, memo)
+        measure.tick_onset = self.tick_onset
+        measure.tick_duration = self.tick_duration
+        return measure
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}({"shared" if self.is_shared else "copied"}) {str(self)}>'
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def notes(self) -> list[Note]:
+        return self.writable()._notes_
+
+    @notes.setter
+    def notes(self, notes: list[Note]):
+        Measure.notes.fset(self.writable(), notes)
+
+    @property
+    def measure_marks(self) -> list[MeasureMark]:
+        return self.writable()._measure_marks_
+
+    @measure_marks.setter
+    def measure_marks(self, measure_marks: list[MeasureMark]):
+        Measure.measure_marks.fset(self.writable(), measure_marks)
+
+    @property
+    def is_shared(self) -> bool:
+        return vars(self).get('_base_') is not None
+
+    # ---------
+    # Methods
+    # ---------
+    def writable(self) -> 'MeasureView':
+        """
+        Gives this view its own deep copy of the shared measure's contents, the first time it is called
+
+        :return: This view
+        """
+        base = vars(self).get('_base_')
+        if base is not None:
+            MeasureView._copy_state_(base, self, {})
+            vars(self)['_base_'] = None
+        return self
+
+    def tick_offsets(self, resolution: Union[int, np.integer]) -> list[int]:
+        if self.is_shared:
+            return self._base_.tick_offsets(resolution)
+        return super().tick_offsets(resolution)
+
+    def update_ticks(self,
+                     onset: Union[int, np.integer],
+                     resolution: Union[int, np.integer]) -> int:
+        """
+        Places this view on its score's tick timeline. The notes of a shared measure are left alone, since they belong
+        to the original's timeline; use tick_offsets() to place them
+
+        :param onset: Tick at which this measure begins
+        :param resolution: Ticks per quarter note
+        :return: The length of this measure in ticks
+        """
+        if not self.is_shared:
+            return super().update_ticks(onset, resolution)
+
+        self.tick_onset = int(onset)
+        self.tick_duration = (self.length * 4 * resolution).numerator
+        return self.tick_duration
+
+    def update_accidentals(self, key: Key | None = None, carried: dict | None = None) -> dict:
+        """
+        Works out the accidentals of this view's measure, see Measure.update_accidentals(). A shared measure is only
+        copied if its accidentals would change in this view's context
+
+        :param key: The key in effect, or None for no key signature
+        :param carried: The lines left altered by the previous measure
+        :return: The lines this measure leaves altered away from the key signature
+        """
+        if self.is_shared and self._base_.accidentals_current(key, carried):
+            return self._base_.update_accidentals(key, carried)
+        self.writable()
+        return super().update_accidentals(key, carried)
+
+    def _ensure_index_(self) -> None:
+        if self.is_shared:
+            self._base_._ensure_index_()
+        else:
+            super()._ensure_index_()
+
+    def _target_(self) -> Measure:
+        return self._base_ if self.is_shared else self
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def _copy_state_(cls, source: Measure, target: Measure, memo: dict) -> None:
+        """
+        Deep copies what source holds into target, so that the copied notes and marks belong to target. The view
+        fields of source, and the place in time of target, are left out
+        """
+        memo[id(source)] = target
+        state = {name: value for name, value in vars(source).items()
+                 if name != '_base_' and name not in MeasureView._LOCAL_}
+        vars(target).update(copy.deepcopy(state, memo))
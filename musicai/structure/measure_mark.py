@@ -1,6 +1,8 @@
 import warnings
-from enum import Enum
+from fractions import Fraction
+from math import lcm
 
+from util import LookupEnum
 from structure.note_mark import StemType
 from structure.clef import Clef
 from structure.time import TimeSignature, TempoType, Tempo
@@ -53,6 +55,10 @@ class MeasureMark:
         self.measure_index = 0
         self.measure_span = 0
 
+        # Absolute position and length in the score's tick timeline, set by Score.update_timeline()
+        self.tick_onset: int = 0
+        self.tick_duration: int = 0
+
         # Find out if it's connected to a note, and if so, then link it to that note
         if note_connected:
             pass
@@ -83,12 +89,35 @@ class MeasureMark:
             self._duration_ = value
             self.end_point = self.start_point + value
 
+    @property
+    def resolution(self) -> int:
+        """
+        The smallest amount of ticks per quarter note at which both end points are a whole number of ticks
+        """
+        return lcm((Fraction(self.start_point) / self.divisions).denominator,
+                   (Fraction(self.end_point) / self.divisions).denominator)
+
     # -----------
     # Methods
     # -----------
     def update_position(self):
         pass
 
+    def update_ticks(self,
+                     start_measure_tick: Union[int, np.integer],
+                     end_measure_tick: Union[int, np.integer],
+                     resolution: Union[int, np.integer]) -> None:
+        """
+        Places this mark on the score's tick timeline.
+
+        :param start_measure_tick: Tick at which the measure containing this mark begins
+        :param end_measure_tick: Tick at which the measure 'measure_span' in front of the containing measure begins
+        :param resolution: Ticks per quarter note
+        """
+        self.tick_onset = int(start_measure_tick) + round(Fraction(self.start_point) * resolution / self.divisions)
+        tick_end = int(end_measure_tick) + round(Fraction(self.end_point) * resolution / self.divisions)
+        self.tick_duration = max(0, tick_end - self.tick_onset)
+
     # -----------
     # Class Methods
     # -----------
@@ -97,7 +126,7 @@ class MeasureMark:
 # ---------------------
 # Intensity enum
 # ---------------------
-class Intensity(Enum):
+class Intensity(LookupEnum):
     """
     Enum to represent the intensities of line markings and standard multiplier values
     """
@@ -109,7 +138,7 @@ class Intensity(Enum):
 # ---------------------
 # DynamicChangeType enum
 # ---------------------
-class DynamicChangeType(Enum):
+class DynamicChangeType(LookupEnum):
     """
     Enum to represent the change in dynamics
     """
@@ -120,7 +149,7 @@ class DynamicChangeType(Enum):
 # ---------------------
 # HairpinType enum
 # ---------------------
-class HairpinType(Enum):
+class HairpinType(LookupEnum):
     """
     Enum to represent types of hairpins
     """
@@ -135,7 +164,7 @@ class HairpinType(Enum):
 # ---------------------
 # TempoChangeType enum
 # ---------------------
-class TempoChangeType(Enum):
+class TempoChangeType(LookupEnum):
     """
     Enum to represent the change in tempo
     """
@@ -193,9 +222,8 @@ class DynamicChangeMark(MeasureMark):
         MeasureMark.__init__(self, start_point, end_point, False, divisions)
 
         if isinstance(dynamic_change_type, str):
-            if dynamic_change_type.upper() in [dct.name for dct in DynamicChangeType]:
-                self.dynamic_change_type = DynamicChangeType[dynamic_change_type.upper(
-                )]
+            if (found := DynamicChangeType.by_name(dynamic_change_type)) is not None:
+                self.dynamic_change_type = found
             else:
                 raise ValueError(
                     f'\'{dynamic_change_type}\' is not a valid Dynamic Change Type.')
@@ -206,8 +234,8 @@ class DynamicChangeMark(MeasureMark):
                             f'of type {type(dynamic_change_type)}.')
 
         if isinstance(intensity, str):
-            if intensity.upper() in [i.name for i in Intensity]:
-                self.intensity = Intensity[intensity.upper()]
+            if (found := Intensity.by_name(intensity)) is not None:
+                self.intensity = found
             else:
                 raise ValueError(f'\'{intensity}\' is not a valid Intensity.')
         elif isinstance(intensity, Intensity):
@@ -219,8 +247,8 @@ class DynamicChangeMark(MeasureMark):
         self.hairpin = hairpin
 
         if isinstance(hairpin_type, str):
-            if hairpin_type.upper() in [ht.name for ht in HairpinType]:
-                self.hairpin_type = HairpinType[hairpin_type.upper()]
+            if (found := HairpinType.by_name(hairpin_type)) is not None:
+                self.hairpin_type = found
             else:
                 raise ValueError(
                     f'\'{hairpin_type}\' is not a valid Hairpin Type.')
@@ -362,7 +390,7 @@ class OctaveLineMark(MeasureMark):
 # ---------------------
 # PedalType enum
 # ---------------------
-class PedalType(Enum):
+class PedalType(LookupEnum):
     """
     Enum to represent types of pedalling in keyboard notation
     """
@@ -418,7 +446,7 @@ class PedalMark(MeasureMark):
 # ---------------------
 # VoltaBracketType class
 # ---------------------
-class VoltaBracketType(Enum):
+class VoltaBracketType(LookupEnum):
     """
     Class to represent if the ending bracket is open or closed
     """
@@ -521,7 +549,7 @@ class TempoMark(InstantaneousMeasureMark):
 # ----------------
 # DynamicType enum
 # ----------------
-class DynamicType(Enum):
+class DynamicType(LookupEnum):
     NONE = 0, 0, '', ''
     PIANISSISSISSIMO = 1, 10, 'pppp', '\U0001D18F\U0001D18F\U0001D18F\U0001D18F'
     PIANISSISSIMO = 2, 23, 'ppp', '\U0001D18F\U0001D18F\U0001D18F'
@@ -573,7 +601,7 @@ class DynamicMark(InstantaneousMeasureMark):
 # ---------------------
 # MiscMarkType enum
 # ---------------------
-class MiscMarkType(Enum):
+class MiscMarkType(LookupEnum):
     """
     Enum to represent common miscellaneous marks throughout measures
     """
@@ -3,10 +3,11 @@ Representation of a musical note or rest
 """
 import re
 import warnings
-from enum import Enum
+from fractions import Fraction
 from typing import Union
 import numpy as np
 
+from util import LookupEnum
 from structure.lyric import Lyric
 from structure.note_mark import Beam, Notehead, StemType, TieType
 from structure.pitch import Accidental, Pitch
@@ -21,7 +22,7 @@ from structure.clef import Clef
 # -------------
 # NoteType enum
 # -------------
-class NoteType(Enum):
+class NoteType(LookupEnum):
     """
     Representation the relative duration of a note or rest symbol
     """
@@ -56,6 +57,8 @@ class NoteType(Enum):
         obj.abbr = values[1]
         obj.note = values[2]
         obj.rest = values[3]
+        # exact length as a fraction of a whole note; the float values above are rounded for the smallest types
+        obj.fraction = Fraction(values[0]).limit_denominator(4096)
         obj._all_values = values
         return obj
 
@@ -78,6 +81,23 @@ class NoteType(Enum):
     # ---------
     # Methods
     # ---------
+    def to_mxml(self) -> str:
+        """
+        Returns the text of a MusicXML <type> element for this note type. Types shorter than a 1024th are not allowed
+        in MusicXML, but are written the same way.
+        """
+        # Matched by name, as this is also called while the enum is created, to build its lookups
+        match self.name:
+            case 'NONE':
+                return ''
+            case 'EIGHTH' | 'QUARTER' | 'HALF' | 'WHOLE' | 'LONG':
+                return self.name.lower()
+            case 'DOUBLE':
+                return 'breve'
+            case 'LARGE':
+                return 'maxima'
+            case _:
+                return self.abbr
 
     # -------------
     # Class Methods
@@ -92,10 +112,10 @@ class NoteType(Enum):
             raise TypeError(
                 f'Cannot find NoteType to match {lookup} of type {type(lookup)}')
         string = lookup.lower().strip()
-        for nt in NoteType:
-            if nt.abbr.lower() == string or nt.name.lower() == string or \
-                    nt.note.lower() == string or nt.rest.lower() == string:
-                return nt
+        for notetype in (cls.by_name(string), cls.by_attribute('abbr', string), cls.by_attribute('note', string),
+                         cls.by_attribute('rest', string)):
+            if notetype is not None:
+                return notetype
         raise ValueError(
             f'Cannot find NoteType to match {lookup} of value {type(lookup)}')
 
@@ -104,47 +124,21 @@ class NoteType(Enum):
         if not isinstance(lookup, Union[float, int, np.inexact, np.integer]):
             raise TypeError(
                 f'Cannot find NoteType to match {lookup} of type {type(lookup)}')
-        for nt in NoteType:
-            if nt.value == lookup:
-                return nt
+        if (notetype := cls.by_value(lookup)) is not None:
+            return notetype
         raise ValueError(
             f'Cannot find NoteType to match {lookup} of value {type(lookup)}')
 
     @classmethod
     def from_mxml(cls, mxml_notetype: str) -> 'NoteType':
-        if mxml_notetype.upper() in [n.name for n in NoteType]:
-            return NoteType[mxml_notetype.upper()]
-
-        match mxml_notetype.lower():
-            # Allowed mxml values
-            case '1024th':
-                return NoteType.ONE_THOUSAND_TWENTY_FOURTH
-            case '512th':
-                return NoteType.FIVE_HUNDRED_TWELFTH
-            case '256th':
-                return NoteType.TWO_FIFTY_SIXTH
-            case '128th':
-                return NoteType.ONE_TWENTY_EIGHTH
-            case '64th':
-                return NoteType.SIXTY_FOURTH
-            case '32nd':
-                return NoteType.THIRTY_SECOND
-            case '16th':
-                return NoteType.SIXTEENTH
-            case 'breve':
-                return NoteType.DOUBLE
-            case 'maxima':
-                return NoteType.LARGE
-
-            # Unallowed mxml values
-            case '2048th':
-                return NoteType.TWO_THOUSAND_FORTY_EIGHTH
-            case '4096th':
-                return NoteType.FOUR_THOUSAND_NINETY_SIXTH
-            case _:
-                warnings.warn(
-                    f'MXL Notetype "{mxml_notetype.title()}" not supported--returning Notetype.QUARTER')
-                return NoteType.QUARTER
+        if (notetype := cls.by_mxml(mxml_notetype.lower())) is not None:
+            return notetype
+        elif (notetype := cls.by_name(mxml_notetype)) is not None:
+            return notetype
+        else:
+            warnings.warn(
+                f'MXL Notetype "{mxml_notetype.title()}" not supported--returning Notetype.QUARTER')
+            return NoteType.QUARTER
 
     # @classmethod
     # def find(cls, lookup: Union[str, float]) -> 'NoteType':
@@ -164,7 +158,7 @@ class NoteType(Enum):
 # -------------
 # DotType enum
 # -------------
-class DotType(Enum):
+class DotType(LookupEnum):
     """
     Enum to represent augmentation (dots) of a note or rest
     """
@@ -184,6 +178,7 @@ class DotType(Enum):
         obj._value_ = values[0]
         obj.scalar = values[1]
         obj.symbol = values[2]
+        obj.fraction = Fraction(values[1])
         obj._all_values = values
         return obj
 
@@ -252,7 +247,7 @@ class DotType(Enum):
 # ---------------
 # TupletType enum
 # ---------------
-class TupletType(Enum):
+class TupletType(LookupEnum):
     """
     Enum to represent irrational rhythms created by tuplets
     """
@@ -411,6 +406,10 @@ class NoteValue:
     _value_map_ = {}
     _NOTEVALUE_PRECISION_ = 20
 
+    # Every value in _value_map_ in ascending order, and the (notetype, dots, ratio) making each one up
+    _sorted_values_: np.ndarray = np.empty(0)
+    _sorted_decompositions_: list[tuple] = []
+
     # -----------
     # Constructor
     # -----------
@@ -506,6 +505,20 @@ class NoteValue:
         self.ratio = new_note_value.ratio
         self._value_ = new_note_value.value
 
+    @property
+    def fraction(self) -> Fraction:
+        """
+        The exact duration as a fraction of a whole note, free of the rounding carried by the float value
+        """
+        return self.notetype.fraction * self.dots.fraction * Fraction(self.ratio.normal, self.ratio.actual)
+
+    @property
+    def resolution(self) -> int:
+        """
+        The smallest amount of ticks per quarter note at which this duration is a whole number of ticks
+        """
+        return (self.fraction * 4).denominator
+
     @property
     def note(self):
         return self.notetype.note
@@ -692,6 +705,19 @@ class NoteValue:
         self._value_ = self.notetype.value * self.dots * \
             self.ratio.normal / self.ratio.actual
 
+    def ticks(self, resolution: Union[int, np.integer]) -> int:
+        """
+        Returns the exact duration of this NoteValue as an integer amount of ticks
+
+        :param resolution: Ticks per quarter note
+        :return: The duration in ticks
+        """
+        ticks = self.fraction * 4 * int(resolution)
+        if ticks.denominator != 1:
+            raise ValueError(f'{repr(self)} cannot be represented with a resolution of {resolution} ticks per '
+                             f'quarter note; a multiple of {self.resolution} is required.')
+        return ticks.numerator
+
     # TODO: Update this method to work with all notetypes and all ratios
     def get_ratiod_notetype(self) -> NoteType:
         """
@@ -754,29 +780,54 @@ class NoteValue:
             print('No match', type(value))
             return False
 
+    @classmethod
+    def decompose(cls,
+                  fraction: Union[Fraction, int, float],
+                  ratios: Union[list, tuple] = (TupletType.REGULAR,)) -> list['NoteValue']:
+        """
+        Splits an exact duration into a list of NoteValues which, tied together, last exactly that long. Each piece is
+        the longest value available under the given ratios that still fits in what remains.
+
+        :param fraction: The duration, as a fraction of a whole note
+        :param ratios: The tuplet ratios the pieces may use, as TupletTypes, Ratios, or (actual, normal) tuples
+        :return: The NoteValues, longest first
+        """
+        candidates = []
+        for ratio in ratios:
+            ratio = Ratio(ratio)
+            for dot in DotType:
+                for notetype in NoteType:
+                    if notetype is not NoteType.NONE:
+                        candidates.append((notetype.fraction * dot.fraction * Fraction(ratio.normal, ratio.actual),
+                                           notetype, dot, ratio))
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+        remainder = Fraction(fraction)
+        pieces = []
+        for candidate_fraction, notetype, dot, ratio in candidates:
+            while candidate_fraction <= remainder:
+                pieces.append(NoteValue(notetype, dots=dot, ratio=Ratio(ratio)))
+                remainder -= candidate_fraction
+            if remainder == 0:
+                break
+
+        if remainder != 0:
+            warnings.warn(f'Could not represent {fraction} exactly; {remainder} of a whole note is left over.',
+                          stacklevel=2)
+        return pieces
+
     @classmethod
     def find(cls, value: Union[float, int, np.integer, np.inexact]) -> 'NoteValue':
-        def _build_value_map():
-            cls._value_map_ = {}
-            # for each ratio possibility
-            for ratio in reversed(TupletType):
-                normal, actual = ratio.normal, ratio.actual
-                # for each dot possibility
-                for dot in reversed(DotType):
-                    # for each notetype possibility
-                    for notetype in reversed(NoteType):
-                        nt_value = (notetype.value * dot.scalar) * \
-                            ratio.normal / ratio.actual
-                        cls._value_map_[round(nt_value, cls._NOTEVALUE_PRECISION_)] = (
-                            notetype, dot, ratio)
-            # update NoteType.None
-            cls._value_map_[0] = (
-                NoteType.NONE, DotType.NONE, TupletType.REGULAR)
-            # return cls._value_map_
+        """
+        Returns the NoteValue lasting value, as a fraction of a whole note. If there is none, the closest one is
+        returned with a warning, found by bisecting the sorted table of every value
 
+        :param value:
+        :return:
+        """
         # initialize lookup table
         if not cls._value_map_:
-            _build_value_map()
+            cls._build_value_map_()
 
         if round(value, cls._NOTEVALUE_PRECISION_) in cls._value_map_:
             # exact
@@ -785,15 +836,68 @@ class NoteValue:
             return NoteValue(note_type, dots=dot_type, ratio=Ratio(tuple_type))
         else:
             # approximate
-            options_lst = list(cls._value_map_.keys())
-            closest = options_lst[min(
-                range(len(options_lst)), key=lambda i: abs(options_lst[i] - value))]
-            # print('not found', value, closest, cls._value_map_[closest])
+            index = int(cls._nearest_(np.asarray([value], dtype=float))[0])
+            closest = cls._sorted_values_[index]
             warnings.warn(
                 f'NoteValue for {value} not found; approximating with {closest}.', stacklevel=2)
-            note_type, dot_type, tuple_type = cls._value_map_[closest]
+            note_type, dot_type, tuple_type = cls._sorted_decompositions_[index]
             return NoteValue(note_type, dots=dot_type, ratio=Ratio(tuple_type))
 
+    @classmethod
+    def find_many(cls, values: Union[list, np.ndarray]) -> list['NoteValue']:
+        """
+        Finds the closest NoteValue for every value at once, as for find(). The search is vectorized, and a single
+        warning reports how many values had to be approximated.
+
+        :param values: Durations, as fractions of a whole note
+        :return: A new NoteValue for every value, in the same order
+        """
+        if not cls._value_map_:
+            cls._build_value_map_()
+
+        values = np.asarray(values, dtype=float).ravel()
+        indices = cls._nearest_(values)
+
+        approximated = np.count_nonzero(cls._sorted_values_[indices] != values)
+        if approximated > 0:
+            warnings.warn(f'{approximated} of {len(values)} values had no exact NoteValue and were approximated.',
+                          stacklevel=2)
+
+        return [NoteValue(note_type, dots=dot_type, ratio=Ratio(tuple_type))
+                for note_type, dot_type, tuple_type in (cls._sorted_decompositions_[index] for index in indices)]
+
+    @classmethod
+    def _nearest_(cls, values: np.ndarray) -> np.ndarray:
+        """
+        Returns the index in the sorted table of the closest value to each of values; ties go to the shorter value
+        """
+        right = np.clip(np.searchsorted(cls._sorted_values_, values), 1, len(cls._sorted_values_) - 1)
+        left = right - 1
+        take_right = (cls._sorted_values_[right] - values) < (values - cls._sorted_values_[left])
+        return np.where(take_right, right, left)
+
+    @classmethod
+    def _build_value_map_(cls) -> None:
+        cls._value_map_ = {}
+        # for each ratio possibility
+        for ratio in reversed(TupletType):
+            normal, actual = ratio.normal, ratio.actual
+            # for each dot possibility
+            for dot in reversed(DotType):
+                # for each notetype possibility
+                for notetype in reversed(NoteType):
+                    nt_value = (notetype.value * dot.scalar) * \
+                        ratio.normal / ratio.actual
+                    cls._value_map_[round(nt_value, cls._NOTEVALUE_PRECISION_)] = (
+                        notetype, dot, ratio)
+        # update NoteType.None
+        cls._value_map_[0] = (
+            NoteType.NONE, DotType.NONE, TupletType.REGULAR)
+
+        ordered = sorted(cls._value_map_.items())
+        cls._sorted_values_ = np.array([value for value, decomposition in ordered], dtype=float)
+        cls._sorted_decompositions_ = [decomposition for value, decomposition in ordered]
+
 
 # ----------
 # Note class
@@ -811,6 +915,9 @@ class Note:
                  pitch: Pitch = Pitch(),
                  marks: set = None):
 
+        # The measure holding this note, set by its NoteList, and told when the note's value or pitch changes
+        self._measure_ = None
+
         self.value: NoteValue = value
         self.pitch: Pitch = pitch
         if marks is None:
@@ -820,7 +927,14 @@ class Note:
         self.location: int | np.int = 0
         self.division: int | np.int = 256
 
+        # Absolute position and length in the score's tick timeline, set by Score.update_timeline()
+        self.tick_onset: int = 0
+        self.tick_duration: int = 0
+
+        # Whether an accidental is drawn, which one, and if it is only a courtesy; set by Measure.update_accidentals()
         self.show_accidental: bool = False
+        self.display_accidental: Accidental | None = None
+        self.cautionary_accidental: bool = False
 
         self.stem: StemType = StemType.UP
         if self.value >= NoteType.WHOLE:
@@ -861,6 +975,18 @@ class Note:
         if self._notevalue_ >= NoteType.WHOLE:
             self.stem = StemType.NONE
 
+        if self._measure_ is not None:
+            self._measure_._notes_changed_()
+
+    @property
+    def pitch(self) -> Pitch:
+        return self._pitch_
+
+    @pitch.setter
+    def pitch(self, pitch: Pitch):
+        self._pitch_ = pitch
+        self._pitch_changed_()
+
     @property
     def midi(self):
         return self.pitch.midi
@@ -872,6 +998,7 @@ class Note:
     @accidental.setter
     def accidental(self, accidental: Accidental):
         self.pitch.alter = accidental
+        self._pitch_changed_()
 
     @property
     def glyph(self):
@@ -904,6 +1031,7 @@ class Note:
     @is_pitched.setter
     def is_pitched(self, value: bool):
         self.pitch.is_pitched = value
+        self._pitch_changed_()
 
     # --------
     # Override
@@ -984,6 +1112,13 @@ class Note:
     def add_beam(self, beam) -> None:
         self.beams.append(beam)
 
+    def _pitch_changed_(self) -> None:
+        """
+        Has the measure holding this note work out its accidentals again
+        """
+        if self._measure_ is not None:
+            self._measure_.accidentals_dirty = True
+
     def is_beamed(self) -> bool:
         return len(self.beams) > 0
 
@@ -1196,6 +1331,9 @@ class NoteGroup(Note):
         else:
             raise TypeError(f'Invalid type {type(value)} for NoteValue.')
 
+        if self._measure_ is not None:
+            self._measure_._notes_changed_()
+
     @property
     def midi(self):
         return self.notes[0].pitch.midi
@@ -1207,6 +1345,7 @@ class NoteGroup(Note):
     @accidental.setter
     def accidental(self, accidental: Accidental):
         self.notes[0].pitch.alter = accidental
+        self._pitch_changed_()
 
     @property
     def glyph(self):
@@ -1256,6 +1395,9 @@ class NoteGroup(Note):
             # For now, only supported grouped notes of all the same value
             # assert self.value == added_note.value
             self.notes.append(added_note)
+            if self._measure_ is not None:
+                added_note._measure_ = self._measure_
+                self._measure_._notes_changed_()
 
     # -----------
     # Class Methods
@@ -1290,7 +1432,7 @@ class BeamGroup(NoteGroup):
     pass
 
 
-class ChordType(Enum):
+class ChordType(LookupEnum):
     MAJOR_TRIAD = 0b000010010001, ['', 'Δ'], '\U0001D148'
     MAJOR_SIXTH = 0b001010010001, ['6', 'M6', 'maj6'], '\u2076'
     DOMINANT_SEVENTH = 0b010010010001, ['7', 'dom7'], '\u2077'
@@ -1306,9 +1448,31 @@ class ChordType(Enum):
                                            'min(maj7)'], '\u006D\u1D39\u2077'
 
     DIMINISHED_TRIAD = 0b000001001001, ['°', 'o', 'dim'], '\U0001D1AC'
-    DIMINISHED_SEVENTH = 0b001001001001, [
-        '°', 'o7', 'dim7'], '\U0001D1AC\u2077'
-    HALF_DIMINISHED_SEVENTH = 0b001001001001, ['ø7'], '\U0001D1A9\u2077'
+    DIMINISHED_SEVENTH = 0b001001001001, ['°7', 'o7', 'dim7'], '\U0001D1AC\u2077'
+    HALF_DIMINISHED_SEVENTH = 0b010001001001, ['ø7'], '\U0001D1A9\u2077'
+
+    # -----------
+    # Constructor
+    # -----------
+    def __new__(cls, *values):
+        obj = object.__new__(cls)
+        # first value is canonical value: a bit per semitone above the root
+        obj._value_ = values[0]
+        obj.mask = values[0]
+        obj.abbrs = values[1]
+        obj.symbol = values[2]
+        obj._all_values = values
+        return obj
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def intervals(self) -> list[int]:
+        """
+        Semitones above the root of each pitch class of the chord, the root's 0 included
+        """
+        return [semitone for semitone in range(12) if self.mask >> semitone & 1]
 
 
 class Chord(NoteGroup):
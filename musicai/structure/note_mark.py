@@ -1,10 +1,12 @@
-from enum import Enum
 from typing import Union
 import numpy as np
+
+from util import LookupEnum
+
 # todo: incorporate trills, mordants, etc.
 
 
-class ArticulationType(Enum):
+class ArticulationType(LookupEnum):
     """
     Represents most common articulation marks on notes
     """
@@ -43,7 +45,7 @@ class ArticulationType(Enum):
             return ArticulationType.STACCATO
 
 
-class MiscMarks(Enum):
+class MiscMarks(LookupEnum):
     """
     Represents miscellaneous marks on notes
     """
@@ -67,7 +69,7 @@ class MiscMarks(Enum):
 # -----------------
 # OrnamentType enum
 # -----------------
-class OrnamentType(Enum):
+class OrnamentType(LookupEnum):
     TRILL = 0, '\U0001D196'
     UPPER_MORDANT = 1, '\U0001D19D'
     LOWER_MORDANT = 2
@@ -103,7 +105,7 @@ class OrnamentType(Enum):
 # -----------------
 # GraceNoteMark class
 # -----------------
-class GraceNoteType(Enum):
+class GraceNoteType(LookupEnum):
     """
     Represents the two types of grace notes
     """
@@ -128,7 +130,7 @@ class GraceNoteMark:  # What if they derive from some BASE class so that they ca
 # -----------------
 # NoteheadType enum
 # -----------------
-class NoteheadType(Enum):
+class NoteheadType(LookupEnum):
     """
     Class to represent the shape of the notehead
     """
@@ -206,7 +208,7 @@ class Notehead:
 # -------------
 # StemType enum
 # -------------
-class StemType(Enum):
+class StemType(LookupEnum):
     DOWN = -1
     NONE = 0
     UP = 1
@@ -216,7 +218,7 @@ class StemType(Enum):
 # -------------
 # BeamType enum
 # -------------
-class BeamType(Enum):
+class BeamType(LookupEnum):
     NONE = 0
     BEGIN = 1
     CONTINUE = 2
@@ -257,7 +259,7 @@ class Beam:
 # ------------
 # TieType enum
 # ------------
-class TieType(Enum):
+class TieType(LookupEnum):
     STOP = 0
     START = 1
     CONTINUE = 2
@@ -266,7 +268,7 @@ class TieType(Enum):
 # ------------
 # TieType enum
 # ------------
-class SlurType(Enum):
+class SlurType(LookupEnum):
     STOP = 0
     START = 1
     CONTINUE = 2
@@ -275,7 +277,7 @@ class SlurType(Enum):
 # --------------------
 # TieLocationType enum
 # --------------------
-class TieLocationType(Enum):
+class TieLocationType(LookupEnum):
     UNDER = 0
     OVER = 1
 
@@ -283,7 +285,7 @@ class TieLocationType(Enum):
 # ------------------
 # DynamicChange enum
 # ------------------
-class DynamicChange(Enum):
+class DynamicChange(LookupEnum):
     DIMINUENDO = -1
     DECRESCENDO = 0
     CRESCENDO = 1
@@ -292,7 +294,7 @@ class DynamicChange(Enum):
 # ------------------
 # DynamicAccent enum
 # ------------------
-class DynamicAccent(Enum):
+class DynamicAccent(LookupEnum):
     POCOFORTE = 0, 'pf', u'\U0001D18F\U0001D191'
     FORTEPIANO = 1, 'fp', u'\U0001D191\U0001D18F'
     RINFORZANDO = 2, 'rf', u'\U0001D18C\U0001D191'
@@ -379,7 +381,7 @@ class Articulation:
 # --------------
 # TrillType enum
 # --------------
-class TrillType(Enum):
+class TrillType(LookupEnum):
     DIATONIC = 0
     CHROMATIC = 1
 
@@ -0,0 +1,286 @@
+"""
+Column table of the pitched notes of a score, for array work such as piano rolls
+"""
+from typing import Union
+
+import numpy as np
+
+from structure.measure_mark import DynamicMark, DynamicType
+
+
+# ---------------
+# NoteTable class
+# ---------------
+class NoteTable:
+    """
+    Class to hold every pitched note of a score as parallel NumPy arrays, one entry per sounding pitch: the notes of a
+    NoteGroup each get their own entry, and tied notes are joined into one. Entries are ordered by onset, then part,
+    staff, and pitch.
+
+    The score is walked once to build the table; everything after, like to_pianoroll(), is array operations over it.
+    """
+    _DEFAULT_DYNAMIC_ = DynamicType.MEZZOFORTE
+    RECORD_DTYPE = np.dtype([('onset', np.int64), ('duration', np.int64), ('pitch', np.int16), ('velocity', np.uint8),
+                             ('part', np.int32), ('staff', np.int16), ('measure', np.int32)])
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self,
+                 onset: np.ndarray,
+                 duration: np.ndarray,
+                 pitch: np.ndarray,
+                 velocity: np.ndarray,
+                 part: np.ndarray,
+                 staff: np.ndarray,
+                 measure: np.ndarray,
+                 resolution: Union[int, np.integer],
+                 end: Union[int, np.integer]):
+        """
+        :param onset: Absolute onset of each note, in ticks
+        :param duration: Duration of each note, in ticks
+        :param pitch: MIDI pitch of each note
+        :param velocity: MIDI velocity of each note, from the dynamic marking in effect at its onset
+        :param part: Index of each note's part, counting the parts of every part system from the top of the score
+        :param staff: Index of each note's staff in its part, 0 being the primary staff
+        :param measure: Index of the measure each note starts in
+        :param resolution: Ticks per quarter note of the onsets and durations
+        :param end: Where the score ends, in ticks
+        """
+        self.onset = np.asarray(onset, dtype=np.int64)
+        self.duration = np.asarray(duration, dtype=np.int64)
+        self.pitch = np.asarray(pitch, dtype=np.int16)
+        self.velocity = np.asarray(velocity, dtype=np.uint8)
+        self.part = np.asarray(part, dtype=np.int32)
+        self.staff = np.asarray(staff, dtype=np.int16)
+        self.measure = np.asarray(measure, dtype=np.int32)
+        self.resolution = int(resolution)
+        self.end = int(end)
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return len(self.onset)
+
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__} notes={len(self.onset)} resolution={self.resolution}>'
+
+    # -------
+    # Methods
+    # -------
+    def replace(self, **changes) -> 'NoteTable':
+        """
+        Returns a table sharing every column of this one but those given
+
+        :param changes: New columns, or resolution or end, by name
+        :return:
+        """
+        columns = {column: getattr(self, column) for column in NoteTable.RECORD_DTYPE.names}
+        columns.update(resolution=self.resolution, end=self.end)
+        columns.update(changes)
+        return NoteTable(**columns)
+
+    def select(self, mask: np.ndarray) -> 'NoteTable':
+        """
+        Returns a table of the notes picked out by a boolean mask or array of indices, keeping resolution and end
+        """
+        return self.replace(**{column: getattr(self, column)[mask] for column in NoteTable.RECORD_DTYPE.names})
+
+    def cumulative_chroma(self, times: np.ndarray) -> np.ndarray:
+        """
+        Returns how long each pitch class has sounded before each of many times, summed over its notes, so the chroma
+        of any span is the difference of its two ends. A note started before a time t adds t - onset, less t - end
+        once it has ended; each term is a count and a cumulative sum over the onsets or ends sorted by pitch class
+        then time, found for every pitch class and time by one search
+
+        :param times: Times in ticks, at least 0
+        :return: An int64 array of shape (12, len(times)), in ticks
+        """
+        times = np.asarray(times, dtype=np.int64)
+        pitch_class = self.pitch.astype(np.int64) % 12
+        span = int(max(times.max(initial=0), (self.onset + self.duration).max(initial=0))) + 1
+        queries = np.arange(12)[:, np.newaxis] * span + times[np.newaxis, :]
+        bases = np.arange(12) * span
+
+        sounded = np.zeros(queries.shape, dtype=np.int64)
+        for sign, time in ((1, self.onset), (-1, self.onset + self.duration)):
+            keys = np.sort(pitch_class * span + time)
+            totals = np.append(0, np.cumsum(keys % span))
+            found = np.searchsorted(keys, queries)
+            base = np.searchsorted(keys, bases)[:, np.newaxis]
+            sounded += sign * (times * (found - base) - (totals[found] - totals[base]))
+        return sounded
+
+    def to_records(self) -> np.ndarray:
+        """
+        Returns the table as one structured array with a field per column, e.g. to store it in a ShardedDataset
+
+        :return: An array of RECORD_DTYPE, one record per note
+        """
+        records = np.empty(len(self), dtype=NoteTable.RECORD_DTYPE)
+        for column in NoteTable.RECORD_DTYPE.names:
+            records[column] = getattr(self, column)
+        return records
+
+    def to_pianoroll(self,
+                     resolution: Union[int, np.integer] = 4,
+                     parts: list[int] | None = None,
+                     velocity_from_dynamics: bool = False,
+                     channels: bool = False,
+                     sparse: bool = False):
+        """
+        Renders the notes as a pitch by time matrix. Every step a note sounds in is found at once for all notes, and
+        written with a single scatter; where notes overlap, the loudest is kept.
+
+        :param resolution: Time steps per quarter note. Onsets and ends are rounded down to a step, and every note
+            lasts at least one. The roll is long enough for the score and every note in it
+        :param parts: Indices of the parts to include, or None for all of them
+        :param velocity_from_dynamics: Whether sounding steps hold the note's velocity, rather than 1
+        :param channels: Whether each part gets its own channel, in the order given by parts
+        :param sparse: Whether to return a scipy.sparse CSR matrix, with channels stacked along the pitch axis
+        :return: A uint8 array of shape (128, steps), or (channels, 128, steps) with channels
+        """
+        resolution = int(resolution)
+        if resolution <= 0:
+            raise ValueError(f'A piano roll needs a positive resolution, not {resolution}.')
+        # Notes of an overfull measure may run past the end of the score
+        end = max(self.end, int((self.onset + self.duration).max(initial=0)))
+        steps = -(-end * resolution // self.resolution)
+
+        selected = np.ones(len(self), dtype=bool) if parts is None else np.isin(self.part, parts)
+        selected &= (self.pitch >= 0) & (self.pitch < 128)
+
+        if channels:
+            part_order = np.unique(self.part) if parts is None else np.asarray(parts)
+            channel_count = len(part_order)
+            lookup = np.zeros(max(int(self.part.max(initial=0)), int(part_order.max(initial=0))) + 1, dtype=np.int64)
+            lookup[part_order] = np.arange(channel_count)
+            channel = lookup[self.part[selected]]
+        else:
+            channel_count = 1
+            channel = np.zeros(np.count_nonzero(selected), dtype=np.int64)
+
+        starts = self.onset[selected] * resolution // self.resolution
+        ends = np.maximum((self.onset[selected] + self.duration[selected]) * resolution // self.resolution, starts + 1)
+        values = self.velocity[selected] if velocity_from_dynamics else np.ones(len(starts), dtype=np.uint8)
+
+        # One entry per sounding step of each note
+        lengths = ends - starts
+        note = np.repeat(np.arange(len(starts)), lengths)
+        time = starts[note] + np.arange(len(note)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        keys = (channel[note] * 128 + self.pitch[selected][note]) * steps + time
+        values = values[note]
+
+        # Keep the loudest note on each cell: sort by cell then value, and take the last of each cell
+        order = np.lexsort((values, keys))
+        keys, values = keys[order], values[order]
+        last = np.ones(len(keys), dtype=bool)
+        last[:-1] = keys[1:] != keys[:-1]
+        keys, values = keys[last], values[last]
+
+        if sparse:
+            from scipy.sparse import csr_matrix
+            return csr_matrix((values, (keys // steps, keys % steps)), shape=(channel_count * 128, steps),
+                              dtype=np.uint8)
+
+        roll = np.zeros(channel_count * 128 * steps, dtype=np.uint8)
+        roll[keys] = values
+        return roll.reshape((channel_count, 128, steps) if channels else (128, steps))
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def from_score(cls, score) -> 'NoteTable':
+        """
+        Builds the table of a score. A note tied from an earlier note of the same pitch, in the same staff, lengthens
+        that note instead of starting a new one. Velocities come from the DynamicMark in effect in the note's part, or
+        mezzo-forte before the first one
+
+        :param score: The Score to tabulate, whose timeline is updated first if it has none
+        :return:
+        """
+        if score.resolution == 0:
+            score.update_timeline()
+        resolution = score.resolution
+
+        onsets, durations, pitches, part_indices, staff_indices, measure_indices = [], [], [], [], [], []
+        velocity = []
+        end = 0
+
+        parts = [part for system in score.systems for part in system.parts]
+        for part_index, part in enumerate(parts):
+            part_start = len(onsets)
+
+            for staff_index, measure_list in enumerate(part.staves):
+                # The entry each pitch is tied on to, until the tie ends
+                ties = {}
+                for measure_index, measure in enumerate(measure_list):
+                    end = max(end, measure.tick_onset + measure.tick_duration)
+                    for offset, note in zip(measure.tick_offsets(resolution), measure.iter_notes()):
+                        if note.is_rest():
+                            continue
+                        onset = measure.tick_onset + offset
+                        for sounding in (note.notes if note.is_note_group() else [note]):
+                            if not sounding.is_pitched:
+                                continue
+                            midi = sounding.pitch.midi
+                            duration = sounding.value.ticks(resolution)
+
+                            if sounding.is_tied_stop() and midi in ties:
+                                entry = ties[midi]
+                                durations[entry] = onset + duration - onsets[entry]
+                            else:
+                                entry = len(onsets)
+                                onsets.append(onset)
+                                durations.append(duration)
+                                pitches.append(midi)
+                                part_indices.append(part_index)
+                                staff_indices.append(staff_index)
+                                measure_indices.append(measure_index)
+
+                            if sounding.is_tied_start():
+                                ties[midi] = entry
+                            else:
+                                ties.pop(midi, None)
+
+            velocity.append(cls._velocities_(part, np.asarray(onsets[part_start:], dtype=np.int64)))
+
+        table = cls(onsets, durations, pitches,
+                    np.concatenate(velocity) if len(velocity) > 0 else [],
+                    part_indices, staff_indices, measure_indices, resolution, end)
+
+        order = np.lexsort((table.pitch, table.staff, table.part, table.onset))
+        for column in NoteTable.RECORD_DTYPE.names:
+            setattr(table, column, getattr(table, column)[order])
+        return table
+
+    @classmethod
+    def from_records(cls,
+                     records: np.ndarray,
+                     resolution: Union[int, np.integer],
+                     end: Union[int, np.integer, None] = None) -> 'NoteTable':
+        """
+        Makes a table from a structured array, as from to_records()
+
+        :param records: An array with a field for every column of RECORD_DTYPE
+        :param resolution: Ticks per quarter note of the onsets and durations
+        :param end: Where the score ends, in ticks, or None for the end of its last note
+        :return:
+        """
+        if end is None:
+            end = int((records['onset'] + records['duration']).max(initial=0))
+        return cls(*(records[column] for column in NoteTable.RECORD_DTYPE.names), resolution, end)
+
+    @classmethod
+    def _velocities_(cls, part, onsets: np.ndarray) -> np.ndarray:
+        """
+        Looks up the velocity of the dynamic marking in effect at each onset of a part, all at once
+        """
+        dynamics = [interval for interval in part.mark_index if isinstance(interval.mark, DynamicMark)
+                    and interval.mark.dynamic_type != DynamicType.NONE]
+        starts = np.array([interval.start for interval in dynamics], dtype=np.int64)
+        velocities = np.array([cls._DEFAULT_DYNAMIC_.velocity] +
+                              [interval.mark.dynamic_type.velocity for interval in dynamics], dtype=np.uint8)
+        return velocities[np.searchsorted(starts, onsets, side='right')]
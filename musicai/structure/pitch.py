@@ -1,16 +1,16 @@
 import warnings
 import re
-from enum import Enum
 from typing import Union
 import numpy as np
 
+from util import LookupEnum
 from structure.clef import Clef
 
 
 # ---------
 # Step enum
 # ---------
-class Step(Enum):
+class Step(LookupEnum):
     """
     Enum to represent whole tone steps
     """
@@ -135,8 +135,8 @@ class Step(Enum):
     @classmethod
     def from_str(cls, str_step: str) -> 'Step':
         value = str_step.strip()
-        if re.match('^[A-G]$', value.upper()):
-            return Step[str(value).upper()]
+        if (step := cls.by_name(value)) is not None:
+            return step
         else:
             # Byzantium: Pa, Vu, Ga, Di, Ke, Zo, Ni
             # Solfège: do (doh), re, mi, fa, so(l), la, and ti (si)
@@ -164,7 +164,7 @@ class Step(Enum):
 # -----------
 # Octave enum
 # -----------
-class Octave(Enum):
+class Octave(LookupEnum):
     """
     Enum to represent a musical octave
     """
@@ -303,7 +303,7 @@ class Octave(Enum):
 # ---------------
 # Accidental enum
 # ---------------
-class Accidental(Enum):
+class Accidental(LookupEnum):
     """
     Enum to represent a musical accidental
     """
@@ -434,6 +434,18 @@ class Accidental(Enum):
     # ---------
     # Methods
     # ---------
+    def to_mxml(self) -> str:
+        """
+        Returns the text of a MusicXML <accidental> element for this accidental
+        """
+        # Matched by name, as this is also called while the enum is created, to build its lookups
+        match self.name:
+            case 'NONE':
+                return ''
+            case 'DOUBLE_FLAT':
+                return 'flat-flat'
+            case _:
+                return self.name.lower().replace('_', '-')
 
     # -------------
     # Class Methods
@@ -442,20 +454,20 @@ class Accidental(Enum):
     def find(cls, value: Union[str, int, float]) -> 'Accidental':
         if isinstance(value, str):
             # from string
-            for name, offset in Accidental.__members__.items():
-                if Accidental[name].abbr == value:
-                    return Accidental[name]
+            if (accidental := cls.by_attribute('abbr', value)) is not None:
+                return accidental
         elif isinstance(value, (int, float, np.number)):
             # from numeric
-            for name, offset in Accidental.__members__.items():
-                if float(offset) == float(value):
-                    return Accidental[name]
+            if (accidental := cls.by_value(float(value))) is not None:
+                return accidental
         raise ValueError(f'Error: accidental {value} not found.')
 
     @classmethod
     def from_mxml(cls, mxml_accidental: str) -> 'Accidental':
-        if mxml_accidental.upper().replace('-', '_') in [a.name for a in Accidental]:
-            return Accidental[mxml_accidental.upper().replace('-', '_')]
+        if (accidental := cls.by_mxml(mxml_accidental)) is not None:
+            return accidental
+        elif (accidental := cls.by_name(mxml_accidental.replace('-', '_'))) is not None:
+            return accidental
         else:
             warnings.warn(
                 f'No implementation for accidental "{mxml_accidental}" yet--returning Accidental.NONE')
@@ -725,10 +737,12 @@ class Pitch:
             raise ValueError(
                 f'Method step_up() does not work yet for {self} due to its Accidental {self.alter}.')
 
+        accidentals = Accidental._member_names_
         old_acci = self.alter
+        index = accidentals.index(self.alter.name)
         while self.alter.alter - old_acci.alter < 1:
-            new_acci = [ac for ac in Accidental].index(self.alter)
-            self.alter = [ac for ac in Accidental][new_acci + 1]
+            index += 1
+            self.alter = Accidental[accidentals[index]]
 
     # -------------
     # Class Methods
@@ -741,18 +755,14 @@ class Pitch:
     def from_midi(cls, midi_pitch, key=None):
         # from numeric (midi)
         midi_pitch = int(midi_pitch)
-        if midi_pitch > 128 or midi_pitch < 0:
+        if midi_pitch > 127 or midi_pitch < 0:
             raise ValueError(f'Cannot match Pitch to MIDI value {midi_pitch}.')
 
-        # TODO use key info
-
-        if Step.has_value(midi_pitch % 12):
-            step = Step(midi_pitch % 12)
-            return Pitch(step=step)
-        else:
-            step = Step(midi_pitch % 12 + 1)
-            octave = Octave(midi_pitch // 12 - 1)
-            return Pitch(step=step, octave=octave)
+        # Spelled by the key's lookup tables, as in C major if no key is given
+        from structure.key import Key
+        if key is None:
+            key = Key()
+        return key.find_pitch(midi_pitch)
 
     @classmethod
     def from_abc(cls, abc_pitch):
@@ -797,7 +807,7 @@ class Pitch:
 # --------------
 # Chromatic enum
 # --------------
-class Chromatic(Enum):
+class Chromatic(LookupEnum):
     """
     Enum to represent chromatic steps
     """
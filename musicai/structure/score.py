@@ -1,19 +1,30 @@
+import heapq
 import warnings
+from bisect import bisect_right
+from collections.abc import MutableSequence
+from contextlib import contextmanager
+from fractions import Fraction
+from math import lcm
 
 import numpy as np
-from typing import Union
-from enum import Enum
+from typing import NamedTuple, Union
 # from datetime import date
-from structure.measure import Measure
+from util import LookupEnum
+from structure.beatmap import BeatMap
+from structure.mark_index import MarkIndex
+from structure.measure import Barline, BarlineLocation, BarlineType, Measure, MeasureView
+from structure.measure_mark import VoltaBracketMark
 from structure.note import Note, NoteGroup
+from structure.note_table import NoteTable
 
 # -------------------
 # GroupingSymbol Enum
 # -------------------
 from structure.time import Tempo
+from structure.time_index import TimeIndex, TimeUnit
 
 
-class GroupingSymbol(Enum):
+class GroupingSymbol(LookupEnum):
     """
     Enum to represent how parts will be connected
     """
@@ -40,6 +51,78 @@ class GroupingSymbol(Enum):
         return self.symbol
 
 
+# ---------------
+# StaffView class
+# ---------------
+class StaffView(MutableSequence):
+    """
+    Class to represent the staves of a part after its primary one, as a live view of part.staves[1:]: appending to,
+    replacing, or removing a staff of the view does the same to the part
+    """
+
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, staves: list[list[Measure]]):
+        """
+        :param staves: Every staff of the part, the primary one first
+        """
+        self.staves = staves
+
+    # --------
+    # Override
+    # --------
+    def __len__(self) -> int:
+        return len(self.staves) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[list[Measure], list[list[Measure]]]:
+        if isinstance(index, slice):
+            return self.staves[1:][index]
+        return self.staves[self._position_(index)]
+
+    def __setitem__(self, index: Union[int, slice], value) -> None:
+        if isinstance(index, slice):
+            staves = self.staves[1:]
+            staves[index] = value
+            self.staves[1:] = staves
+        else:
+            self.staves[self._position_(index)] = value
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        if isinstance(index, slice):
+            staves = self.staves[1:]
+            del staves[index]
+            self.staves[1:] = staves
+        else:
+            del self.staves[self._position_(index)]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, StaffView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self.staves[1:])
+
+    # -------
+    # Methods
+    # -------
+    def insert(self, index: Union[int, np.integer], value: list[Measure]) -> None:
+        index = int(index)
+        if index < 0:
+            index = max(index + len(self), 0)
+        self.staves.insert(min(index, len(self)) + 1, value)
+
+    def _position_(self, index: Union[int, np.integer]) -> int:
+        """
+        Returns where a staff of the view lies in part.staves
+        """
+        index = int(index)
+        if not -len(self) <= index < len(self):
+            raise IndexError(f'Index {index} is out of range for {len(self)} staves after the primary one.')
+        return index % len(self) + 1
+
+
 # ----------
 # Part class
 # ----------
@@ -52,74 +135,88 @@ class Part:
     # -----------
 
     def __init__(self):
-        self.measures: list[Measure] = []
+        # Measures of every staff, staff-major: staves[staff_index][measure_index], with staff 0 the primary staff
+        self.staves: list[list[Measure]] = [[]]
         self.id = ''  # string which can be used to differentiate parts
         self.name = 'Default'
         self.auto_update_barline_end = True
-
-        # 2D array of measures for multi-staved parts
-        self.multi_staves: list[list[Measure]] = []
         self.grouping_symbol = GroupingSymbol.NONE
 
-        # To-consider: all staves, including the first, could be represented in an encompassing
-        # list[list[Measure]] member
+        # Ticks per quarter note of the last timeline built by update_timeline(), and the mark index built on it
+        self._timeline_resolution_: int = 0
+        self._mark_index_: MarkIndex | None = None
 
     # ----------
     # Properties
     # ----------
-    # TODO: Implement self.measures, based off of a total, all-encompassing self.staves of type list[list[Measure]]...
-    # @property
-    # def measures(self) -> list[Measure] | None:
-    #     if len(self.multi_staves) > 0:
-    #         return self.multi_staves[0]
-    #     else:
-    #         return None  # or return [] ?
-
-    # @measures.setter
-    # def measures(self, value: list[Measure]):
-    #     if len(self.multi_staves) > 0:
-    #         self.multi_staves[0] = value
-    #     else:
-    #         self.multi_staves.append(value)
+    @property
+    def measures(self) -> list[Measure]:
+        """
+        The measures of the primary staff
+        """
+        return self.staves[0]
+
+    @measures.setter
+    def measures(self, value: list[Measure]):
+        self.staves[0] = value
+
+    @property
+    def multi_staves(self) -> StaffView:
+        """
+        The measures of every staff after the primary one, as a live view of staves[1:]
+        """
+        return StaffView(self.staves)
+
+    @multi_staves.setter
+    def multi_staves(self, value: list[list[Measure]]):
+        self.staves[1:] = value
+
+    @property
+    def resolution(self) -> int:
+        """
+        The smallest amount of ticks per quarter note at which everything in this part falls on a whole number of ticks
+        """
+        resolution = 1
+        for staff_index, measure_index, measure in self.iter_measures():
+            resolution = lcm(resolution, measure.resolution)
+        return resolution
+
+    @property
+    def mark_index(self) -> MarkIndex:
+        """
+        Interval index over the measure marks of every staff, in ticks. Built on first use after each
+        update_timeline(), so marks edited since then are only seen after the timeline is updated again
+        """
+        if self._timeline_resolution_ == 0:
+            self.update_timeline(self.resolution)
+        if self._mark_index_ is None:
+            self._mark_index_ = MarkIndex.from_part(self, self._timeline_resolution_)
+        return self._mark_index_
 
     # --------
     # Override
     # --------
     def __str__(self):
-        ret_str = ''
-
-        # Multi-staff part:
-        if len(self.multi_staves) > 0:
-
-            ret_str += '((Multi-staved))\n'
-
-            # FIRST MEASURE
-            ret_str += 'Staff 0\n'
-            for measure in self.measures:
-                if measure is None:
-                    raise ValueError('Measure is None')
-                ret_str += f'(k={measure.key} c={measure.clef} t={measure.time}) '
-                ret_str += str(measure) + ' '
-            ret_str += '\n'
-
-            # REMAINING MEASURES
-            multi_staff_count = 1
-            for measure_list in self.multi_staves:
-                ret_str += f'Staff {multi_staff_count}\n'
-                for measure in measure_list:
-                    if measure is None:
-                        raise ValueError('Measure is None')
-                    ret_str += f'(k={measure.key} c={measure.clef} t={measure.time}) '
-                    ret_str += str(measure) + ' '
-
-        # Single-staff part
-        else:
-            for measure in self.measures:
+        multi_staved = self.has_multiple_staves()
+        staff_strs = []
+        for staff_index, measure_list in enumerate(self.staves):
+            staff_str = f'Staff {staff_index}\n' if multi_staved else ''
+            for measure in measure_list:
                 if measure is None:
                     raise ValueError('Measure is None')
-                ret_str += str(measure) + ' '
+                if multi_staved:
+                    staff_str += f'(k={measure.key} c={measure.clef} t={measure.time}) '
+                staff_str += str(measure) + ' '
+            staff_strs.append(staff_str)
 
-        return ret_str
+        return ('((Multi-staved))\n' if multi_staved else '') + '\n'.join(staff_strs)
+
+    def __getitem__(self, key: tuple[int, int]) -> Measure:
+        """
+        Returns a measure by its staff and measure index, e.g. part[1, 12] is the 13th measure of the second staff
+        """
+        staff_index, measure_index = key
+        return self.staves[staff_index][measure_index]
 
     # ---------
     # Methods
@@ -133,83 +230,150 @@ class Part:
         :param staff:
         :return:
         """
-        if staff == 1:
-            # Primary staff
-            self.measures.append(measure)
+        # Makes sure the staff exists
+        while len(self.staves) < staff:
+            self.staves.append([])
+        self.staves[staff - 1].append(measure)
 
-        else:
+        if self.auto_update_barline_end:
+            self.update_final_barline(staff)
 
-            # Makes sure the secondary staff exists
-            while len(self.multi_staves) < (staff - 1):
-                self.multi_staves.append([])
+    def extend(self, measures: list[Measure], staff: int = 1) -> None:
+        """
+        Appends measures to one staff of this part. Unlike repeated calls to append(), the barlines are only updated
+        once, after the last measure
 
-            # Append to this secondary-staff
-            # -2 because the 2nd staff starts at multi_staves[0]
-            self.multi_staves[staff - 2].append(measure)
+        :param measures: The measures to append, in order
+        :param staff: The staff to append to, starting from 1
+        :return:
+        """
+        with self.bulk():
+            for measure in measures:
+                self.append(measure, staff)
 
-        if self.auto_update_barline_end:
-            self.update_final_barline(staff)
+    @contextmanager
+    def bulk(self):
+        """
+        Context for building a part measure by measure. Within it, appending does not update the final barline; on
+        leaving it, every staff appended to is updated once, ending with the same barlines as appending each measure
+        outside of it. Has no effect if auto_update_barline_end is off, as it is within an enclosing bulk()
+
+        with part.bulk():
+            for measure in measures:
+                part.append(measure)
+        """
+        if not self.auto_update_barline_end:
+            yield self
+            return
+
+        starts = [len(measure_list) for measure_list in self.staves]
+        self.auto_update_barline_end = False
+        try:
+            yield self
+        finally:
+            self.auto_update_barline_end = True
+
+        for staff_index, measure_list in enumerate(self.staves):
+            start = starts[staff_index] if staff_index < len(starts) else 0
+            if len(measure_list) > start:
+                Part._update_barlines_(measure_list, start)
 
     def update_final_barline(self, staff: int = 1) -> None:
         """
         Used to automatically make the last measure in a part have a final barline, typically called
         when a part has a measure appended. Does not affect non-regular barlines
         """
-        from structure.measure import Barline, BarlineLocation, BarlineType
+        measure_list = self.staves[staff - 1]
+        if len(measure_list) > 0:
+            Part._update_barlines_(measure_list, len(measure_list) - 1)
 
-        # UPDATE FIRST STAFF
-        if staff == 1:
-            measure_count = len(self.measures)
+    def update_timeline(self, resolution: Union[int, np.integer]) -> int:
+        """
+        Gives every measure, note, and measure mark of every staff its absolute integer onset and duration in ticks
 
-            # Gives the latest measure a final barline and gives the preceding measure a regular barline
-            if measure_count > 1:
+        :param resolution: Ticks per quarter note, which must be a multiple of this part's resolution
+        :return: The length of the part in ticks
+        """
+        part_length = 0
+
+        for staff_index, measure_list in enumerate(self.staves):
+
+            # Measures are laid end to end; the final entry is where the staff ends
+            measure_ticks = [0]
+            for measure in measure_list:
+                measure_ticks.append(measure_ticks[-1] + measure.update_ticks(measure_ticks[-1], resolution))
 
-                # Sets the preceeding from FINAL barline to REGULAR
-                if isinstance(self.measures[measure_count - 2].barline, Barline):
-                    if self.measures[measure_count - 2].barline.is_simple_final_barline():
-                        self.measures[measure_count - 2].set_barline('REGULAR')
-                else:
-                    # This is necessary for some reason...
-                    self.measures[measure_count - 2].set_barline('REGULAR')
+            # Marks are relative to their own measure, and end relative to the measure 'measure_span' ahead of it.
+            # The marks of a shared measure belong to the original's timeline and are left alone
+            for measure_index, measure in enumerate(measure_list):
+                if measure.is_shared:
+                    continue
+                for mm in measure.measure_marks:
+                    end_index = min(measure_index + mm.measure_span, len(measure_list))
+                    mm.update_ticks(measure_ticks[measure_index], measure_ticks[end_index], resolution)
 
-                # Sets the following from REGULAR barline to FINAL
-                if not self.measures[measure_count - 1].has_irregular_rs_barline():
-                    self.measures[measure_count - 1].set_barline('FINAL')
+            if staff_index == 0:
+                part_length = measure_ticks[-1]
+
+        self._timeline_resolution_ = int(resolution)
+        self._mark_index_ = None
+        return part_length
+
+    def update_accidentals(self) -> None:
+        """
+        Decides which notes of every staff show an accidental, carrying the key and the alterations left by each
+        measure into the next. Only measures whose notes or context changed since the last pass are worked out again.
+        Setting a note's pitch marks its measure as changed; editing a Pitch in place does not, and the measure should
+        then be marked with measure.accidentals_dirty
+        """
+        for measure_list in self.staves:
+            key = None
+            carried = {}
+            for measure in measure_list:
+                if measure.key is not None:
+                    key = measure.key
+                carried = measure.update_accidentals(key, carried)
+
+    def displayed_accidentals(self) -> dict:
+        """
+        Decides which notes of every staff show an accidental as update_accidentals() does, but leaves the notes and
+        measures as they are
 
-            # Gives the latest measure a final barline
-            elif measure_count == 1:
-                if not self.measures[0].has_irregular_rs_barline():
-                    self.measures[0].set_barline('FINAL')
+        :return: {id(note): (accidental, cautionary)} for every note showing an accidental
+        """
+        shown = {}
+        for measure_list in self.staves:
+            key = None
+            carried = {}
+            for measure in measure_list:
+                if measure.key is not None:
+                    key = measure.key
+                measure_shown, carried = measure.displayed_accidentals(key, carried)
+                shown.update(measure_shown)
+        return shown
+
+    def view(self, measure_slice: slice | list[int] = slice(None)) -> 'Part':
+        """
+        Returns a new Part over a slice of this part's measures, in every staff. The measures are shared through
+        MeasureViews, which copy a measure only when it is written to
 
-        # UPDATE NON-FIRST STAFF
+        :param measure_slice: A slice, or a list of measure indices which may repeat, e.g. from Score.unfold()
+        :return:
+        """
+        part_view = Part()
+        part_view.id = self.id
+        part_view.name = self.name
+        part_view.auto_update_barline_end = self.auto_update_barline_end
+        part_view.grouping_symbol = self.grouping_symbol
+
+        if isinstance(measure_slice, slice):
+            part_view.staves = [[MeasureView(measure) for measure in measure_list[measure_slice]]
+                                for measure_list in self.staves]
         else:
-            # The multi-stave index is -2 because the 2nd staff starts at 0
-            ms_index = staff - 2
-
-            measure_count = len(self.multi_staves[ms_index])
-
-            # Gives the latest measure a final barline and gives the preceding measure a regular barline
-            if measure_count > 1:
-
-                # Sets the preceeding from FINAL barline to REGULAR
-                if isinstance(self.multi_staves[ms_index][measure_count - 2].barline, Barline):
-                    if self.multi_staves[ms_index][measure_count - 2].barline.is_simple_final_barline():
-                        self.multi_staves[ms_index][measure_count -
-                                                    2].set_barline('REGULAR')
-                else:
-                    # This is necessary for some reason...
-                    self.multi_staves[ms_index][measure_count -
-                                                2].set_barline('REGULAR')
-
-                # Sets the following from REGULAR barline to FINAL
-                if not self.multi_staves[ms_index][measure_count - 1].has_irregular_rs_barline():
-                    self.multi_staves[ms_index][measure_count -
-                                                1].set_barline('FINAL')
-
-            # Gives the latest measure a final barline
-            elif measure_count == 1:
-                if not self.multi_staves[ms_index][0].has_irregular_rs_barline():
-                    self.multi_staves[ms_index][0].set_barline('FINAL')
+            part_view.staves = [[MeasureView(measure_list[measure_index]) for measure_index in measure_slice
+                                 if measure_index < len(measure_list)]
+                                for measure_list in self.staves]
+        return part_view
 
     def get_note_at_location(self,
                              location: Union[int, np.integer, float, np.inexact],
@@ -222,19 +386,7 @@ class Part:
         :return: The note is returned if one exists at or after the location; otherwise, None is returned
         """
 
-        current_location = 0
-        return_note = None
-
-        # Loop through every note until we hit the destination
-        for n in self.measures[measure_index].notes:
-
-            # If this is the first note equal to or after the desired location, then return it
-            if location <= current_location:
-                return_note = n
-                break
-
-            # Otherwise, we have not hit the right now yet
-            current_location += n.value
+        return_note = self.measures[measure_index].get_note_at_location(location)
 
         # Check for Measure Marks in this measure
         # If there is an Octave Line over the note, this will be reflected
@@ -269,27 +421,68 @@ class Part:
         return return_note
 
     def staff_count(self) -> int:
-        return 1 + len(self.multi_staves)
+        return len(self.staves)
 
     def has_multiple_staves(self) -> bool:
         return self.staff_count() > 1
 
     def get_staff(self, staff_index: int) -> list[Measure]:
         """
-        Depending on the inputted staff, returns what that list of measures should be
-
-        # TODO: To be changed and made to work with the measures property
+        Returns the list of measures of a staff
 
         :param staff_index: Starting at 0 to represent the primary measure
         :return:
         """
+        return self.staves[staff_index]
 
-        if staff_index == 0:
-            return self.measures
+    def column(self, measure_index: Union[int, np.integer]) -> list[Measure]:
+        """
+        Returns the measure at an index in every staff, from the primary staff down
 
-        else:
-            assert staff_index - 1 < len(self.multi_staves)
-            return self.multi_staves[staff_index - 1]
+        :param measure_index:
+        :return:
+        """
+        return [measure_list[measure_index] for measure_list in self.staves]
+
+    def iter_measures(self):
+        """
+        Iterates over every measure of every staff, staff by staff
+
+        :return: A generator of (staff index, measure index, measure) tuples, with staff index 0 the primary staff
+        """
+        for staff_index, measure_list in enumerate(self.staves):
+            for measure_index, measure in enumerate(measure_list):
+                yield staff_index, measure_index, measure
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def _update_barlines_(cls, measure_list: list[Measure], start: int) -> None:
+        """
+        Gives measure_list[start:], appended one at a time, the barlines that update_final_barline() after each append
+        would have left them with, writing each measure at most once. Every measure followed by another has its final
+        barline made REGULAR, and the last measure gets a FINAL barline unless it has another non-regular one.
+
+        :param measure_list: A staff of measures
+        :param start: Index of the first measure appended
+        :return:
+        """
+        for index in range(max(start - 1, 0), len(measure_list)):
+            measure = measure_list[index]
+            barline = measure.barline
+
+            # Made FINAL when it was the last measure appended...
+            if index >= start and not measure.has_irregular_rs_barline():
+                barline = BarlineType.FINAL
+
+            # ...and back to REGULAR once another was appended after it
+            if index < len(measure_list) - 1:
+                if not isinstance(barline, Barline) or barline.is_simple_final_barline():
+                    barline = BarlineType.REGULAR
+
+            if barline is not measure.barline:
+                measure.set_barline(barline)
 
 
 # ----------------
@@ -391,6 +584,43 @@ class Metadata:
         self.rights.append((description, rights_type))
 
 
+# -------------------
+# MeasureColumn tuple
+# -------------------
+class MeasureColumn(NamedTuple):
+    """
+    The measures at one index in every staff of every part, with the timing they share
+    """
+    index: int
+    start: Fraction  # Where the column starts in the score, as a fraction of a whole note
+    length: Fraction  # The longest measure of the column, as a fraction of a whole note
+    measures: list[tuple]  # (part, staff index, measure) tuples, from the top of the score down
+
+    @property
+    def onsets(self) -> list[Fraction]:
+        """
+        Every distinct note onset of the column, from the start of the column and as a fraction of a whole note
+        """
+        onsets = []
+        for onset in heapq.merge(*(measure.onsets for part, staff_index, measure in self.measures)):
+            if len(onsets) == 0 or onset != onsets[-1]:
+                onsets.append(onset)
+        return onsets
+
+
+# ---------------
+# NoteEvent tuple
+# ---------------
+class NoteEvent(NamedTuple):
+    """
+    A note placed in a score's tick timeline, as yielded by Score.events()
+    """
+    time: int  # Absolute onset in ticks
+    part: Part
+    staff_index: int  # 0 is the part's primary staff
+    note: Note  # A Note, Rest, or NoteGroup, as stored in its measure
+
+
 # -----------
 # Score class
 # -----------
@@ -407,11 +637,16 @@ class Score:
         self.systems: list[PartSystem] = []
         self.metadata = Metadata()
 
-        # Need to implement a beatmap system which vertically tracks the tempo for all instruments
-        # Only supports one tempo currently
-        # TODO: Deprecate this
+        # The starting tempo; tempo marks and changes within the score are followed by beat_map
         self.tempo: Tempo | None = None
 
+        # Ticks per quarter note of the integer timeline; 0 until update_timeline() is called
+        self.resolution: int = 0
+
+        # TimeIndexes built on request, one per unit, and dropped by update_timeline()
+        self._time_indices_: dict[TimeUnit, TimeIndex] = {}
+        self._beat_map_: BeatMap | None = None
+
     # --------
     # Override
     # --------
@@ -426,25 +661,351 @@ class Score:
 
     def __getitem__(self, func):
         if isinstance(func, slice):
-            # possibly find recursive solution?
-            for system in self.systems:
-                for part in system.parts:
-                    part.measures = part.measures[func]
-            return self
-                        # TODO: Add floating point functionality for measure and edit measure class
+            return self.view(measure_slice=func)
+        # Slicing by beats, ticks, or seconds is done through self.at_time and self.time_index()
+        raise TypeError(f'Cannot index a Score with type {type(func)}; use Score.at_time to index by time.')
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def at_time(self) -> TimeIndex:
+        """
+        Index over this score's absolute time in beats (quarter notes). score.at_time[12.5:48.0] is an excerpt from
+        beat 12.5 up to beat 48, with notes split at both cut points; score.at_time[12.5] lists the sounding notes
+        """
+        return self.time_index(TimeUnit.BEATS)
+
+    @property
+    def beat_map(self) -> BeatMap:
+        """
+        Tempo map of this score, converting beats to seconds and back. Built once from the score's tempo marks and
+        kept until update_timeline() is called
+        """
+        if self._beat_map_ is None:
+            self._beat_map_ = BeatMap.from_score(self)
+        return self._beat_map_
 
     # ---------
     # Methods
     # ---------
 
     def slice_parts(self, start, end):      # Helper function that could be further worked on
+        return self.view(part_slice=slice(start, end))
+
+    def view(self, measure_slice: slice | list[int] = slice(None), part_slice: slice = slice(None)) -> 'Score':
+        """
+        Returns a new Score sharing this score's measures and notes. Only the Score, PartSystems, and Parts are new;
+        each measure is seen through a MeasureView, which makes its own copy the first time it is written to. This
+        score is never modified, and edits to it show through any view measure not yet written to
+
+        :param measure_slice: Which measures to keep, in every part, as a slice or a list of measure indices
+        :param part_slice: Which parts to keep, in every part system
+        :return: The view
+        """
+        score_view = Score()
+        score_view.filename = self.filename
+        score_view.metadata = self.metadata
+        score_view.tempo = self.tempo
+
         for system in self.systems:
-            system.parts = system.parts[start:end]
-        return self
+            system_view = PartSystem()
+            system_view.grouping_symbol = system.grouping_symbol
+            for part in system.parts[part_slice]:
+                system_view.append(part.view(measure_slice))
+            score_view.append(system_view)
+
+        # The shared notes already fit this score's resolution
+        score_view.update_timeline(self.resolution if self.resolution > 0 else None)
+        return score_view
 
     def append(self, system):
         self.systems.append(system)
 
+    def time_index(self, unit: TimeUnit = TimeUnit.BEATS) -> TimeIndex:
+        """
+        Returns an index mapping absolute time in this score, in beats, ticks, or seconds, to measures and notes. The
+        index is built once and kept until update_timeline() is called
+
+        :param unit: The unit times are given in
+        :return:
+        """
+        if unit not in self._time_indices_:
+            self._time_indices_[unit] = TimeIndex(self, unit)
+        return self._time_indices_[unit]
+
+    def update_timeline(self, resolution: Union[int, np.integer, None] = None) -> int:
+        """
+        Places every note and measure mark in the score on a shared integer timeline. The tick resolution is the
+        least common multiple of every divisions value, time signature, and tuplet ratio in the score, so every onset
+        and duration is exact. Should be called again after the score is edited.
+
+        :param resolution: Ticks per quarter note to use instead, which must be a multiple of the score's resolution
+        :return: The resolution of the timeline, in ticks per quarter note
+        """
+        if resolution is None:
+            resolution = 1
+            for system in self.systems:
+                for part in system.parts:
+                    resolution = lcm(resolution, part.resolution)
+        resolution = int(resolution)
+
+        self.resolution = resolution
+        self._time_indices_ = {}
+        self._beat_map_ = None
+        for system in self.systems:
+            for part in system.parts:
+                part.update_timeline(resolution)
+
+        return resolution
+
+    def update_accidentals(self) -> None:
+        """
+        Decides which notes in the score show an accidental, see Part.update_accidentals(). Layout and export read the
+        result from each note's show_accidental and display_accidental
+        """
+        for system in self.systems:
+            for part in system.parts:
+                part.update_accidentals()
+
+    def displayed_accidentals(self) -> dict:
+        """
+        Decides which notes in the score show an accidental, see Part.displayed_accidentals(), leaving the score as is
+
+        :return: {id(note): (accidental, cautionary)} for every note showing an accidental
+        """
+        shown = {}
+        for system in self.systems:
+            for part in system.parts:
+                shown.update(part.displayed_accidentals())
+        return shown
+
+    def iter_measures(self):
+        """
+        Iterates over every measure of every staff of every part, part by part and staff by staff
+
+        :return: A generator of (part, staff index, measure) tuples, with staff index 0 each part's primary staff
+        """
+        for system in self.systems:
+            for part in system.parts:
+                for staff_index, measure_index, measure in part.iter_measures():
+                    yield part, staff_index, measure
+
+    def columns(self):
+        """
+        Iterates over the score column by column, each column being the measures at one index in every staff of every
+        part. Columns are made one at a time as they are reached, so the score is never copied or flattened.
+
+        for column in score.columns():
+            for part, staff_index, measure in column.measures:
+                ...
+
+        :return: A generator of MeasureColumns, until no staff has a measure at the index
+        """
+        start = Fraction(0)
+        measure_index = 0
+        while len(measures := self.column(measure_index)) > 0:
+            length = max(measure.length for part, staff_index, measure in measures)
+            yield MeasureColumn(measure_index, start, length, measures)
+
+            start += length
+            measure_index += 1
+
+    def events(self,
+               start: Union[int, np.integer, None] = None,
+               end: Union[int, np.integer, None] = None,
+               rests: bool = False):
+        """
+        Iterates over every note of every staff of every part in order of onset. Each staff is put in order as it is
+        read, then the staves are merged through a heap holding one upcoming note per staff, rather than gathered and
+        sorted. Putting a staff in order holds back the notes of its current measure, and of any overfull measure still
+        sounding, so for P staves at most O(P + notes per measure) events are held at once, not O(P). Notes with the
+        same onset come in score order, from the top part down.
+
+        :param start: Inclusive tick from which notes are yielded, or None for the start of the score
+        :param end: Exclusive tick up to which notes are yielded, or None for the end of the score
+        :param rests: Whether to yield rests as well
+        :return: A generator of NoteEvents, with times in ticks of the score's timeline, see update_timeline()
+        """
+        if self.resolution == 0:
+            self.update_timeline()
+
+        streams = [self._staff_events_(part, staff_index, measure_list, start, end, rests)
+                   for system in self.systems
+                   for part in system.parts
+                   for staff_index, measure_list in enumerate(part.staves)]
+        return heapq.merge(*streams, key=lambda event: event.time)
+
+    def _staff_events_(self, part: Part, staff_index: int, measure_list: list[Measure], start, end, rests: bool):
+        """
+        Yields the notes of one staff in order of onset. The notes of a measure are not always in order: voices read
+        one after another restart partway through, and an overfull measure runs on past the next one's start. So
+        notes wait in a heap until a measure starts at or after them, as no note of a later measure can come sooner.
+        The heap holds a whole measure's notes at a time, plus those of overfull measures running past it
+        """
+        first = 0
+        if start is not None:
+            first = max(bisect_right(measure_list, start, key=lambda measure: measure.tick_onset) - 1, 0)
+            # Overfull measures before it may still have notes from the start on
+            while first > 0 and measure_list[first - 1].tick_onset + max(
+                    measure_list[first - 1].tick_offsets(self.resolution), default=0) >= measure_list[first].tick_onset:
+                first -= 1
+
+        pending = []  # (time, order read, event)
+        read = 0
+        for measure_index in range(first, len(measure_list)):
+            measure = measure_list[measure_index]
+            while len(pending) > 0 and pending[0][0] <= measure.tick_onset:
+                yield heapq.heappop(pending)[2]
+            if end is not None and measure.tick_onset >= end:
+                break
+            for offset, note in zip(measure.tick_offsets(self.resolution), measure.iter_notes()):
+                time = measure.tick_onset + offset
+                if (start is None or time >= start) and (end is None or time < end) and \
+                        (rests or not note.is_rest()):
+                    heapq.heappush(pending, (time, read, NoteEvent(time, part, staff_index, note)))
+                    read += 1
+        while len(pending) > 0:
+            yield heapq.heappop(pending)[2]
+
+    def column(self, measure_index: Union[int, np.integer]) -> list[tuple]:
+        """
+        Returns the measure at an index in every staff of every part, from the top of the score down. Staves without
+        a measure at the index are skipped
+
+        :param measure_index:
+        :return: A list of (part, staff index, measure) tuples
+        """
+        return [(part, staff_index, measure_list[measure_index])
+                for system in self.systems
+                for part in system.parts
+                for staff_index, measure_list in enumerate(part.staves)
+                if measure_index < len(measure_list)]
+
+    def to_pianoroll(self,
+                     resolution: Union[int, np.integer] = 4,
+                     parts: list[int] | None = None,
+                     velocity_from_dynamics: bool = False,
+                     channels: bool = False,
+                     sparse: bool = False):
+        """
+        Renders the score as a pitch by time matrix, through a NoteTable of its notes, see NoteTable.to_pianoroll()
+
+        :param resolution: Time steps per quarter note
+        :param parts: Indices of the parts to include, counting the parts of every part system from the top of the
+            score, or None for all of them
+        :param velocity_from_dynamics: Whether sounding steps hold the velocity of the dynamic marking in effect,
+            rather than 1
+        :param channels: Whether each part gets its own channel
+        :param sparse: Whether to return a scipy.sparse CSR matrix instead of an array
+        :return: A uint8 array of shape (128, steps), or (channels, 128, steps) with channels
+        """
+        return NoteTable.from_score(self).to_pianoroll(resolution, parts, velocity_from_dynamics, channels, sparse)
+
+    def unfold(self) -> list[int]:
+        """
+        Works out the order the measures are played in, following repeat barlines and volta brackets. A backward
+        repeat goes back to the last forward repeat, or to the end of the last finished repeat, once for each ending
+        after it, or once if there are none. On each pass, volta brackets not numbered for that pass are skipped.
+        Repeats and brackets are read from the primary staff of every part.
+
+        :return: The index of each measure played, in order, with repeated measures appearing more than once
+        """
+        repeat_starts, repeat_ends, voltas = self._repeat_structure_()
+        measure_count = max((len(part.measures) for system in self.systems for part in system.parts), default=0)
+
+        order = []
+        section_start = 0  # Where a backward repeat goes back to
+        section_end = -1  # The last backward repeat already played through
+        passes = 2
+        current_pass = 1
+        measure_index = 0
+        while measure_index < measure_count:
+            if measure_index in voltas:
+                endings, last = voltas[measure_index]
+                if current_pass not in endings:
+                    measure_index = last + 1
+                    continue
+            elif measure_index > section_end >= section_start or \
+                    (measure_index in repeat_starts and measure_index != section_start):
+                # Past the endings of a finished repeat, or at a new forward repeat
+                section_start = measure_index
+                current_pass = 1
+
+            order.append(measure_index)
+
+            if measure_index in repeat_ends:
+                if current_pass == 1:
+                    passes = self._repeat_passes_(section_start, measure_index, voltas)
+                if current_pass < passes:
+                    current_pass += 1
+                    measure_index = section_start
+                    continue
+                section_end = measure_index
+            measure_index += 1
+
+        return order
+
+    def unfolded(self) -> 'Score':
+        """
+        Returns a view of this score with its measures in the order they are played, see unfold(). Repeated measures
+        are the same measure seen through several MeasureViews, so nothing is copied until a view is written to
+
+        :return:
+        """
+        return self.view(measure_slice=self.unfold())
+
+    def _repeat_structure_(self) -> (set[int], set[int], dict[int, tuple[set[int], int]]):
+        """
+        Finds the measures starting and ending repeats, and the volta brackets, as a dict from each measure under a
+        bracket to the ending numbers of the bracket and the index of its last measure
+        """
+        repeat_starts, repeat_ends, voltas = set(), set(), {}
+        for system in self.systems:
+            for part in system.parts:
+                for measure_index, measure in enumerate(part.measures):
+                    barlines = measure.barline if isinstance(measure.barline, list) else [measure.barline]
+                    for barline in barlines:
+                        if isinstance(barline, Barline):
+                            barline_type, location = barline.barlinetype, barline.barlinelocation
+                        else:
+                            barline_type, location = barline, BarlineLocation.RIGHT
+
+                        # Barlines on the right of a measure are before the measure that follows
+                        if barline_type == BarlineType.LEFT_REPEAT:
+                            repeat_starts.add(measure_index if location == BarlineLocation.LEFT else measure_index + 1)
+                        elif barline_type == BarlineType.RIGHT_REPEAT:
+                            repeat_ends.add(measure_index - 1 if location == BarlineLocation.LEFT else measure_index)
+
+                    for mark in measure.iter_marks():
+                        if not isinstance(mark, VoltaBracketMark) or measure_index in voltas:
+                            continue
+                        # An ending_count of 0 is a bracket with no ending number, which is left out
+                        endings = set(mark.ending_count) if isinstance(mark.ending_count, tuple) \
+                            else {mark.ending_count}
+                        endings.discard(0)
+                        if len(endings) > 0:
+                            last = measure_index + mark.measure_span - (0 if mark.end_point > 0 else 1)
+                            last = max(last, measure_index)
+                            for covered in range(measure_index, last + 1):
+                                voltas.setdefault(covered, (endings, last))
+
+        return repeat_starts, repeat_ends - {-1}, voltas
+
+    @classmethod
+    def _repeat_passes_(cls, section_start: int, section_end: int, voltas: dict) -> int:
+        """
+        Counts the passes through a repeat, being its highest ending number, or 2 without endings. The endings are
+        those under brackets from the start of the repeat, up to the last bracket running on from its backward repeat
+        """
+        passes = 2
+        measure_index = section_start
+        while measure_index <= section_end or measure_index in voltas:
+            if measure_index in voltas:
+                passes = max(passes, max(voltas[measure_index][0]))
+            measure_index += 1
+        return passes
+
     def print_measure_marks(self):
         """
         Loops through every measure in each part and prints a measure there if one exists
@@ -461,9 +1022,9 @@ class Score:
                 for measure_index in range(len(parts.measures)):
 
                     # If there are measure marks in this measure, then output it
-                    if len(parts.measures[measure_index].measure_marks) != 0:
-                        print(f'Measure {measure_index}: '
-                              f'{[repr(mm) for mm in parts.measures[measure_index].measure_marks]}')
+                    measure_marks = list(parts.measures[measure_index].iter_marks())
+                    if len(measure_marks) != 0:
+                        print(f'Measure {measure_index}: {[repr(mm) for mm in measure_marks]}')
                 part_index += 1
 
         print('\n')
@@ -575,36 +1136,18 @@ class Score:
         :return:
         """
 
-        for part_sys in self.systems:
-            for part in part_sys.parts:
-
-                # PRIMARY STAFF
-                for measure in part.measures:
-                    for note in measure.notes:
-
-                        # NOTE GROUPS
-                        if isinstance(note, NoteGroup):
-                            for grouped_note in note.notes:
-                                if grouped_note.is_pitched:
-                                    grouped_note.pitch += added_num
-
-                        # NOTES
-                        elif isinstance(note, Note):
-                            if note.is_pitched:
-                                note.pitch += added_num
-
-                # SECONDARY STAFF
-                for all_staves in part.multi_staves:
-                    for sec_measure in all_staves:
-                        for note in sec_measure.notes:
-
-                            # NOTE GROUPS
-                            if isinstance(note, NoteGroup):
-                                for grouped_note in note.notes:
-                                    if grouped_note.is_pitched:
-                                        grouped_note.pitch += added_num
-
-                            # NOTES
-                            elif isinstance(note, Note):
-                                if note.is_pitched:
-                                    note.pitch += added_num
+        for part, staff_index, measure in self.iter_measures():
+            measure = measure.writable()
+            for note in measure.notes:
+
+                # NOTE GROUPS
+                if isinstance(note, NoteGroup):
+                    for grouped_note in note.notes:
+                        if grouped_note.is_pitched:
+                            grouped_note.pitch += added_num
+
+                # NOTES
+                elif isinstance(note, Note):
+                    if note.is_pitched:
+                        note.pitch += added_num
+            measure.accidentals_dirty = True
@@ -1,14 +1,14 @@
 import warnings
-from enum import Enum
 from typing import Union
 import numpy as np
+from util import LookupEnum
 from structure.note import NoteType
 
 
 # -------------------
 # TimeSymbolType enum
 # -------------------
-class TimeSymbolType(Enum):
+class TimeSymbolType(LookupEnum):
     """
      Class to represent the type of time signature
      """
@@ -115,7 +115,7 @@ class TimeSignature:
 # -------------------
 # TempoType enum
 # -------------------
-class TempoType(Enum):
+class TempoType(LookupEnum):
     """
     Enum to represent different standard tempo markings, with tempo approximations for 4/4 time
     """
@@ -194,7 +194,7 @@ class Tempo:
         pass
 
 
-class TempoAdjustmentType(Enum):
+class TempoAdjustmentType(LookupEnum):
     # TODO: Different type of implementation...
     """
     Enum to represent common tempo markings used in music
@@ -238,7 +238,7 @@ class TempoAdjustmentType(Enum):
     BEWEGT = 'animated'
 
 
-class TempoDescriptorType(Enum):
+class TempoDescriptorType(LookupEnum):
     """
     Enum to represent common descriptors for tempo markings in music
     """
@@ -0,0 +1,333 @@
+"""
+Score-wide index from absolute time to measures and notes
+"""
+import copy
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+from typing import Union
+
+import numpy as np
+
+from util import LookupEnum
+from structure.measure import Measure, MeasureView
+from structure.note import Note, NoteValue, Rest
+from structure.note_mark import TieType
+
+
+# -------------
+# TimeUnit enum
+# -------------
+class TimeUnit(LookupEnum):
+    """
+    Enum to represent the units in which absolute time in a score can be given
+    """
+    BEATS = 'beats'  # Quarter notes
+    TICKS = 'ticks'  # Ticks of the score's integer timeline, see Score.update_timeline()
+    SECONDS = 'seconds'
+
+    def __str__(self) -> str:
+        return self.value
+
+
+# ---------------
+# TimeIndex class
+# ---------------
+class TimeIndex:
+    """
+    Class to map absolute time in a Score to (measure, note) positions. Measure boundaries are the cumulative
+    lengths of the time signatures of the score's first part, so every lookup is a bisection.
+
+    Supports slicing, e.g. score.at_time[12.5:48.0] is an excerpt of the score from beat 12.5 up to beat 48
+    """
+    # -----------
+    # Constructor
+    # -----------
+    def __init__(self, score, unit: TimeUnit = TimeUnit.BEATS):
+        """
+        :param score: The Score to index
+        :param unit: The unit that times passed to and returned from this index are in
+        """
+        self.score = score
+        self.unit = unit
+
+        # Measure start times, as fractions of a whole note; the final entry is where the score ends
+        self._starts_: list[Fraction] = [Fraction(0)]
+        if len(score.systems) > 0 and len(score.systems[0].parts) > 0:
+            for measure in score.systems[0].parts[0].measures:
+                self._starts_.append(self._starts_[-1] + measure.length)
+
+    # --------
+    # Override
+    # --------
+    def __repr__(self) -> str:
+        return f'<{self.__class__.__name__}({self.unit}) measures={len(self._starts_) - 1} end={self.end}>'
+
+    def __getitem__(self, key: Union[slice, int, float, np.integer, np.inexact]):
+        if isinstance(key, slice):
+            if key.step is not None:
+                raise ValueError(f'Cannot slice a score in time with a step of {key.step}.')
+            start = 0 if key.start is None else key.start
+            end = self.end if key.stop is None else key.stop
+            return self.excerpt(start, end)
+
+        elif isinstance(key, (int, float, np.integer, np.inexact, Fraction)):
+            return self.notes_at(key)
+
+        else:
+            raise TypeError(f'Cannot index a score in time with type {type(key)}.')
+
+    # ----------
+    # Properties
+    # ----------
+    @property
+    def end(self) -> float:
+        """
+        Where the score ends, in this index's unit
+        """
+        return self._from_whole_(self._starts_[-1])
+
+    @property
+    def measure_count(self) -> int:
+        return len(self._starts_) - 1
+
+    # ---------
+    # Methods
+    # ---------
+    def measure_start(self, measure_index: Union[int, np.integer]) -> float:
+        """
+        Returns when a measure starts, in this index's unit
+
+        :param measure_index:
+        :return:
+        """
+        return self._from_whole_(self._starts_[measure_index])
+
+    def locate(self, time: Union[int, float, np.integer, np.inexact, Fraction]) -> tuple[int, Fraction]:
+        """
+        Finds the measure sounding at an absolute time
+
+        :param time: The absolute time, in this index's unit
+        :return: The measure index, and the offset into that measure in units of note value
+        """
+        whole = self._to_whole_(time)
+        if whole < 0 or whole >= self._starts_[-1]:
+            raise IndexError(f'Time {time} {self.unit} is outside of the score, which ends at {self.end}.')
+
+        measure_index = bisect_right(self._starts_, whole) - 1
+        return measure_index, whole - self._starts_[measure_index]
+
+    def notes_at(self, time: Union[int, float, np.integer, np.inexact, Fraction]) -> list[tuple]:
+        """
+        Finds every note sounding at an absolute time, across every part and staff
+
+        :param time: The absolute time, in this index's unit
+        :return: A list of (part, staff index, note) tuples, with staff index 0 being the primary staff
+        """
+        measure_index, offset = self.locate(time)
+
+        sounding = []
+        for system in self.score.systems:
+            for part in system.parts:
+                for staff_index, measure_list in enumerate(part.staves):
+                    if measure_index < len(measure_list):
+                        for note in measure_list[measure_index].notes_sounding_at(offset):
+                            sounding.append((part, staff_index, note))
+        return sounding
+
+    def excerpt(self,
+                start: Union[int, float, np.integer, np.inexact, Fraction],
+                end: Union[int, float, np.integer, np.inexact, Fraction]):
+        """
+        Returns a new Score holding the measures which overlap [start, end). Notes crossing either cut point are split
+        at it, and whatever falls outside of the range in those boundary measures is replaced by rests, so every
+        measure keeps its full length. Measures wholly inside the range are shared with this score through
+        MeasureViews, as with Score.view().
+
+        :param start: Inclusive start of the excerpt, in this index's unit
+        :param end: Exclusive end of the excerpt, in this index's unit
+        :return: The excerpt
+        """
+        from structure.score import Part, PartSystem, Score
+
+        start = max(self._to_cut_(start), Fraction(0))
+        end = min(self._to_cut_(end), self._starts_[-1])
+        if end <= start:
+            raise ValueError(f'Cannot take an empty excerpt from {self._from_whole_(start)} to '
+                             f'{self._from_whole_(end)} {self.unit}.')
+
+        first = bisect_right(self._starts_, start) - 1
+        last = bisect_left(self._starts_, end) - 1
+
+        new_score = Score()
+        new_score.filename = self.score.filename
+        new_score.metadata = self.score.metadata
+        new_score.tempo = self.score.tempo
+
+        for system in self.score.systems:
+            new_system = PartSystem()
+            new_system.grouping_symbol = system.grouping_symbol
+
+            for part in system.parts:
+                new_part = Part()
+                new_part.id = part.id
+                new_part.name = part.name
+                new_part.grouping_symbol = part.grouping_symbol
+
+                # Barlines are kept as they are, which also leaves the shared measures unwritten
+                new_part.auto_update_barline_end = False
+                for staff_index, measure_list in enumerate(part.staves):
+                    for measure_index in range(first, min(last + 1, len(measure_list))):
+                        new_part.append(TimeIndex.cut_measure(measure_list[measure_index],
+                                                              start - self._starts_[measure_index],
+                                                              end - self._starts_[measure_index]),
+                                        staff_index + 1)
+                new_part.auto_update_barline_end = part.auto_update_barline_end
+
+                new_system.append(new_part)
+            new_score.append(new_system)
+
+        new_score.update_timeline()
+        return new_score
+
+    def _to_whole_(self, time: Union[int, float, np.integer, np.inexact, Fraction]) -> Fraction:
+        """
+        Converts a time in this index's unit to a fraction of a whole note
+        """
+        match self.unit:
+            case TimeUnit.BEATS:
+                return Fraction(time) / 4
+            case TimeUnit.TICKS:
+                if self.score.resolution == 0:
+                    self.score.update_timeline()
+                return Fraction(time) / (4 * self.score.resolution)
+            case TimeUnit.SECONDS:
+                return Fraction(self.score.beat_map.to_beats(float(time))) / 4
+            case _:
+                raise ValueError(f'Time unit {self.unit} is not supported.')
+
+    def _to_cut_(self, time: Union[int, float, np.integer, np.inexact, Fraction]) -> Fraction:
+        """
+        Converts a cut point to a fraction of a whole note. Floats carry binary noise, as 0.1 does, and seldom fall on
+        a note value at all, so they are rounded to the finest power of two the score's notes are written in, or to
+        sixteenths where that is coarser. Any measure can be filled with plain rests up to such a point, and notes of a
+        tuplet split at it leave pieces of the same tuplet
+        """
+        whole = self._to_whole_(time)
+        if self.unit is not TimeUnit.SECONDS and not isinstance(time, (float, np.inexact)):
+            return whole
+
+        grid = 16  # Divisions of a whole note
+        for system in self.score.systems:
+            for part in system.parts:
+                for staff_index, measure_index, measure in part.iter_measures():
+                    for note in measure.iter_notes():
+                        for value in [note.value] + [grouped.value for grouped in
+                                                     (note.notes if note.is_note_group() else [])]:
+                            divisions = 4 * value.resolution
+                            grid = max(grid, divisions & -divisions)
+        return Fraction(round(whole * grid), grid)
+
+    def _from_whole_(self, whole: Fraction) -> float:
+        """
+        Converts a fraction of a whole note to a time in this index's unit
+        """
+        match self.unit:
+            case TimeUnit.BEATS:
+                return float(whole * 4)
+            case TimeUnit.TICKS:
+                if self.score.resolution == 0:
+                    self.score.update_timeline()
+                return float(whole * 4 * self.score.resolution)
+            case TimeUnit.SECONDS:
+                return self.score.beat_map.to_seconds(float(whole * 4))
+            case _:
+                raise ValueError(f'Time unit {self.unit} is not supported.')
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def cut_measure(cls, measure: Measure, start: Fraction, end: Fraction) -> Measure | MeasureView:
+        """
+        Returns a copy of the measure in which only [start, end) keeps its notes. Notes crossing a cut point are
+        split at it, and the rest of the measure is filled with rests. Measure marks outside of the range are dropped.
+        If nothing is cut, a MeasureView sharing the measure is returned instead.
+
+        :param measure: The measure to cut, which is left untouched
+        :param start: Inclusive start of the range kept, in units of note value from the start of the measure
+        :param end: Exclusive end of the range kept, in units of note value from the start of the measure
+        :return: The cut copy, or a view of the measure
+        """
+        content_length = measure.content_length
+        start = min(max(start, Fraction(0)), content_length)
+        end = max(min(end, content_length), start)
+
+        if start == 0 and end == content_length:
+            return MeasureView(measure)
+        cut = copy.deepcopy(measure)
+
+        # Rests and split notes may use any tuplet found in the measure
+        ratios = {(1, 1)} | {(note.value.ratio.actual, note.value.ratio.normal) for note in measure.iter_notes()}
+
+        new_notes: list[Note] = cls._rests_(start, ratios)
+        for note, onset in zip(cut.notes, measure.onsets):
+            note_end = onset + note.value.fraction
+            kept_start = max(onset, start)
+            kept_end = min(note_end, end)
+
+            if onset == note_end:
+                # Notes without a duration are kept if they fall in the range
+                if start <= onset < end:
+                    new_notes.append(note)
+            elif kept_start == onset and kept_end == note_end:
+                new_notes.append(note)
+            elif kept_start < kept_end:
+                new_notes.extend(cls._split_note_(note, kept_end - kept_start, kept_start > onset, kept_end < note_end,
+                                                  ratios))
+        new_notes.extend(cls._rests_(content_length - end, ratios))
+
+        cut.notes = new_notes
+        cut.pack()
+
+        cut.measure_marks = [mm for mm in cut.measure_marks
+                             if start <= Fraction(mm.start_point) / mm.divisions / 4 < end]
+        return cut
+
+    @classmethod
+    def _rests_(cls, length: Fraction, ratios: set) -> list[Note]:
+        rests = []
+        if length > 0:
+            for value in NoteValue.decompose(length, list(ratios)):
+                rest = Rest()
+                rest.value = value
+                rests.append(rest)
+        return rests
+
+    @classmethod
+    def _split_note_(cls, note: Note, length: Fraction, cut_before: bool, cut_after: bool, ratios: set) -> list[Note]:
+        """
+        Returns copies of the note, tied together, lasting exactly length. Ties across a cut point are removed.
+        """
+        values = NoteValue.decompose(length, list(ratios))
+
+        pieces = []
+        for index, value in enumerate(values):
+            piece = copy.deepcopy(note)
+            piece.value = value
+            if piece.is_note_group():
+                for grouped_note in piece.notes:
+                    grouped_note.value = copy.deepcopy(value)
+
+            if not piece.is_rest():
+                if index > 0:
+                    piece.marks.add(TieType.STOP)
+                elif cut_before:
+                    piece.marks.discard(TieType.STOP)
+
+                if index < len(values) - 1:
+                    piece.marks.add(TieType.START)
+                elif cut_after:
+                    piece.marks.discard(TieType.START)
+
+            pieces.append(piece)
+        return pieces
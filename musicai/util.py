@@ -5,6 +5,103 @@ from enum import Enum
 import warnings
 
 
+class LookupEnumMeta(enum.EnumMeta):
+    """
+        Metaclass which, once an enumeration's members exist, builds dictionaries to find them by name, by value, by
+        MusicXML string and by each public attribute, so coercing text read from a file is a single lookup rather than
+        a scan over the members. When several members share a key, the first one defined wins, as with a scan.
+    """
+    def __new__(metacls, cls, bases, classdict, **kwds):
+        enum_class = super().__new__(metacls, cls, bases, classdict, **kwds)
+
+        name_lookup = {}
+        value_lookup = {}
+        mxml_lookup = {}
+        attribute_lookups = {}
+        has_mxml = callable(getattr(enum_class, 'to_mxml', None))
+        # __members__ also holds aliases, so their names are found as with target_enum[name]
+        for name, member in enum_class.__members__.items():
+            name_lookup.setdefault(name.upper(), member)
+            if name != member.name:
+                continue
+
+            LookupEnumMeta._add_key_(value_lookup, member.value, member)
+            mxml = member.to_mxml() if has_mxml else name.lower().replace('_', '-')
+            if mxml != '':
+                mxml_lookup.setdefault(mxml, member)
+
+            for attribute, attribute_value in vars(member).items():
+                if not attribute.startswith('_'):
+                    LookupEnumMeta._add_key_(attribute_lookups.setdefault(attribute, {}), attribute_value, member)
+
+        enum_class._name_lookup_ = name_lookup
+        enum_class._value_lookup_ = value_lookup
+        enum_class._mxml_lookup_ = mxml_lookup
+        enum_class._attribute_lookups_ = attribute_lookups
+        return enum_class
+
+    @staticmethod
+    def _add_key_(lookup: dict, key, member: Enum) -> None:
+        try:
+            lookup.setdefault(key, member)
+        except TypeError:
+            # Unhashable values, e.g. lists, can only be found by a scan
+            pass
+
+
+class LookupEnum(Enum, metaclass=LookupEnumMeta):
+    """
+        Base of the structure enumerations, giving each the lookup dictionaries built by LookupEnumMeta
+    """
+
+    # -------------
+    # Class Methods
+    # -------------
+    @classmethod
+    def by_name(cls, name: str) -> Union[Enum, None]:
+        """
+            Returns the member with the name, ignoring case, or None
+
+            :param name: The member's name
+        """
+        return cls._name_lookup_.get(name.upper())
+
+    @classmethod
+    def by_value(cls, value) -> Union[Enum, None]:
+        """
+            Returns the first member with the value, or None
+
+            :param value: The member's value, as returned by member.value
+        """
+        try:
+            return cls._value_lookup_.get(value)
+        except TypeError:
+            return None
+
+    @classmethod
+    def by_mxml(cls, text: str) -> Union[Enum, None]:
+        """
+            Returns the member written as the text in MusicXML, or None. This is the member's to_mxml() if the
+            enumeration has one, or otherwise its name in lower case with hyphens. Members written as '' are not found.
+
+            :param text: The MusicXML text
+        """
+        return cls._mxml_lookup_.get(text)
+
+    @classmethod
+    def by_attribute(cls, attribute: str, value) -> Union[Enum, None]:
+        """
+            Returns the first member whose attribute equals the value, or None
+
+            :param attribute: The name of an attribute set on every member, e.g. 'abbr'
+            :param value: The attribute value to find
+        """
+        try:
+            return cls._attribute_lookups_.get(attribute, {}).get(value)
+        except TypeError:
+            return None
+
+
 class EnumChecker:
     # -----------
     # Class Methods
@@ -18,12 +115,15 @@ class EnumChecker:
             :param target_enum: The enumeration that the member is tested to belong to
             :param value: Represents an enumeration member or string of the member's name
         """
+        names = target_enum._name_lookup_ if isinstance(target_enum, LookupEnumMeta) else \
+            {name.upper(): member for name, member in target_enum.__members__.items()}
+
         if isinstance(value, str):
-            if value.upper() in [e.name for e in target_enum]:
-                return target_enum[value.upper()]
+            if value.upper() in names:
+                return names[value.upper()]
             elif value == '':
-                if 'NONE' in [e.name for e in target_enum]:
-                    return target_enum['NONE']
+                if 'NONE' in names:
+                    return names['NONE']
             else:
                 raise ValueError(f'\'{value}\' is not a valid member of {target_enum.__name__}.')
 
@@ -31,8 +131,8 @@ class EnumChecker:
             return value
 
         elif value is None:
-            if 'NONE' in [e.name for e in target_enum]:
-                return target_enum['NONE']
+            if 'NONE' in names:
+                return names['NONE']
             else:
                 raise ValueError(f'\'{value}\' is not a valid member of {target_enum.__name__}.')
 
@@ -49,6 +49,8 @@ class ScoreWindow(pyglet.window.Window):  # noqa
         self.tie_arcs = list()
 
         self.score = score
+        # Which notes show an accidental is worked out once for the score, and only again for edited measures
+        self.score.update_accidentals()
 
         self.labels = list()
         self.measure_height = self._cfg.MEASURE_HEIGHT
@@ -659,10 +659,9 @@ class MeasureArea:
     '''
     def _layout_satellites(self, x: float, y: float, line_offset: int, note: Note):
         # accidentals
-        if str(note.accidental).strip() != '':
-            if note.pitch.step not in self.measure.key.altered():
-                self._layout_accidental(
-                    x, y, line_offset, note.accidental.glyph)
+        if note.show_accidental and note.display_accidental is not None:
+            self._layout_accidental(
+                x, y, line_offset, note.display_accidental.glyph)
         # dots
         if note.value.dots != DotType.NONE:
             self._layout_dots(x, y, line_offset, note.value.dots.value)
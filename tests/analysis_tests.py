@@ -0,0 +1,180 @@
+import os
+import tempfile
+from fractions import Fraction
+import unittest
+import sys
+sys.path.insert(0, '../musicai')
+import numpy as np
+from analysis.chords import ChordLabeler
+from analysis.embedding import MeasureEmbedder, MeasureIndex
+from analysis.features import FeatureExtractor
+from analysis.key_tracker import KeyTracker, WindowUnit
+from analysis.motifs import MotifIndex, MotifMatch
+from fixtures import get_two_part_score
+from structure.key import Key, KeyType, ModeType
+from structure.measure import Measure
+from structure.note import ChordType, Note, NoteType, NoteValue
+from structure.note_table import NoteTable
+from structure.pitch import Pitch
+from structure.score import Part, PartSystem, Score
+from structure.time import TimeSignature
+
+
+def get_melody_score(pitches: list[int]) -> Score:
+    """
+    One part of quarter notes, four to a 4/4 measure
+    """
+    part = Part()
+    for start in range(0, len(pitches), 4):
+        measure = Measure(time=TimeSignature(4, 4))
+        for midi in pitches[start:start + 4]:
+            measure.append(Note(value=NoteValue(NoteType.QUARTER), pitch=Pitch.from_midi(midi)))
+        part.append(measure)
+
+    system = PartSystem()
+    system.append(part)
+    score = Score()
+    score.append(system)
+    return score
+
+
+class FeatureExtractorTest(unittest.TestCase):
+    def test_extract(self):
+        extractor = FeatureExtractor()
+        table = NoteTable.from_score(get_two_part_score())
+        empty = NoteTable.from_records(table.to_records()[:0], table.resolution)
+        features = extractor.extract([table, empty, table])
+        self.assertEqual(features.shape, (3, len(extractor.names)))
+        np.testing.assert_array_equal(features[0], features[2])
+        np.testing.assert_array_equal(features[1], 0)
+
+        row = dict(zip(extractor.names, features[0]))
+        # Eight quarters of C3, a quarter of C4, four of D, and two each of E and G
+        self.assertAlmostEqual(row['pitch_class_0'], 9 / 17)
+        self.assertAlmostEqual(row['pitch_class_2'], 4 / 17)
+        # C up to G, G down to D, and C3 held
+        self.assertAlmostEqual(row['interval_7'], 1 / 3)
+        self.assertAlmostEqual(row['interval_-5'], 1 / 3)
+        self.assertAlmostEqual(row['interval_0'], 1 / 3)
+        self.assertAlmostEqual(row['duration_2^2'], 1 / 2)
+        self.assertEqual((row['measure_notes_mean'], row['measure_notes_max']), (3, 4))
+        self.assertEqual((row['pitch_min'], row['pitch_max'], row['pitch_span']), (48, 67, 19))
+        self.assertAlmostEqual(row['polyphony_mean'], 17 / 8)
+        self.assertEqual(row['polyphony_max'], 3)
+
+
+class KeyTrackerTest(unittest.TestCase):
+    def test_track(self):
+        score = get_two_part_score()
+        starts, ends, keys, confidence = KeyTracker(window=1).track_score(score)
+        self.assertEqual(starts.tolist(), [0, 4 * score.resolution])
+        self.assertEqual(ends.tolist(), [4 * score.resolution, 8 * score.resolution])
+
+        # Each window agrees with Key.find_key over the same durations
+        table = NoteTable.from_score(score)
+        first = table.onset < 4 * score.resolution
+        histogram = np.bincount(table.pitch[first] % 12, np.minimum(table.duration[first], 4 * score.resolution), 12)
+        self.assertEqual(str(Key.profile_key(keys[0])), str(Key.find_key(histogram)))
+        self.assertTrue(np.all((confidence > 0) & (confidence <= 1)))
+
+        starts, ends, keys, confidence = KeyTracker(window=2, hop=1, unit=WindowUnit.BEATS).track(table)
+        self.assertEqual(len(starts), 8)
+        self.assertEqual(ends[-1], 8 * table.resolution)
+
+    def test_segment(self):
+        starts, ends, keys = KeyTracker.segment(np.arange(5), np.arange(5) + 2, np.array([3, 3, 7, 7, 3]))
+        self.assertEqual((starts.tolist(), ends.tolist(), keys.tolist()), ([0, 2, 4], [2, 4, 6], [3, 7, 3]))
+
+    def test_profile_key(self):
+        self.assertEqual(Key.profile_key(6).keytype, KeyType.Fs)
+        self.assertEqual(Key.profile_key(14).keytype, KeyType.find(-1, ModeType.MINOR))
+        self.assertEqual(Key.profile_key(16).keytype, KeyType.find(1, ModeType.MINOR))
+        self.assertEqual(KeyTracker.correlate(np.ones((1, 12)))[0].tolist(), [-1])
+
+
+class ChordLabelerTest(unittest.TestCase):
+    def test_label(self):
+        labeler = ChordLabeler()
+        table = NoteTable.from_score(get_two_part_score())
+        roots, chord_types, similarity = labeler.label(table)
+        self.assertEqual(labeler.names(roots, chord_types)[:4], ['C', 'C', 'C', 'C'])
+        np.testing.assert_allclose(similarity[1:3], 1)
+
+        roots, chord_types, similarity, offsets = labeler.label_batch([table, table])
+        self.assertEqual(offsets.tolist(), [0, 8, 16])
+        np.testing.assert_array_equal(roots[:8], roots[8:])
+
+    def test_match(self):
+        chroma = np.zeros((3, 12))
+        chroma[0, [9, 0, 4, 7]] = 1  # A C E G, as C6 and Am7 tie
+        chroma[1, [2, 5, 8, 0]] = [2, 1, 1, 1]  # D F A♭ C
+        roots, chord_types, similarity = ChordLabeler(threshold=0.9).match(chroma)
+        self.assertEqual(ChordLabeler.names(roots, chord_types), ['C6', 'Fm6', 'N'])
+        # The lowest note settles ties
+        roots, chord_types, similarity = ChordLabeler(threshold=0.9).match(chroma, np.array([9, 2, -1]))
+        self.assertEqual(ChordLabeler.names(roots, chord_types), ['Am7', 'Dø7', 'N'])
+        np.testing.assert_allclose(similarity[:2], [1, 5 / np.sqrt(28)])
+        self.assertEqual(ChordLabeler.chord_type(chord_types[1]), ChordType.HALF_DIMINISHED_SEVENTH)
+        self.assertEqual(ChordType.HALF_DIMINISHED_SEVENTH.intervals, [0, 3, 6, 10])
+
+    def test_names(self):
+        chord_types = np.arange(len(ChordLabeler.CHORD_TYPES))
+        names = ChordLabeler.names(np.zeros(len(chord_types), dtype=np.int64), chord_types)
+        self.assertEqual(len(set(names)), 13)
+        self.assertEqual(names[ChordLabeler.CHORD_TYPES.index(ChordType.DIMINISHED_SEVENTH)], 'C°7')
+
+
+class MotifIndexTest(unittest.TestCase):
+    def test_search(self):
+        # C D E C, C D E C, E F G, E F G, transposed up a fifth
+        melody = [60, 62, 64, 60, 60, 62, 64, 60, 64, 65, 67, 67, 64, 65, 67, 67]
+        with tempfile.TemporaryDirectory() as directory:
+            with MotifIndex(os.path.join(directory, 'motifs.db'), n=3) as index:
+                self.assertTrue(index.add('melody', get_melody_score(melody)))
+                self.assertTrue(index.add('fifth', get_melody_score([midi + 7 for midi in melody])))
+                self.assertEqual(index.paths, ['melody', 'fifth'])
+
+                matches = index.search(pitches=[60, 62, 64, 60], transpose=False)
+                self.assertEqual(matches, [MotifMatch('melody', 0, 0, 0, Fraction(0)),
+                                           MotifMatch('melody', 0, 0, 1, Fraction(0))])
+                self.assertEqual(len(index.search(pitches=[60, 62, 64, 60])), 4)
+                # A motif longer than n only matches where all of it lines up
+                self.assertEqual(index.search(pitches=[64, 60, 60, 62, 64], transpose=False),
+                                 [MotifMatch('melody', 0, 0, 0, Fraction(2))])
+                # Shorter than n, by its first steps
+                self.assertEqual(len(index.search(pitches=[64, 65], transpose=False)), 2)
+                self.assertEqual(len(index.search(rhythm=[1, 1])), 2 * (len(melody) - 2))
+                self.assertRaises(ValueError, index.search, pitches=[60, 62], rhythm=[1, 1])
+
+                index.remove('fifth')
+                self.assertEqual(len(index.search(pitches=[60, 62, 64, 60])), 2)
+
+            # The index carries on where it was left, with its own n
+            with MotifIndex(os.path.join(directory, 'motifs.db'), n=5) as index:
+                self.assertEqual((index.n, len(index)), (3, 1))
+
+
+class MeasureIndexTest(unittest.TestCase):
+    def test_search(self):
+        embedder = MeasureEmbedder()
+        tables = [NoteTable.from_score(get_two_part_score()),
+                  NoteTable.from_score(get_melody_score([60, 62, 64, 60, 67, 65, 64, 62, 62, 64, 66, 62]))]
+        vectors, offsets = embedder.embed(tables)
+        self.assertEqual(vectors.shape, (5, embedder.dimensions))
+        self.assertEqual(offsets.tolist(), [0, 2, 5])
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1, rtol=1e-6)
+
+        with tempfile.TemporaryDirectory() as directory:
+            embedder.write(directory, tables, keys=['chords', 'melody'], shard_size=3)
+            index = MeasureIndex(directory, block_size=2)
+            self.assertEqual(len(index), 5)
+
+            similarity, scores, measures = index.search(index.vector(1, 0), k=6)
+            self.assertEqual((scores[0, 0], measures[0, 0]), (1, 0))
+            self.assertAlmostEqual(similarity[0, 0], 1, places=5)
+            self.assertTrue(np.all(np.diff(similarity[0, :5]) <= 0))
+            self.assertEqual((scores[0, 5], measures[0, 5]), (-1, -1))
+
+            # Every measure finds itself, across blocks and shards
+            similarity, scores, measures = index.search(vectors, k=1)
+            self.assertEqual((offsets[scores[:, 0]] + measures[:, 0]).tolist(), list(range(5)))
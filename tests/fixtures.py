@@ -0,0 +1,39 @@
+import sys
+sys.path.insert(0, '../musicai')
+from structure.measure import Measure
+from structure.measure_mark import DynamicMark, DynamicType
+from structure.note import Note, NoteGroup, NoteType, NoteValue, Rest
+from structure.pitch import Pitch, Step
+from structure.score import Part, PartSystem, Score
+from structure.time import TimeSignature
+
+
+def get_two_part_score() -> Score:
+    """
+    Two parts of two 4/4 measures. The first part has a quarter C and a half chord E G then a quarter rest, under a
+    piano, and a whole D; the second a whole C3 in each measure
+    """
+    m1 = Measure(time=TimeSignature(4, 4))
+    m1.append(Note(value=NoteValue(NoteType.QUARTER), pitch=Pitch(Step.C)))
+    m1.append(NoteGroup(value=NoteValue(NoteType.HALF),
+                        notes=[Note(value=NoteValue(NoteType.HALF), pitch=Pitch(step)) for step in [Step.E, Step.G]]))
+    m1.append(Rest(NoteType.QUARTER))
+    m1.measure_marks.append(DynamicMark(DynamicType.PIANO))
+    m2 = Measure(time=TimeSignature(4, 4))
+    m2.append(Note(value=NoteValue(NoteType.WHOLE), pitch=Pitch(Step.D)))
+
+    upper = Part()
+    upper.extend([m1, m2])
+
+    lower = Part()
+    for index in range(2):
+        measure = Measure(time=TimeSignature(4, 4))
+        measure.append(Note(value=NoteValue(NoteType.WHOLE), pitch=Pitch(Step.C, 3)))
+        lower.append(measure)
+
+    system = PartSystem()
+    system.append(upper)
+    system.append(lower)
+    score = Score()
+    score.append(system)
+    return score
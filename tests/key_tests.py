@@ -0,0 +1,34 @@
+import unittest
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '../musicai')
+from structure.key import Key, KeyType, ModeType, Scale
+from structure.pitch import Chromatic, Octave, Step
+
+
+class KeySpellingTest(unittest.TestCase):
+    def test_find_pitch(self):
+        self.assertEqual(str(Key(KeyType.G).find_pitch(66)), 'F♯4')
+        self.assertEqual(str(Key(KeyType.Eb).find_pitch(66)), 'G♭4')
+        self.assertEqual(str(Key(KeyType.Cs).find_pitch(72)), 'B♯4')
+        self.assertEqual(Key(KeyType.Cb).find_pitch(71).octave, Octave.TWO_LINE)  # C flat 5
+        self.assertRaises(ValueError, Key().find_pitch, 128)
+
+    def test_has_accidental(self):
+        key = Key(KeyType.D)
+        self.assertFalse(key.has_accidental(61))  # C sharp
+        self.assertTrue(key.has_accidental(60))  # C natural
+        np.testing.assert_array_equal(key.has_accidental(np.arange(60, 72)),
+                                      [True, False, False, True, False, True, False, False, True, False, True, False])
+
+    def test_degree(self):
+        self.assertEqual(Key(KeyType.A, ModeType.MINOR).degree(69), Chromatic.A)
+        self.assertIsNone(Key(KeyType.A, ModeType.MINOR).degree(68))
+        self.assertEqual(Key(KeyType.Dbb).degree(9), Chromatic.Bbb)
+
+    def test_key_alters(self):
+        self.assertEqual(Scale.key_alters(2), [1, 0, 0, 1, 0, 0, 0])
+        self.assertEqual(Scale.key_alters(-8), [-1, -1, -1, -1, -1, -1, -2])
+        self.assertEqual(Scale.STEPS[Key(KeyType.Bb).spell(np.array([70]))[0][0]], Step.B)
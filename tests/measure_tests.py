@@ -1,4 +1,150 @@
 import operator
 import unittest
+from fractions import Fraction
+import sys
+sys.path.insert(0, '../musicai')
+from structure.measure import Measure
+from structure.note import Note, NoteType, NoteValue, DotType, TupletType, NoteGroup
+from structure.key import Key, KeyType
+from structure.note_mark import TieType
+from structure.pitch import Accidental, Pitch, Step
 
-# TODO
+
+def get_test_measure() -> Measure:
+    """
+    A dotted quarter, a sixteenth, and a triplet of eighths: onsets at 0, 3/8, 7/16, 25/48, 29/48 of a whole note
+    """
+    measure = Measure()
+    measure.append(Note(value=NoteValue(NoteType.QUARTER, DotType.ONE), pitch=Pitch(Step.C)))
+    measure.append(Note(value=NoteValue(NoteType.SIXTEENTH), pitch=Pitch(Step.D)))
+    measure.append([Note(value=NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET), pitch=Pitch(step))
+                    for step in [Step.E, Step.F, Step.G]])
+    return measure
+
+
+class MeasureIndexTest(unittest.TestCase):
+    def test_start_points(self):
+        measure = get_test_measure()
+        self.assertEqual([note.start_point for note in measure.notes],
+                         [0, Fraction(3, 8), Fraction(7, 16), Fraction(25, 48), Fraction(29, 48)])
+
+    def test_get_note_at_location(self):
+        measure = get_test_measure()
+        self.assertIs(measure.get_note_at_location(0), measure.notes[0])
+        self.assertIs(measure.get_note_at_location(0.1), measure.notes[1])
+        self.assertIs(measure.get_note_at_location(Fraction(7, 16)), measure.notes[2])
+        self.assertIsNone(measure.get_note_at_location(1))
+
+    def test_notes_sounding_at(self):
+        measure = get_test_measure()
+        self.assertEqual(measure.notes_sounding_at(0.2), [measure.notes[0]])
+        self.assertEqual(measure.notes_sounding_at(Fraction(3, 8)), [measure.notes[1]])
+        self.assertEqual(measure.notes_sounding_at(Fraction(11, 16)), [])
+        self.assertEqual(measure.notes_sounding_at(-1), [])
+
+    def test_notes_between(self):
+        measure = get_test_measure()
+        self.assertEqual(measure.notes_between(0, 0.5), measure.notes[:3])
+        self.assertEqual(measure.notes_between(Fraction(7, 16), Fraction(29, 48)), measure.notes[2:4])
+        self.assertEqual(measure.notes_between(0.7, 1), [])
+
+    def test_direct_edit(self):
+        measure = get_test_measure()
+        measure.notes[0] = NoteGroup.from_note(measure.notes[0])
+        self.assertIs(measure.get_note_at_location(0), measure.notes[0])
+        measure.notes.pop(0)
+        self.assertEqual(measure.notes_sounding_at(0), [measure.notes[0]])
+
+    def test_replace_note(self):
+        measure = Measure()
+        measure.append([Note(value=NoteValue(NoteType.QUARTER), pitch=Pitch(step))
+                        for step in [Step.C, Step.D, Step.E, Step.F]])
+        self.assertEqual(measure.onsets, [0, Fraction(1, 4), Fraction(1, 2), Fraction(3, 4)])
+
+        # Same length of list, different durations
+        measure.notes[0] = Note(value=NoteValue(NoteType.HALF), pitch=Pitch(Step.G))
+        self.assertEqual(measure.onsets, [0, Fraction(1, 2), Fraction(3, 4), 1])
+        self.assertEqual(measure.notes_sounding_at(Fraction(1, 4)), [measure.notes[0]])
+        self.assertEqual(measure.get_note_at_location(Fraction(1, 4)).pitch.step, Step.D)
+        self.assertEqual(measure.content_length, Fraction(5, 4))
+
+    def test_change_value(self):
+        measure = Measure()
+        measure.append([Note(value=NoteValue(NoteType.QUARTER), pitch=Pitch(step)) for step in [Step.C, Step.D]])
+        offsets = measure.tick_offsets(1)
+
+        measure.notes[0].value = NoteValue(NoteType.HALF)
+        self.assertEqual(measure.onsets, [0, Fraction(1, 2)])
+        self.assertEqual(measure.notes[1].start_point, Fraction(1, 2))
+        self.assertEqual((offsets, measure.tick_offsets(1)), ([0, 1], [0, 2]))
+
+
+class AccidentalTest(unittest.TestCase):
+    @staticmethod
+    def quarter(step: Step, alter: Accidental = Accidental.NONE) -> Note:
+        return Note(value=NoteValue(NoteType.QUARTER), pitch=Pitch(step, alter=alter))
+
+    def test_carried_in_measure(self):
+        # G major: F sharp is in the key, the first F natural needs a sign and the second does not
+        measure = Measure(key=Key(KeyType.G))
+        for step, alter in [(Step.F, Accidental.SHARP), (Step.F, Accidental.NONE), (Step.F, Accidental.NONE),
+                            (Step.F, Accidental.SHARP)]:
+            measure.append(AccidentalTest.quarter(step, alter))
+
+        carried = measure.update_accidentals(measure.key)
+        self.assertEqual([note.show_accidental for note in measure.notes], [False, True, False, True])
+        self.assertEqual(measure.notes[1].display_accidental, Accidental.NATURAL)
+        self.assertEqual(carried, {})
+
+    def test_cautionary(self):
+        first = Measure()
+        first.append(AccidentalTest.quarter(Step.C, Accidental.SHARP))
+        second = Measure()
+        second.append(AccidentalTest.quarter(Step.C))
+        second.append(AccidentalTest.quarter(Step.C))
+
+        carried = first.update_accidentals(None)
+        second.update_accidentals(None, carried)
+        self.assertTrue(second.notes[0].cautionary_accidental)
+        self.assertEqual(second.notes[0].display_accidental, Accidental.NATURAL)
+        self.assertFalse(second.notes[1].show_accidental)
+
+    def test_tie_and_dirty(self):
+        first = Measure()
+        first.append(AccidentalTest.quarter(Step.D, Accidental.FLAT))
+        second = Measure()
+        tied = AccidentalTest.quarter(Step.D, Accidental.FLAT)
+        tied.marks.add(TieType.STOP)
+        second.append(tied)
+        second.append(AccidentalTest.quarter(Step.D, Accidental.FLAT))
+
+        second.update_accidentals(None, first.update_accidentals(None))
+        self.assertEqual([note.show_accidental for note in second.notes], [False, True])
+
+        # Clean measures are skipped until their notes change
+        second.notes[1].show_accidental = False
+        second.update_accidentals(None, first.update_accidentals(None))
+        self.assertFalse(second.notes[1].show_accidental)
+        second.append(AccidentalTest.quarter(Step.E))
+        second.update_accidentals(None, first.update_accidentals(None))
+        self.assertTrue(second.notes[1].show_accidental)
+
+    def test_pitch_edit(self):
+        measure = Measure()
+        measure.append([AccidentalTest.quarter(Step.C), AccidentalTest.quarter(Step.D)])
+        measure.update_accidentals(None)
+
+        # Setting a pitch is noticed, and working out what to display leaves the notes as they are
+        measure.notes[1].pitch = Pitch(Step.D, alter=Accidental.SHARP)
+        self.assertFalse(measure.accidentals_current(None))
+        shown, carried = measure.displayed_accidentals(None)
+        self.assertEqual(shown, {id(measure.notes[1]): (Accidental.SHARP, False)})
+        self.assertFalse(measure.notes[1].show_accidental)
+
+        measure.update_accidentals(None)
+        self.assertTrue(measure.notes[1].show_accidental)
+        self.assertEqual(measure.displayed_accidentals(None), (shown, carried))
+
+
+if __name__ == '__main__':
+    unittest.main()
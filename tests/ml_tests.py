@@ -0,0 +1,179 @@
+import os
+import pickle
+import tempfile
+import unittest
+import sys
+sys.path.insert(0, '../musicai')
+import numpy as np
+from fixtures import get_two_part_score
+from ml.augment import Compose, PartDropout, TimeStretch, Transpose, VelocityJitter, WindowCrop
+from ml.dataset import ShardedDataset, ShardWriter
+from ml.pipeline import Pipeline
+from ml.tokens import Tokenizer, TokenType, Vocabulary
+from structure.measure import Measure
+from structure.note import Note, NoteType, NoteValue
+from structure.note_table import NoteTable
+from structure.pitch import Pitch, Step
+from structure.score import Part, PartSystem, Score
+from structure.time import TimeSignature
+
+
+class TokenizerTest(unittest.TestCase):
+    def test_encode(self):
+        tokenizer = Tokenizer(Vocabulary(resolution=4))
+        types, values = tokenizer.vocabulary.decode(tokenizer.encode(get_two_part_score()))
+        tokens = [(TokenType(token_type).name, int(value)) for token_type, value in zip(types, values)]
+
+        self.assertEqual(tokens[:17], [('BOS', 0), ('BAR', 0), ('TIME_SIGNATURE', 20), ('KEY', 14),
+                                       ('POSITION', 0),
+                                       ('PART', 0), ('PITCH', 60), ('DURATION', 3), ('VELOCITY', 12),
+                                       ('PART', 1), ('PITCH', 48), ('DURATION', 15), ('VELOCITY', 18),
+                                       ('POSITION', 4),
+                                       ('PART', 0), ('PITCH', 64), ('DURATION', 7)])
+        self.assertEqual(tokens[-1], ('EOS', 0))
+        self.assertEqual([name for name, value in tokens].count('BAR'), 2)
+
+    def test_round_trip(self):
+        tokenizer = Tokenizer()
+        tokens = tokenizer.encode(get_two_part_score())
+        score = tokenizer.decode(tokens)
+
+        self.assertEqual(len(score.systems[0].parts), 2)
+        self.assertTrue(score.systems[0].parts[0].measures[0].notes[1].is_note_group())
+        np.testing.assert_array_equal(tokenizer.encode(score), tokens)
+
+    def test_batch(self):
+        tokenizer = Tokenizer(part_tokens=False)
+        tokens, offsets = tokenizer.encode_batch([get_two_part_score(), get_two_part_score()])
+
+        self.assertEqual(offsets.tolist(), [0, len(tokens) // 2, len(tokens)])
+        scores = tokenizer.decode_batch(tokens, offsets)
+        self.assertEqual([len(score.systems[0].parts) for score in scores], [1, 1])
+
+    def test_overfull(self):
+        # Two 2/4 measures, each holding a quarter more than fits; the last one runs past the end of the score
+        part = Part()
+        for notes in ([(Step.C, NoteType.QUARTER), (Step.D, NoteType.QUARTER), (Step.E, NoteType.QUARTER)],
+                      [(Step.G, NoteType.HALF), (Step.A, NoteType.QUARTER)]):
+            measure = Measure(time=TimeSignature(2, 4))
+            for step, notetype in notes:
+                measure.append(Note(value=NoteValue(notetype), pitch=Pitch(step)))
+            part.append(measure)
+        system = PartSystem()
+        system.append(part)
+        score = Score()
+        score.append(system)
+
+        tokenizer = Tokenizer()
+        decoded = NoteTable.from_score(tokenizer.decode(tokenizer.encode(score)))
+        quarter = decoded.resolution
+        self.assertEqual(sorted(zip((decoded.onset // quarter).tolist(), decoded.pitch.tolist())),
+                         [(0, 60), (1, 62), (2, 64), (2, 67), (4, 69)])
+        self.assertEqual(decoded.measure.max(), 2)
+
+
+class AugmentTest(unittest.TestCase):
+    def test_table(self):
+        table = NoteTable.from_score(get_two_part_score())
+        augment = Compose([Transpose(-12, 12, pitch_range=(48, 72)), TimeStretch(0.5, 2), VelocityJitter(10),
+                           WindowCrop(4)])
+        for seed in range(20):
+            augmented = augment(table, rng=seed)
+            self.assertTrue(np.all((augmented.pitch >= 48) & (augmented.pitch <= 72)))
+            self.assertTrue(np.all(augmented.duration > 0))
+            self.assertTrue(np.all(augmented.onset + augmented.duration <= 4 * table.resolution))
+            # Every pitch moves by the same interval
+            self.assertEqual(len(np.unique(Transpose(-12, 12)(table, rng=seed).pitch - table.pitch)), 1)
+        np.testing.assert_array_equal(augment(table, rng=3).velocity, augment(table, rng=3).velocity)
+        np.testing.assert_array_equal(table.pitch, NoteTable.from_score(get_two_part_score()).pitch)
+
+    def test_roll(self):
+        table = NoteTable.from_score(get_two_part_score())
+        roll = table.to_pianoroll(channels=True, velocity_from_dynamics=True)
+        transposed = Transpose(5, 5)(roll)
+        np.testing.assert_array_equal(transposed[:, 5:], roll[:, :-5])
+        self.assertEqual(WindowCrop(2)(roll).shape, (2, 128, 8))
+
+        dropped = PartDropout(1.0)(roll, rng=0)
+        self.assertEqual(np.count_nonzero(dropped.any(axis=(1, 2))), 1)
+        self.assertTrue(np.array_equal(table.select(table.part == 0).to_pianoroll(), dropped[0] > 0) or
+                        np.array_equal(table.select(table.part == 1).to_pianoroll(), dropped[1] > 0))
+        self.assertRaises(ValueError, PartDropout(0.5), roll[0])
+        self.assertRaises(TypeError, Transpose(), np.zeros(4))
+
+
+class ShardTest(unittest.TestCase):
+    def test_tokens(self):
+        arrays = [np.arange(length, dtype=np.int32) + length for length in [5, 3, 8, 2, 20]]
+        with tempfile.TemporaryDirectory() as directory:
+            with ShardWriter(directory, shard_size=10) as writer:
+                for array in arrays:
+                    writer.append(array)
+
+            dataset = ShardedDataset(directory)
+            self.assertEqual(len(dataset), 5)
+            # An array is never split: 5 + 3 fit the first shard, 8 + 2 the second, and 20 gets its own
+            self.assertEqual(dataset.shards.tolist(), [0, 0, 1, 1, 2])
+            for index, array in enumerate(arrays):
+                np.testing.assert_array_equal(dataset[index], array)
+            np.testing.assert_array_equal(dataset.window(4, 18, 5), [38, 39])
+            self.assertIsInstance(dataset[2], np.memmap)
+
+            unpickled = pickle.loads(pickle.dumps(dataset))
+            np.testing.assert_array_equal(unpickled[-1], arrays[-1])
+
+    def test_note_tables(self):
+        table = NoteTable.from_score(get_two_part_score())
+        with tempfile.TemporaryDirectory() as directory:
+            with ShardWriter(directory) as writer:
+                writer.append(table.to_records())
+                self.assertRaises(ValueError, writer.append, np.zeros((4, 128)))
+
+            records = ShardedDataset(directory)[0]
+            restored = NoteTable.from_records(records, table.resolution, table.end)
+            np.testing.assert_array_equal(restored.pitch, table.pitch)
+            np.testing.assert_array_equal(restored.to_pianoroll(), table.to_pianoroll())
+
+    def test_resume(self):
+        arrays = [np.arange(length * 2, dtype=np.int16).reshape(length, 2) for length in [3, 4, 2, 5]]
+        with tempfile.TemporaryDirectory() as directory:
+            # Stopped without closing: the first two arrays are in a shard, the next two only in the pending log,
+            # and the last line of the log was cut short
+            writer = ShardWriter(directory, shard_size=8)
+            for index, array in enumerate(arrays):
+                writer.append(array, key=str(index))
+            for file in writer._log_:
+                file.close()
+            with open(os.path.join(directory, ShardWriter.PENDING_LOG), 'a') as log:
+                log.write('[4, "4"')
+            self.assertEqual(len(ShardedDataset(directory)), 2)
+
+            with ShardWriter(directory, shard_size=8, resume=True) as writer:
+                self.assertEqual(writer.keys, ['0', '1', '2', '3'])
+                writer.append(arrays[0], key='4')
+
+            dataset = ShardedDataset(directory)
+            self.assertEqual(dataset.keys, ['0', '1', '2', '3', '4'])
+            for index, array in enumerate(arrays + arrays[:1]):
+                np.testing.assert_array_equal(dataset[index], array)
+            self.assertFalse(os.path.exists(os.path.join(directory, ShardWriter.PENDING_LOG)))
+
+
+class PipelineTest(unittest.TestCase):
+    def test_run(self):
+        examples = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'mxml')
+        paths = [os.path.join(examples, name) for name in ['HelloWorld.musicxml', 'MozaChloSampReduced.musicxml']]
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = Pipeline(directory, workers=2, queue_size=1)
+            stats = pipeline.run(paths + [os.path.join(examples, 'missing')])
+            self.assertEqual([stage.items for stage in stats], [2, 0, 2, 2])
+            self.assertEqual(list(pipeline.errors), [os.path.join(examples, 'missing')])
+
+            dataset = ShardedDataset(directory)
+            self.assertEqual(sorted(dataset.keys), sorted(paths))
+            self.assertEqual(Pipeline(directory).failed(), {os.path.join(examples, 'missing')})
+
+            # A second run finds every file done
+            stats = Pipeline(directory, workers=2).run(paths + [os.path.join(examples, 'missing')])
+            self.assertEqual([stage.items for stage in stats], [0, 0, 0, 0])
+            self.assertEqual(len(ShardedDataset(directory)), 2)
@@ -1,5 +1,6 @@
 import operator
 import unittest
+from fractions import Fraction
 from numpy import mean, std
 import sys
 sys.path.insert(0, '../musicai')
@@ -71,6 +72,13 @@ class NoteTypeTest(unittest.TestCase):
         # invalid values
         self.assertWarns(UserWarning, NoteType.from_mxml, 'foo')
 
+    def test_to_mxml(self):
+        for notetype in NoteType:
+            if notetype != NoteType.NONE:
+                self.assertEqual(NoteType.from_mxml(notetype.to_mxml()), notetype)
+        self.assertEqual(NoteType.EIGHTH.to_mxml(), 'eighth')
+        self.assertEqual(NoteType.DOUBLE.to_mxml(), 'breve')
+
     def test_list(self):
         self.assertEqual(NoteType.list(), [0.0, 0.000244141, 0.000488281, 0.000976563, 0.001953125, 0.00390625,
                                            0.0078125, 0.015625, 0.03125, 0.0625, 0.125, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0])
@@ -360,5 +368,23 @@ class NoteValueTest(unittest.TestCase):
         self.assertEqual(NoteValue.find(1), NoteValue(NoteType.WHOLE, DotType.NONE, TupletType.REGULAR))
         self.assertEqual(NoteValue.find(2), NoteValue(NoteType.DOUBLE, DotType.NONE, TupletType.REGULAR))
 
+    def test_fraction(self):
+        self.assertEqual(NoteValue(NoteType.FOUR_THOUSAND_NINETY_SIXTH).fraction, Fraction(1, 4096))
+        self.assertEqual(NoteValue(NoteType.QUARTER, DotType.TWO).fraction, Fraction(7, 16))
+        self.assertEqual(NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET).fraction, Fraction(1, 12))
+
+    def test_ticks(self):
+        self.assertEqual(NoteValue(NoteType.QUARTER).ticks(1), 1)
+        self.assertEqual(NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET).resolution, 3)
+        self.assertEqual(NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET).ticks(12), 4)
+        self.assertRaises(ValueError, NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET).ticks, 4)
+
+    def test_find_many(self):
+        with self.assertWarns(UserWarning):
+            found = NoteValue.find_many([1/4, 1/12, 0.26, 3/8])
+        self.assertEqual([value.fraction for value in found],
+                         [Fraction(1, 4), Fraction(1, 12), NoteValue.find(0.26).fraction, Fraction(3, 8)])
+        self.assertEqual(found[1], NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
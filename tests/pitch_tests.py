@@ -608,6 +608,23 @@ class AccidentalTest(unittest.TestCase):
         self.assertRaises(ValueError, Accidental.from_abc, '_=')
         self.assertRaises(ValueError, Accidental.from_abc, 'foo')
 
+    def test_lookups(self):
+        # valid values
+        self.assertEqual(Accidental.find('s'), Accidental.SHARP)
+        self.assertEqual(Accidental.find(-2), Accidental.DOUBLE_FLAT)
+        self.assertEqual(Accidental.find(0.0), Accidental.NONE)
+        self.assertEqual(Accidental.from_mxml('sharp'), Accidental.SHARP)
+        self.assertEqual(Accidental.from_mxml('flat-flat'), Accidental.DOUBLE_FLAT)
+        self.assertEqual(Accidental.from_mxml('quarter-sharp'), Accidental.QUARTER_SHARP)
+        self.assertEqual(Accidental.by_name('natural'), Accidental.NATURAL)
+        for accidental in Accidental:
+            if accidental.to_mxml() != '':
+                self.assertEqual(Accidental.from_mxml(accidental.to_mxml()).alter, accidental.alter)
+
+        # invalid values
+        self.assertIsNone(Accidental.by_mxml('foo'))
+        self.assertRaises(ValueError, Accidental.find, 0.5)
+
 
 
 
@@ -737,6 +754,13 @@ class PitchTest(unittest.TestCase):
         # invalid values
         # TODO
 
+    def test_step_up(self):
+        pitch = Pitch(Step.C, alter=Accidental.FLAT)
+        pitch.step_up()
+        self.assertEqual(pitch.alter, Accidental.NONE)
+        pitch.step_up()
+        self.assertEqual(pitch.alter, Accidental.SHARP)
+
 
 class ChromaticTest(unittest.TestCase):
 
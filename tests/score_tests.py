@@ -1,6 +1,28 @@
+import contextlib
+import io
+import math
 import operator
+import os
+import tempfile
 import unittest
-from musicai.structure.score import Part, PartSystem, Score
+import warnings
+from fractions import Fraction
+import numpy as np
+import sys
+sys.path.insert(0, '../musicai')
+from fileio.mxml import MusicXML
+from structure.beatmap import BeatMap
+from structure.mark_index import MarkIndex, MarkInterval
+from structure.measure import Barline, BarlineLocation, BarlineType, Measure, MeasureView
+from structure.measure_mark import DynamicChangeMark, DynamicMark, DynamicType, TempoChangeMark, TempoChangeType, \
+    TempoMark, VoltaBracketMark
+from structure.note import Note, NoteType, NoteValue, DotType, TupletType
+from structure.note_mark import TieType
+from structure.note_table import NoteTable
+from structure.pitch import Accidental, Pitch, Step
+from structure.score import Part, PartSystem, Score
+from structure.time import Tempo, TimeSignature
+from structure.time_index import TimeUnit
 
 
 # Depreceated
@@ -42,3 +64,417 @@ def get_test_score() -> Score:
     score.append(s1)
 
     return score
+
+
+def get_timeline_score() -> Score:
+    """
+    One part of two 2/4 measures: a quarter and a triplet of eighths, then a half note under a hairpin
+    """
+    m1 = Measure(time=TimeSignature(2, 4))
+    m1.append(Note(value=NoteValue(NoteType.QUARTER), pitch=Pitch(Step.C)))
+    for step in [Step.D, Step.E, Step.F]:
+        m1.append(Note(value=NoteValue(NoteType.EIGHTH, DotType.NONE, TupletType.TRIPLET), pitch=Pitch(step)))
+    m1.measure_marks.append(DynamicMark(DynamicType.PIANO))
+
+    m2 = Measure(time=TimeSignature(2, 4))
+    m2.append(Note(value=NoteValue(NoteType.HALF), pitch=Pitch(Step.G)))
+    m2.measure_marks.append(DynamicChangeMark(1, 2, divisions=2))
+
+    part = Part()
+    part.append(m1)
+    part.append(m2)
+
+    system = PartSystem()
+    system.append(part)
+
+    score = Score()
+    score.append(system)
+    return score
+
+
+class PartTest(unittest.TestCase):
+    def test_extend(self):
+        from structure.measure import Barline, BarlineType
+
+        appended = Part()
+        extended = Part()
+        for part in (appended, extended):
+            part.append(Measure())
+        for measure in [Measure(), Measure(barline=Barline(BarlineType.DOUBLE)), Measure()]:
+            appended.append(measure)
+        extended.extend([Measure(), Measure(barline=Barline(BarlineType.DOUBLE)), Measure()])
+
+        for part in (appended, extended):
+            self.assertEqual(part.measures[0].barline, BarlineType.REGULAR)
+            self.assertEqual(part.measures[1].barline, BarlineType.REGULAR)
+            self.assertEqual(part.measures[2].barline.barlinetype, BarlineType.DOUBLE)
+            self.assertEqual(part.measures[3].barline, BarlineType.FINAL)
+
+    def test_bulk(self):
+        from structure.measure import BarlineType
+
+        part = Part()
+        with part.bulk():
+            for staff in (1, 2):
+                part.append(Measure(), staff)
+                part.append(Measure(), staff)
+            self.assertFalse(part.auto_update_barline_end)
+
+        self.assertTrue(part.auto_update_barline_end)
+        for measure_list in part.staves:
+            self.assertEqual([measure.barline for measure in measure_list], [BarlineType.REGULAR, BarlineType.FINAL])
+
+    def test_staves(self):
+        part = Part()
+        measures = [[Measure() for measure_index in range(3)] for staff_index in range(2)]
+        for staff_index, measure_list in enumerate(measures):
+            part.extend(measure_list, staff_index + 1)
+
+        self.assertEqual(part.staff_count(), 2)
+        self.assertIs(part.measures, part.staves[0])
+        self.assertEqual(part.multi_staves, [part.staves[1]])
+        # The view is live: a staff appended to it is the part's own
+        part.multi_staves.append([Measure()])
+        self.assertEqual(part.staff_count(), 3)
+        self.assertIs(part.multi_staves[-1], part.staves[2])
+        del part.multi_staves[1]
+        self.assertEqual(part.staves[1:], [measures[1]])
+        self.assertIs(part[1, 2], measures[1][2])
+        self.assertEqual(part.column(1), [measures[0][1], measures[1][1]])
+        self.assertEqual([(staff_index, measure_index) for staff_index, measure_index, measure in part.iter_measures()],
+                         [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)])
+
+        system = PartSystem()
+        system.append(part)
+        score = Score()
+        score.append(system)
+        self.assertEqual([(staff_index, measure) for p, staff_index, measure in score.column(2)],
+                         [(0, measures[0][2]), (1, measures[1][2])])
+        self.assertEqual(len(list(score.iter_measures())), 6)
+
+
+class ColumnTest(unittest.TestCase):
+    def test_columns(self):
+        score = get_timeline_score()
+        second = Part()
+        for notetype in (NoteType.EIGHTH, NoteType.HALF):
+            measure = Measure(time=TimeSignature(2, 4))
+            measure.append(Note(value=NoteValue(notetype), pitch=Pitch(Step.C)))
+            if notetype == NoteType.EIGHTH:
+                measure.append(Note(value=NoteValue(NoteType.QUARTER, DotType.ONE), pitch=Pitch(Step.E)))
+            second.append(measure)
+        score.systems[0].append(second)
+
+        columns = list(score.columns())
+        self.assertEqual([column.index for column in columns], [0, 1])
+        self.assertEqual([column.start for column in columns], [0, Fraction(1, 2)])
+        self.assertEqual([column.length for column in columns], [Fraction(1, 2), Fraction(1, 2)])
+        self.assertEqual(len(columns[0].measures), 2)
+        self.assertEqual(columns[0].onsets, [0, Fraction(1, 8), Fraction(1, 4), Fraction(1, 3), Fraction(5, 12)])
+        self.assertEqual(columns[1].onsets, [0])
+
+
+class EventTest(unittest.TestCase):
+    def test_events(self):
+        score = get_timeline_score()
+        second = Part()
+        for notetype in (NoteType.HALF, NoteType.HALF):
+            measure = Measure(time=TimeSignature(2, 4))
+            measure.append(Note(value=NoteValue(notetype), pitch=Pitch(Step.A)))
+            second.append(measure)
+        score.systems[0].append(second)
+        third = score.update_timeline() // 3
+
+        events = list(score.events())
+        self.assertEqual([event.time // third for event in events], [0, 0, 3, 4, 5, 6, 6])
+        self.assertEqual([event.part for event in events[:2]], score.systems[0].parts)
+        self.assertEqual([event.note.pitch.step for event in events[2:5]], [Step.D, Step.E, Step.F])
+
+        self.assertEqual([event.time // third for event in score.events(start=4 * third, end=6 * third)], [4, 5])
+        self.assertEqual([event.time // third for event in score.events(start=third)], [3, 4, 5, 6, 6])
+
+    def test_loaded_voices(self):
+        # Voices of a measure are read one after another, so each staff's notes are out of order as loaded
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'examples', 'mxml',
+                            'Dichterliebe01.musicxml')
+        with contextlib.redirect_stdout(io.StringIO()):
+            score = MusicXML.load(path)
+
+        times = [event.time for event in score.events(rests=True)]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(len(times), sum(len(measure.notes) for system in score.systems for part in system.parts
+                                         for measure_list in part.staves for measure in measure_list))
+
+        start, end = times[len(times) // 3], times[2 * len(times) // 3]
+        self.assertEqual([event.time for event in score.events(start=start, end=end, rests=True)],
+                         [time for time in times if start <= time < end])
+
+
+class TimelineTest(unittest.TestCase):
+    def test_resolution(self):
+        score = get_timeline_score()
+        # lcm of the default 256 divisions and the triplet's 3 ticks per quarter
+        self.assertEqual(score.update_timeline(), 768)
+        self.assertEqual(score.resolution, 768)
+
+    def test_note_ticks(self):
+        score = get_timeline_score()
+        score.update_timeline()
+        part = score.systems[0].parts[0]
+
+        self.assertEqual([(n.tick_onset, n.tick_duration) for n in part.measures[0].notes],
+                         [(0, 768), (768, 256), (1024, 256), (1280, 256)])
+        self.assertEqual((part.measures[1].tick_onset, part.measures[1].tick_duration), (1536, 1536))
+        self.assertEqual(part.measures[1].notes[0].tick_onset, 1536)
+
+    def test_mark_ticks(self):
+        score = get_timeline_score()
+        score.update_timeline()
+        hairpin = score.systems[0].parts[0].measures[1].measure_marks[0]
+
+        self.assertEqual((hairpin.tick_onset, hairpin.tick_duration), (1536 + 384, 384))
+        self.assertEqual(score.systems[0].parts[0].measures[0].measure_marks[0].tick_onset, 0)
+
+
+class TimeIndexTest(unittest.TestCase):
+    def test_locate(self):
+        score = get_timeline_score()
+        self.assertEqual(score.at_time.end, 4.0)
+        self.assertEqual(score.at_time.locate(2.5), (1, Fraction(1, 8)))
+        self.assertEqual(score.time_index(TimeUnit.TICKS).locate(1024), (0, Fraction(1, 3)))
+        self.assertRaises(IndexError, score.at_time.locate, 4.0)
+
+    def test_notes_at(self):
+        score = get_timeline_score()
+        self.assertEqual([note.pitch.step for part, staff, note in score.at_time[1.0]], [Step.D])
+        self.assertEqual([note.pitch.step for part, staff, note in score.at_time[3.75]], [Step.G])
+
+    def test_excerpt(self):
+        score = get_timeline_score()
+        excerpt = score.at_time[0.5:3.0]
+        measures = excerpt.systems[0].parts[0].measures
+
+        # The quarter note and the half note are cut, with rests standing in for what was cut off
+        self.assertEqual([(note.is_rest(), note.value.fraction) for note in measures[0].notes],
+                         [(True, Fraction(1, 8)), (False, Fraction(1, 8))] + [(False, Fraction(1, 12))] * 3)
+        self.assertEqual([(note.is_rest(), note.value.fraction) for note in measures[1].notes],
+                         [(False, Fraction(1, 4)), (True, Fraction(1, 4))])
+        self.assertEqual(excerpt.at_time.end, 4.0)
+
+        # The original score is untouched
+        self.assertEqual(len(score.systems[0].parts[0].measures[0].notes), 4)
+        self.assertEqual(score.systems[0].parts[0].measures[1].notes[0].value.fraction, Fraction(1, 2))
+
+    def test_float_excerpt(self):
+        # Neither 0.1 nor 2.7 is exact in binary, nor on a note value; both are rounded to sixteenths
+        score = get_timeline_score()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            excerpt = score.at_time[0.1:2.7]
+        measures = excerpt.systems[0].parts[0].measures
+
+        self.assertEqual([(note.is_rest(), note.value.fraction) for note in measures[0].notes],
+                         [(False, Fraction(1, 4))] + [(False, Fraction(1, 12))] * 3)
+        self.assertEqual([(note.is_rest(), note.value.fraction) for note in measures[1].notes],
+                         [(False, Fraction(3, 16)), (True, Fraction(1, 4)), (True, Fraction(1, 16))])
+        self.assertEqual(score.time_index(TimeUnit.TICKS)[0:1].systems[0].parts[0].measures[0].notes[0].value.fraction,
+                         Fraction(1, 3072))
+
+
+class BeatMapTest(unittest.TestCase):
+    def test_tempo_marks(self):
+        score = get_timeline_score()
+        score.tempo = Tempo(60)
+        score.systems[0].parts[0].measures[1].measure_marks.append(TempoMark(Tempo(120)))
+
+        self.assertEqual(score.beat_map.to_seconds([0.0, 1.0, 2.0, 3.0, 4.0]).tolist(), [0.0, 1.0, 2.0, 2.5, 3.0])
+        self.assertEqual(score.beat_map.to_beats(2.25), 2.5)
+        self.assertEqual(score.time_index(TimeUnit.SECONDS).locate(2.5), (1, Fraction(1, 4)))
+
+    def test_accelerando(self):
+        score = get_timeline_score()
+        score.tempo = Tempo(60)
+        score.systems[0].parts[0].measures[0].measure_marks.append(
+            TempoChangeMark(TempoChangeType.ACCELERANDO, start_point=0, end_point=512))
+
+        # 60 speeding up to 90 over the first measure, which takes 60 / 15 * ln(1.5) seconds
+        beat_map = score.beat_map
+        self.assertEqual(beat_map.tempo_at([0.0, 1.0, 2.0, 3.0]).tolist(), [60.0, 75.0, 90.0, 90.0])
+        self.assertAlmostEqual(beat_map.to_seconds(2.0), 4 * math.log(1.5))
+        self.assertAlmostEqual(beat_map.to_seconds(4.0), 4 * math.log(1.5) + 4 / 3)
+
+    def test_round_trip(self):
+        beat_map = BeatMap([0, 4, 6], [100, 100, 80], [0, -10, 0])
+        beats = np.linspace(-1, 10, 45)
+        np.testing.assert_allclose(beat_map.to_beats(beat_map.to_seconds(beats)), beats)
+        self.assertRaises(ValueError, BeatMap, [0, 4], [100, 50], [-30, 0])
+
+
+class UnfoldTest(unittest.TestCase):
+    @staticmethod
+    def get_repeat_score() -> Score:
+        """
+        |: 0 1 |1. 2 :|2. 3 | 4 |: 5 :|
+        """
+        part = Part()
+        for step in [Step.C, Step.D, Step.E, Step.F, Step.G, Step.A]:
+            measure = Measure(time=TimeSignature(2, 4))
+            measure.append(Note(value=NoteValue(NoteType.HALF), pitch=Pitch(step)))
+            part.append(measure)
+
+        part.measures[0].barline = Barline(BarlineType.LEFT_REPEAT, BarlineLocation.LEFT)
+        part.measures[2].barline = BarlineType.RIGHT_REPEAT
+        part.measures[2].measure_marks.append(VoltaBracketMark(1, end_point=512))
+        part.measures[3].measure_marks.append(VoltaBracketMark(2, end_point=512))
+        part.measures[5].barline = [Barline(BarlineType.LEFT_REPEAT, BarlineLocation.LEFT), BarlineType.RIGHT_REPEAT]
+
+        system = PartSystem()
+        system.append(part)
+        score = Score()
+        score.append(system)
+        return score
+
+    def test_unfold(self):
+        score = self.get_repeat_score()
+        self.assertEqual(score.unfold(), [0, 1, 2, 0, 1, 3, 4, 5, 5])
+
+        # Three endings, the second also ending in a backward repeat
+        score.systems[0].parts[0].measures[3].barline = BarlineType.RIGHT_REPEAT
+        score.systems[0].parts[0].measures[4].measure_marks.append(VoltaBracketMark(3, end_point=512))
+        self.assertEqual(score.unfold(), [0, 1, 2, 0, 1, 3, 0, 1, 4, 5, 5])
+
+    def test_unfolded(self):
+        score = self.get_repeat_score()
+        unfolded = score.unfolded()
+        measures = unfolded.systems[0].parts[0].measures
+
+        self.assertEqual([measure.notes[0].pitch.step for measure in measures[:6]],
+                         [Step.C, Step.D, Step.E, Step.C, Step.D, Step.F])
+        self.assertIs(measures[3]._base_, measures[0]._base_)
+        self.assertEqual((measures[3].tick_onset, measures[0].tick_onset), (6 * unfolded.resolution, 0))
+        self.assertEqual(unfolded.at_time.end, 18.0)
+        self.assertEqual(len(score.systems[0].parts[0].measures), 6)
+
+
+class PianoRollTest(unittest.TestCase):
+    def test_pianoroll(self):
+        score = get_timeline_score()
+        roll = score.to_pianoroll(3)
+
+        self.assertEqual(roll.shape, (128, 12))
+        self.assertEqual([int(step) for step in roll.argmax(axis=0)], [60] * 3 + [62, 64, 65] + [67] * 6)
+        self.assertEqual(int(roll.sum()), 12)
+
+        velocities = score.to_pianoroll(1, velocity_from_dynamics=True)
+        self.assertEqual(velocities[60].tolist(), [49, 0, 0, 0])
+        self.assertEqual(score.to_pianoroll(1, channels=True).shape, (1, 128, 4))
+
+    def test_ties(self):
+        part = Part()
+        for tie in [TieType.START, TieType.STOP]:
+            note = Note(value=NoteValue(NoteType.HALF), pitch=Pitch(Step.C))
+            note.marks.add(tie)
+            measure = Measure(time=TimeSignature(2, 4))
+            measure.append(note)
+            part.append(measure)
+        system = PartSystem()
+        system.append(part)
+        score = Score()
+        score.append(system)
+
+        table = NoteTable.from_score(score)
+        self.assertEqual((len(table), int(table.duration[0])), (1, 4 * score.resolution))
+
+
+class ScoreViewTest(unittest.TestCase):
+    def test_slice_shares_measures(self):
+        score = get_timeline_score()
+        score.update_timeline()
+        view = score[1:2]
+        measure = view.systems[0].parts[0].measures[0]
+
+        self.assertIsInstance(measure, Measure)
+        self.assertIs(next(measure.iter_notes()), score.systems[0].parts[0].measures[1].notes[0])
+        self.assertTrue(measure.is_shared)
+        self.assertEqual(measure.tick_onset, 0)
+        self.assertEqual(score.systems[0].parts[0].measures[1].tick_onset, 1536)
+        self.assertEqual(len(score.systems[0].parts[0].measures), 2)
+
+    def test_copy_on_write(self):
+        score = get_timeline_score()
+        measure = score[0:1].systems[0].parts[0].measures[0]
+
+        measure.append(Note(value=NoteValue(NoteType.QUARTER)))
+        self.assertFalse(measure.is_shared)
+        self.assertEqual(len(measure.notes), 5)
+        self.assertEqual(len(score.systems[0].parts[0].measures[0].notes), 4)
+
+    def test_edit_shared_notes(self):
+        score = get_timeline_score()
+        original = score.systems[0].parts[0].measures[0]
+        measure = score[0:1].systems[0].parts[0].measures[0]
+
+        # Reading leaves the measure shared; editing a note or a mark in place copies it first
+        self.assertEqual(len(measure), 4)
+        self.assertEqual(len(list(measure.iter_marks())), 1)
+        self.assertTrue(measure.is_shared)
+        measure.notes[0].pitch.step = Step.G
+        measure.notes[1].value = NoteValue(NoteType.HALF)
+        measure.measure_marks.append(DynamicMark(DynamicType.FORTE))
+
+        self.assertFalse(measure.is_shared)
+        self.assertIs(type(measure), MeasureView)
+        self.assertEqual(measure.notes[0].pitch.step, Step.G)
+        self.assertEqual(measure.onsets[2], Fraction(3, 4))
+        self.assertEqual((len(original.notes), len(original.measure_marks)), (4, 1))
+        self.assertEqual(original.notes[0].pitch.step, Step.C)
+        self.assertEqual(original.onsets[2], Fraction(1, 3))
+
+    def test_save_leaves_view(self):
+        score = get_timeline_score()
+        score.update_accidentals()
+        note = score.systems[0].parts[0].measures[0].notes[1]
+        note.pitch = Pitch(Step.D, alter=Accidental.FLAT)
+        view = score[0:1]
+
+        path = os.path.join(tempfile.mkdtemp(), 'view.musicxml')
+        with contextlib.redirect_stdout(io.StringIO()):
+            MusicXML.save(view, path)
+        with open(path) as saved:
+            self.assertEqual(saved.read().count('<accidental>flat</accidental>'), 1)
+        self.assertTrue(view.systems[0].parts[0].measures[0].is_shared)
+        self.assertFalse(note.show_accidental)
+
+    def test_slice_parts(self):
+        score = get_timeline_score()
+        score.systems[0].append(Part())
+        view = score.slice_parts(1, 2)
+        self.assertEqual(len(view.systems[0].parts), 1)
+        self.assertEqual(len(score.systems[0].parts), 2)
+
+
+class MarkIndexTest(unittest.TestCase):
+    def test_part_index(self):
+        score = get_timeline_score()
+        index = score.systems[0].parts[0].mark_index
+
+        self.assertEqual(index.resolution, 768)
+        self.assertEqual([(interval.start, interval.end, interval.measure_index) for interval in index],
+                         [(0, 0, 0), (1920, 2304, 1)])
+        self.assertEqual([interval.mark for interval in index.at(2000)],
+                         score.systems[0].parts[0].measures[1].measure_marks)
+        self.assertEqual(index.at(2304), [])
+        self.assertEqual(index.latest(1500, DynamicMark).mark.dynamic_type, DynamicType.PIANO)
+
+    def test_queries(self):
+        # Nested and overlapping intervals, plus instantaneous marks
+        spans = [(0, 100), (10, 20), (15, 60), (30, 30), (50, 200), (120, 130), (200, 200)]
+        index = MarkIndex([MarkInterval(start, end, 0, 0, DynamicMark()) for start, end in spans], 1)
+
+        for tick in [0, 10, 15, 20, 30, 55, 100, 125, 199, 200, 250]:
+            expected = [(start, end) for start, end in spans if start <= tick < end or start == end == tick]
+            self.assertEqual([(interval.start, interval.end) for interval in index.at(tick)], expected)
+
+        for start, end in [(0, 5), (20, 30), (25, 31), (100, 120), (130, 200), (150, 201)]:
+            expected = [(a, b) for a, b in spans if (a < end and start < b) or start <= a == b < end]
+            self.assertEqual([(interval.start, interval.end) for interval in index.overlapping(start, end)], expected)